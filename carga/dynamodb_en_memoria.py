@@ -0,0 +1,908 @@
+"""
+DynamoDB en memoria para el modo en proceso del generador de carga y las pruebas.
+
+Reproduce la parte de la API de recursos de boto3 que usa el workflow
+(Table, batch_get_item, batch_writer y meta.client.transact_write_items) con
+el mismo lenguaje de expresiones (condiciones, filtros, claves, proyecciones y
+updates SET/REMOVE/ADD/DELETE), índices globales dispersos con su proyección,
+paginación y los mismos errores (ClientError con el código de DynamoDB). Los
+valores pasan por el serializador de boto3, así que un float o un set vacío
+fallan igual que contra AWS.
+
+Cuenta las llamadas por operación y tabla, y guarda los registros de stream
+(NEW_IMAGE) de las tablas que lo tienen habilitado.
+"""
+import copy
+import re
+import threading
+from collections import Counter, defaultdict
+from decimal import Decimal
+from types import SimpleNamespace
+
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from boto3.dynamodb.types import Binary, TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+# Items por página de query y scan (DynamoDB corta por tamaño, 1 MB)
+LIMITE_PAGINA = 100
+MAX_ITEMS_LOTE = 25
+MAX_CLAVES_BATCH_GET = 100
+MAX_ITEMS_TRANSACCION = 100
+
+_serializador = TypeSerializer()
+_deserializador = TypeDeserializer()
+
+# Atributo ausente (distinto de un atributo con valor NULL)
+_FALTA = object()
+
+def error_dynamodb(codigo, mensaje, operacion):
+    return ClientError({'Error': {'Code': codigo, 'Message': mensaje}}, operacion)
+
+def _validacion(mensaje):
+    return error_dynamodb('ValidationException', mensaje, 'DynamoDB')
+
+def normalizar(valor):
+    """Valor como lo devuelve DynamoDB: números Decimal, sets y binarios de boto3"""
+    serializado = _serializador.serialize(valor)
+    tipo, contenido = next(iter(serializado.items()))
+    if tipo in ('SS', 'NS', 'BS') and not contenido:
+        raise _validacion('An string set may not be empty')
+    return _deserializador.deserialize(serializado)
+
+def tipo_dynamodb(valor):
+    if isinstance(valor, bool):
+        return 'BOOL'
+    if isinstance(valor, Decimal):
+        return 'N'
+    if isinstance(valor, str):
+        return 'S'
+    if isinstance(valor, (bytes, Binary)):
+        return 'B'
+    if isinstance(valor, set):
+        return next(iter(_serializador.serialize(valor)))
+    if isinstance(valor, list):
+        return 'L'
+    if isinstance(valor, dict):
+        return 'M'
+    return 'NULL'
+
+# ---------------------------------------------------------------------------
+# Expresiones
+# ---------------------------------------------------------------------------
+
+_TOKEN = re.compile(r'\s*(?:(?P<numero>\d+)|(?P<nombre>[#:]?[A-Za-z_][A-Za-z0-9_]*)|(?P<simbolo><>|<=|>=|[=<>(),.\[\]+\-]))')
+
+COMPARADORES = {'=', '<>', '<', '<=', '>', '>='}
+FUNCIONES_CONDICION = {'attribute_exists', 'attribute_not_exists', 'attribute_type', 'begins_with', 'contains'}
+
+def _tokenizar(texto):
+    tokens = []
+    posicion = 0
+    texto = texto.rstrip()
+    while posicion < len(texto):
+        coincidencia = _TOKEN.match(texto, posicion)
+        if not coincidencia:
+            raise _validacion(f'Invalid expression: syntax error near "{texto[posicion:posicion + 10]}"')
+        tokens.append(coincidencia.group(coincidencia.lastgroup))
+        posicion = coincidencia.end()
+    return tokens
+
+class _Parser:
+    """Parser descendente de las expresiones de DynamoDB. Produce tuplas que evalúan evaluar_condicion y aplicar_update"""
+
+    def __init__(self, texto, nombres, valores):
+        self.tokens = _tokenizar(texto)
+        self.posicion = 0
+        self.nombres = nombres or {}
+        self.valores = valores or {}
+        self.nombres_usados = set()
+        self.valores_usados = set()
+
+    def ver(self, desplazamiento=0):
+        indice = self.posicion + desplazamiento
+        return self.tokens[indice] if indice < len(self.tokens) else None
+
+    def tomar(self, esperado=None):
+        token = self.ver()
+        if token is None or (esperado is not None and token != esperado):
+            raise _validacion(f'Invalid expression: expected "{esperado}", found "{token}"')
+        self.posicion += 1
+        return token
+
+    def palabra(self, palabra):
+        token = self.ver()
+        if token is not None and token.upper() == palabra:
+            self.posicion += 1
+            return True
+        return False
+
+    def fin(self):
+        if self.ver() is not None:
+            raise _validacion(f'Invalid expression: unexpected token "{self.ver()}"')
+
+    # Condiciones: OR < AND < NOT < comparación
+
+    def condicion(self):
+        nodo = self._conjuncion()
+        while self.palabra('OR'):
+            nodo = ('or', nodo, self._conjuncion())
+        return nodo
+
+    def _conjuncion(self):
+        nodo = self._negacion()
+        while self.palabra('AND'):
+            nodo = ('and', nodo, self._negacion())
+        return nodo
+
+    def _negacion(self):
+        if self.palabra('NOT'):
+            return ('not', self._negacion())
+        return self._comparacion()
+
+    def _comparacion(self):
+        if self.ver() == '(':
+            self.tomar('(')
+            nodo = self.condicion()
+            self.tomar(')')
+            return nodo
+
+        token = self.ver()
+        if token and token.lower() in FUNCIONES_CONDICION and self.ver(1) == '(':
+            nombre = self.tomar().lower()
+            self.tomar('(')
+            argumentos = [self.ruta()]
+            while self.ver() == ',':
+                self.tomar(',')
+                argumentos.append(self.operando())
+            self.tomar(')')
+            return ('funcion', nombre, argumentos)
+
+        izquierdo = self.operando()
+        if self.palabra('BETWEEN'):
+            desde = self.operando()
+            if not self.palabra('AND'):
+                raise _validacion('Invalid expression: BETWEEN without AND')
+            return ('between', izquierdo, desde, self.operando())
+        if self.palabra('IN'):
+            self.tomar('(')
+            opciones = [self.operando()]
+            while self.ver() == ',':
+                self.tomar(',')
+                opciones.append(self.operando())
+            self.tomar(')')
+            return ('in', izquierdo, opciones)
+
+        comparador = self.tomar()
+        if comparador not in COMPARADORES:
+            raise _validacion(f'Invalid expression: unexpected token "{comparador}"')
+        return ('comparar', comparador, izquierdo, self.operando())
+
+    # Operandos y rutas
+
+    def operando(self):
+        token = self.ver()
+        if token is None:
+            raise _validacion('Invalid expression: missing operand')
+        if token.startswith(':'):
+            self.tomar()
+            if token not in self.valores:
+                raise _validacion(f'An expression attribute value used in expression is not defined; attribute value: {token}')
+            self.valores_usados.add(token)
+            return ('valor', self.valores[token])
+        if self.ver(1) == '(':
+            nombre = token.lower()
+            if nombre == 'size':
+                self.tomar()
+                self.tomar('(')
+                ruta = self.ruta()
+                self.tomar(')')
+                return ('size', ruta)
+            if nombre == 'if_not_exists':
+                self.tomar()
+                self.tomar('(')
+                ruta = self.ruta()
+                self.tomar(',')
+                defecto = self.operando()
+                self.tomar(')')
+                return ('if_not_exists', ruta, defecto)
+            if nombre == 'list_append':
+                self.tomar()
+                self.tomar('(')
+                primero = self.operando()
+                self.tomar(',')
+                segundo = self.operando()
+                self.tomar(')')
+                return ('list_append', primero, segundo)
+        return self.ruta()
+
+    def _nombre(self):
+        token = self.tomar()
+        if token.startswith('#'):
+            if token not in self.nombres:
+                raise _validacion(f'An expression attribute name used in the document path is not defined; attribute name: {token}')
+            self.nombres_usados.add(token)
+            return self.nombres[token]
+        if not re.match(r'[A-Za-z_]', token):
+            raise _validacion(f'Invalid expression: unexpected token "{token}"')
+        return token
+
+    def ruta(self):
+        partes = [self._nombre()]
+        while self.ver() in ('.', '['):
+            if self.tomar() == '.':
+                partes.append(self._nombre())
+            else:
+                partes.append(int(self.tomar()))
+                self.tomar(']')
+        return ('ruta', tuple(partes))
+
+    # Updates
+
+    def valor_set(self):
+        izquierdo = self.operando()
+        if self.ver() in ('+', '-'):
+            operador = self.tomar()
+            return ('suma' if operador == '+' else 'resta', izquierdo, self.operando())
+        return izquierdo
+
+    def update(self):
+        acciones = {'SET': [], 'REMOVE': [], 'ADD': [], 'DELETE': []}
+        while self.ver() is not None:
+            clausula = self.tomar().upper()
+            if clausula not in acciones or acciones[clausula]:
+                raise _validacion(f'Invalid UpdateExpression: unexpected clause "{clausula}"')
+            while True:
+                ruta = self.ruta()
+                if clausula == 'SET':
+                    self.tomar('=')
+                    acciones['SET'].append((ruta, self.valor_set()))
+                elif clausula == 'REMOVE':
+                    acciones['REMOVE'].append((ruta, None))
+                else:
+                    acciones[clausula].append((ruta, self.operando()))
+                if self.ver() != ',':
+                    break
+                self.tomar(',')
+        return acciones
+
+    def proyeccion(self):
+        rutas = [self.ruta()]
+        while self.ver() == ',':
+            self.tomar(',')
+            rutas.append(self.ruta())
+        return rutas
+
+def _resolver(item, partes):
+    actual = item
+    for parte in partes:
+        if isinstance(parte, int):
+            if not isinstance(actual, list) or parte >= len(actual):
+                return _FALTA
+        elif not isinstance(actual, dict) or parte not in actual:
+            return _FALTA
+        actual = actual[parte]
+    return actual
+
+def _valor_orden(valor):
+    if isinstance(valor, Decimal):
+        return (0, valor)
+    return (1, '' if valor is None else str(valor))
+
+def _iguales(a, b):
+    return tipo_dynamodb(a) == tipo_dynamodb(b) and a == b
+
+def _ordenables(a, b):
+    return tipo_dynamodb(a) == tipo_dynamodb(b) and tipo_dynamodb(a) in ('N', 'S', 'B')
+
+def _operando(nodo, item):
+    tipo = nodo[0]
+    if tipo == 'valor':
+        return nodo[1]
+    if tipo == 'ruta':
+        return _resolver(item, nodo[1])
+    if tipo == 'size':
+        valor = _resolver(item, nodo[1][1])
+        if isinstance(valor, (str, bytes, Binary, set, list, dict)):
+            return Decimal(len(valor.value if isinstance(valor, Binary) else valor))
+        return _FALTA
+    raise _validacion(f'Invalid operand: {tipo}')
+
+def evaluar_condicion(nodo, item):
+    tipo = nodo[0]
+    if tipo == 'or':
+        return evaluar_condicion(nodo[1], item) or evaluar_condicion(nodo[2], item)
+    if tipo == 'and':
+        return evaluar_condicion(nodo[1], item) and evaluar_condicion(nodo[2], item)
+    if tipo == 'not':
+        return not evaluar_condicion(nodo[1], item)
+
+    if tipo == 'funcion':
+        nombre, argumentos = nodo[1], nodo[2]
+        valor = _resolver(item, argumentos[0][1])
+        if nombre == 'attribute_exists':
+            return valor is not _FALTA
+        if nombre == 'attribute_not_exists':
+            return valor is _FALTA
+        operando = _operando(argumentos[1], item)
+        if valor is _FALTA or operando is _FALTA:
+            return False
+        if nombre == 'attribute_type':
+            return tipo_dynamodb(valor) == operando
+        if nombre == 'begins_with':
+            return isinstance(valor, str) and isinstance(operando, str) and valor.startswith(operando)
+        # contains: subcadena, elemento de un set o de una lista
+        if isinstance(valor, str):
+            return isinstance(operando, str) and operando in valor
+        if isinstance(valor, set):
+            return operando in valor
+        if isinstance(valor, list):
+            return any(_iguales(elemento, operando) for elemento in valor)
+        return False
+
+    if tipo == 'between':
+        valor, desde, hasta = (_operando(parte, item) for parte in nodo[1:])
+        if _FALTA in (valor, desde, hasta) or not (_ordenables(valor, desde) and _ordenables(valor, hasta)):
+            return False
+        return desde <= valor <= hasta
+
+    if tipo == 'in':
+        valor = _operando(nodo[1], item)
+        return valor is not _FALTA and any(_iguales(valor, _operando(opcion, item)) for opcion in nodo[2])
+
+    comparador, izquierdo, derecho = nodo[1], _operando(nodo[2], item), _operando(nodo[3], item)
+    if izquierdo is _FALTA or derecho is _FALTA:
+        # Comparar con un atributo ausente solo es cierto para "distinto de"
+        return comparador == '<>'
+    if comparador == '=':
+        return _iguales(izquierdo, derecho)
+    if comparador == '<>':
+        return not _iguales(izquierdo, derecho)
+    if not _ordenables(izquierdo, derecho):
+        return False
+    return {
+        '<': izquierdo < derecho,
+        '<=': izquierdo <= derecho,
+        '>': izquierdo > derecho,
+        '>=': izquierdo >= derecho
+    }[comparador]
+
+def _valor_update(nodo, item):
+    tipo = nodo[0]
+    if tipo in ('suma', 'resta'):
+        izquierdo, derecho = _valor_update(nodo[1], item), _valor_update(nodo[2], item)
+        if not (isinstance(izquierdo, Decimal) and isinstance(derecho, Decimal)) or isinstance(izquierdo, bool):
+            raise _validacion('An operand in the update expression has an incorrect data type')
+        return izquierdo + derecho if tipo == 'suma' else izquierdo - derecho
+    if tipo == 'if_not_exists':
+        valor = _resolver(item, nodo[1][1])
+        return _valor_update(nodo[2], item) if valor is _FALTA else valor
+    if tipo == 'list_append':
+        primero, segundo = _valor_update(nodo[1], item), _valor_update(nodo[2], item)
+        if not (isinstance(primero, list) and isinstance(segundo, list)):
+            raise _validacion('An operand in the update expression has an incorrect data type')
+        return primero + segundo
+    valor = _operando(nodo, item)
+    if valor is _FALTA:
+        raise _validacion('The provided expression refers to an attribute that does not exist in the item')
+    return valor
+
+def _asignar(item, partes, valor):
+    padre = _resolver(item, partes[:-1]) if len(partes) > 1 else item
+    ultima = partes[-1]
+    if isinstance(ultima, int):
+        if not isinstance(padre, list):
+            raise _validacion('The document path provided in the update expression is invalid for update')
+        if ultima < len(padre):
+            padre[ultima] = valor
+        else:
+            padre.append(valor)
+    else:
+        if not isinstance(padre, dict):
+            raise _validacion('The document path provided in the update expression is invalid for update')
+        padre[ultima] = valor
+
+def _quitar(item, partes):
+    padre = _resolver(item, partes[:-1]) if len(partes) > 1 else item
+    ultima = partes[-1]
+    if isinstance(ultima, int):
+        if isinstance(padre, list) and ultima < len(padre):
+            del padre[ultima]
+    elif isinstance(padre, dict):
+        padre.pop(ultima, None)
+
+def aplicar_update(acciones, item):
+    """Item resultante de aplicar el update; los valores se calculan sobre el item original"""
+    nuevo = copy.deepcopy(item)
+
+    valores_set = [(ruta[1], normalizar(_valor_update(valor, item))) for ruta, valor in acciones['SET']]
+    for partes, valor in valores_set:
+        _asignar(nuevo, partes, valor)
+
+    # Los índices de lista se quitan de mayor a menor para no correr las posiciones
+    orden_remove = lambda accion: [(0, parte) if isinstance(parte, str) else (1, -parte) for parte in accion[0][1]]
+    for ruta, _ in sorted(acciones['REMOVE'], key=orden_remove):
+        _quitar(nuevo, ruta[1])
+
+    for ruta, operando in acciones['ADD']:
+        valor = _operando(operando, item)
+        actual = _resolver(nuevo, ruta[1])
+        if actual is _FALTA:
+            _asignar(nuevo, ruta[1], valor)
+        elif isinstance(actual, Decimal) and isinstance(valor, Decimal) and not isinstance(actual, bool):
+            _asignar(nuevo, ruta[1], actual + valor)
+        elif isinstance(actual, set) and isinstance(valor, set) and tipo_dynamodb(actual) == tipo_dynamodb(valor):
+            _asignar(nuevo, ruta[1], actual | valor)
+        else:
+            raise _validacion('An operand in the update expression has an incorrect data type')
+
+    for ruta, operando in acciones['DELETE']:
+        valor = _operando(operando, item)
+        actual = _resolver(nuevo, ruta[1])
+        if actual is _FALTA:
+            continue
+        if not (isinstance(actual, set) and isinstance(valor, set)):
+            raise _validacion('An operand in the update expression has an incorrect data type')
+        restante = actual - valor
+        if restante:
+            _asignar(nuevo, ruta[1], restante)
+        else:
+            # DynamoDB no guarda sets vacíos: el atributo desaparece
+            _quitar(nuevo, ruta[1])
+
+    return nuevo
+
+def proyectar(item, rutas):
+    """Copia del item con solo los atributos de la proyección"""
+    proyectado = {}
+    for _, partes in rutas:
+        valor = _resolver(item, partes)
+        if valor is _FALTA:
+            continue
+        # Las rutas anidadas conservan el atributo de primer nivel completo
+        proyectado[partes[0]] = copy.deepcopy(item[partes[0]]) if len(partes) > 1 else copy.deepcopy(valor)
+    return proyectado
+
+# ---------------------------------------------------------------------------
+# Tablas
+# ---------------------------------------------------------------------------
+
+class _Expresiones:
+    """Expresiones de una petición con sus nombres y valores; admite condiciones de boto3 (Key, Attr)"""
+
+    def __init__(self, parametros):
+        self.nombres = dict(parametros.get('ExpressionAttributeNames') or {})
+        self.valores = {
+            clave: normalizar(valor)
+            for clave, valor in (parametros.get('ExpressionAttributeValues') or {}).items()
+        }
+        self._constructor = ConditionExpressionBuilder()
+        self.nombres_usados = set()
+        self.valores_usados = set()
+
+    def _texto(self, expresion, es_clave=False):
+        if isinstance(expresion, ConditionBase):
+            construida = self._constructor.build_expression(expresion, is_key_condition=es_clave)
+            self.nombres.update(construida.attribute_name_placeholders)
+            self.valores.update({clave: normalizar(valor) for clave, valor in construida.attribute_value_placeholders.items()})
+            return construida.condition_expression
+        return expresion
+
+    def _parsear(self, expresion, regla, es_clave=False):
+        parser = _Parser(self._texto(expresion, es_clave), self.nombres, self.valores)
+        resultado = getattr(parser, regla)()
+        parser.fin()
+        self.nombres_usados |= parser.nombres_usados
+        self.valores_usados |= parser.valores_usados
+        return resultado
+
+    def condicion(self, expresion, es_clave=False):
+        return self._parsear(expresion, 'condicion', es_clave) if expresion is not None else None
+
+    def update(self, expresion):
+        return self._parsear(expresion, 'update')
+
+    def proyeccion(self, expresion):
+        return self._parsear(expresion, 'proyeccion') if expresion else None
+
+    def verificar_uso(self, operacion):
+        """DynamoDB rechaza nombres y valores declarados que ninguna expresión usa"""
+        for tipo, declarados, usados in (('Values', self.valores, self.valores_usados), ('Names', self.nombres, self.nombres_usados)):
+            sin_usar = set(declarados) - usados
+            if sin_usar:
+                raise error_dynamodb('ValidationException', f'Value provided in ExpressionAttribute{tipo} unused in expressions: keys: {{{", ".join(sorted(sin_usar))}}}', operacion)
+
+class _Indice:
+    def __init__(self, nombre, particion, orden=None, proyeccion=None):
+        self.nombre = nombre
+        self.particion = particion
+        self.orden = orden
+        # None: ALL; tupla: INCLUDE de esos atributos (vacía para KEYS_ONLY)
+        self.proyeccion = proyeccion
+
+class TablaEnMemoria:
+    """Tabla con la interfaz de boto3.resource('dynamodb').Table"""
+
+    def __init__(self, base, nombre, particion, orden=None, indices=(), stream=False):
+        self.base = base
+        self.name = self.table_name = nombre
+        self.particion = particion
+        self.orden = orden
+        self.indices = {indice.nombre: indice for indice in indices}
+        self.stream = stream
+        self.items = {}
+
+    # Claves
+
+    def atributos_clave(self):
+        return [self.particion] + ([self.orden] if self.orden else [])
+
+    def _clave(self, item, operacion):
+        clave = []
+        for atributo in self.atributos_clave():
+            valor = item.get(atributo, _FALTA)
+            if valor is _FALTA or tipo_dynamodb(valor) not in ('S', 'N', 'B') or valor == '':
+                raise error_dynamodb('ValidationException', 'The provided key element does not match the schema', operacion)
+            clave.append(valor)
+        return tuple(clave)
+
+    def _clave_exacta(self, key, operacion):
+        key = {atributo: normalizar(valor) for atributo, valor in key.items()}
+        if set(key) != set(self.atributos_clave()):
+            raise error_dynamodb('ValidationException', 'The provided key element does not match the schema', operacion)
+        return self._clave(key, operacion)
+
+    def _solo_clave(self, item):
+        return {atributo: item[atributo] for atributo in self.atributos_clave()}
+
+    # Escrituras (se usan también desde las transacciones)
+
+    def _verificar(self, condicion, item, operacion):
+        if condicion is not None and not evaluar_condicion(condicion, item if item is not None else {}):
+            raise error_dynamodb('ConditionalCheckFailedException', 'The conditional request failed', operacion)
+
+    def preparar_put(self, parametros, operacion='PutItem'):
+        expresiones = _Expresiones(parametros)
+        item = normalizar(parametros['Item'])
+        clave = self._clave(item, operacion)
+        self._verificar(expresiones.condicion(parametros.get('ConditionExpression')), self.items.get(clave), operacion)
+        expresiones.verificar_uso(operacion)
+        return clave, item
+
+    def preparar_update(self, parametros, operacion='UpdateItem'):
+        expresiones = _Expresiones(parametros)
+        clave = self._clave_exacta(parametros['Key'], operacion)
+        actual = self.items.get(clave)
+        self._verificar(expresiones.condicion(parametros.get('ConditionExpression')), actual, operacion)
+        acciones = expresiones.update(parametros['UpdateExpression'])
+        expresiones.verificar_uso(operacion)
+        for accion in ('SET', 'REMOVE', 'ADD', 'DELETE'):
+            for ruta, _ in acciones[accion]:
+                if ruta[1][0] in self.atributos_clave():
+                    raise error_dynamodb('ValidationException', f'Cannot update attribute {ruta[1][0]}. This attribute is part of the key', operacion)
+        base_item = actual if actual is not None else {atributo: valor for atributo, valor in zip(self.atributos_clave(), clave)}
+        nuevo = aplicar_update(acciones, base_item)
+        modificados = {ruta[1][0] for lista in acciones.values() for ruta, _ in lista}
+        return clave, nuevo, modificados
+
+    def preparar_delete(self, parametros, operacion='DeleteItem'):
+        expresiones = _Expresiones(parametros)
+        clave = self._clave_exacta(parametros['Key'], operacion)
+        self._verificar(expresiones.condicion(parametros.get('ConditionExpression')), self.items.get(clave), operacion)
+        expresiones.verificar_uso(operacion)
+        return clave
+
+    def preparar_verificacion(self, parametros, operacion='ConditionCheck'):
+        expresiones = _Expresiones(parametros)
+        clave = self._clave_exacta(parametros['Key'], operacion)
+        self._verificar(expresiones.condicion(parametros['ConditionExpression']), self.items.get(clave), operacion)
+        expresiones.verificar_uso(operacion)
+        return clave
+
+    def guardar(self, clave, nuevo):
+        """Escribe (o borra, con nuevo None) el item y registra el cambio en el stream"""
+        anterior = self.items.get(clave)
+        if nuevo is None:
+            if anterior is None:
+                return
+            del self.items[clave]
+        else:
+            self.items[clave] = nuevo
+        if self.stream:
+            evento = 'REMOVE' if nuevo is None else ('MODIFY' if anterior is not None else 'INSERT')
+            registro = {
+                'eventName': evento,
+                'eventSourceARN': f'arn:aws:dynamodb:local:tabla/{self.name}/stream',
+                'dynamodb': {'Keys': {atributo: _serializador.serialize(valor) for atributo, valor in self._solo_clave(anterior if nuevo is None else nuevo).items()}}
+            }
+            if nuevo is not None:
+                registro['dynamodb']['NewImage'] = {atributo: _serializador.serialize(valor) for atributo, valor in nuevo.items()}
+            self.base.stream.append(registro)
+
+    def cargar(self, item):
+        """Carga un item sin contarlo como llamada (datos iniciales de una prueba o simulación)"""
+        with self.base.lock:
+            item = normalizar(item)
+            self.items[self._clave(item, 'PutItem')] = item
+
+    # API de boto3
+
+    def _contar(self, operacion):
+        self.base.llamadas[(operacion, self.name)] += 1
+
+    def get_item(self, Key, ConsistentRead=False, ProjectionExpression=None, ExpressionAttributeNames=None):
+        with self.base.lock:
+            self._contar('get_item')
+            item = self.items.get(self._clave_exacta(Key, 'GetItem'))
+            if item is None:
+                return {}
+            rutas = _Expresiones({'ExpressionAttributeNames': ExpressionAttributeNames}).proyeccion(ProjectionExpression)
+            return {'Item': proyectar(item, rutas) if rutas else copy.deepcopy(item)}
+
+    def put_item(self, Item, ReturnValues='NONE', **parametros):
+        with self.base.lock:
+            self._contar('put_item')
+            clave, item = self.preparar_put({'Item': Item, **parametros})
+            anterior = self.items.get(clave)
+            self.guardar(clave, item)
+            return {'Attributes': copy.deepcopy(anterior)} if ReturnValues == 'ALL_OLD' and anterior else {}
+
+    def update_item(self, Key, UpdateExpression, ReturnValues='NONE', **parametros):
+        with self.base.lock:
+            self._contar('update_item')
+            clave, nuevo, modificados = self.preparar_update({'Key': Key, 'UpdateExpression': UpdateExpression, **parametros})
+            anterior = self.items.get(clave) or {}
+            self.guardar(clave, nuevo)
+            if ReturnValues == 'ALL_NEW':
+                return {'Attributes': copy.deepcopy(nuevo)}
+            if ReturnValues == 'ALL_OLD':
+                return {'Attributes': copy.deepcopy(anterior)} if anterior else {}
+            if ReturnValues in ('UPDATED_NEW', 'UPDATED_OLD'):
+                fuente = nuevo if ReturnValues == 'UPDATED_NEW' else anterior
+                return {'Attributes': {atributo: copy.deepcopy(fuente[atributo]) for atributo in modificados if atributo in fuente}}
+            return {}
+
+    def delete_item(self, Key, ReturnValues='NONE', **parametros):
+        with self.base.lock:
+            self._contar('delete_item')
+            clave = self.preparar_delete({'Key': Key, **parametros})
+            anterior = self.items.get(clave)
+            self.guardar(clave, None)
+            return {'Attributes': copy.deepcopy(anterior)} if ReturnValues == 'ALL_OLD' and anterior else {}
+
+    def _candidatos(self, indice):
+        """Items visibles en la tabla o en el índice (disperso: solo los que tienen sus claves)"""
+        if indice is None:
+            return list(self.items.values())
+        claves = [indice.particion] + ([indice.orden] if indice.orden else [])
+        visibles = []
+        for item in self.items.values():
+            if any(tipo_dynamodb(item.get(atributo)) not in ('S', 'N', 'B') for atributo in claves):
+                continue
+            if indice.proyeccion is not None:
+                incluidos = set(claves) | set(self.atributos_clave()) | set(indice.proyeccion)
+                item = {atributo: valor for atributo, valor in item.items() if atributo in incluidos}
+            visibles.append(item)
+        return visibles
+
+    def _orden_item(self, item, indice, para_query):
+        """Posición del item en el resultado: claves del índice (o de la tabla) y luego las de la tabla"""
+        claves = list(self.atributos_clave())
+        if indice is not None:
+            claves = [indice.particion] + ([indice.orden] if indice.orden else []) + claves
+        if para_query:
+            # La condición de clave fija la partición
+            claves = claves[1:]
+        return tuple(_valor_orden(item.get(atributo)) for atributo in claves)
+
+    def _leer(self, operacion, parametros, condicion_clave=None):
+        indice = None
+        if parametros.get('IndexName'):
+            indice = self.indices.get(parametros['IndexName'])
+            if indice is None:
+                raise error_dynamodb('ValidationException', f'The table does not have the specified index: {parametros["IndexName"]}', operacion)
+            if parametros.get('ConsistentRead'):
+                raise error_dynamodb('ValidationException', 'Consistent reads are not supported on global secondary indexes', operacion)
+
+        expresiones = _Expresiones(parametros)
+        clave = expresiones.condicion(condicion_clave, es_clave=True)
+        filtro = expresiones.condicion(parametros.get('FilterExpression'))
+        rutas = expresiones.proyeccion(parametros.get('ProjectionExpression'))
+        expresiones.verificar_uso(operacion)
+
+        para_query = clave is not None
+        candidatos = [item for item in self._candidatos(indice) if clave is None or evaluar_condicion(clave, item)]
+        candidatos.sort(key=lambda item: self._orden_item(item, indice, para_query), reverse=para_query and parametros.get('ScanIndexForward') is False)
+
+        inicio = parametros.get('ExclusiveStartKey')
+        if inicio:
+            inicio = normalizar(inicio)
+            marca = self._orden_item(inicio, indice, para_query)
+            if para_query and parametros.get('ScanIndexForward') is False:
+                candidatos = [item for item in candidatos if self._orden_item(item, indice, para_query) < marca]
+            else:
+                candidatos = [item for item in candidatos if self._orden_item(item, indice, para_query) > marca]
+
+        limite = parametros.get('Limit') or self.base.limite_pagina
+        pagina = candidatos[:limite]
+        items = [item for item in pagina if filtro is None or evaluar_condicion(filtro, item)]
+
+        respuesta = {'Count': len(items), 'ScannedCount': len(pagina)}
+        if parametros.get('Select') != 'COUNT':
+            respuesta['Items'] = [proyectar(item, rutas) if rutas else copy.deepcopy(item) for item in items]
+        if len(candidatos) > limite:
+            ultimo = pagina[-1]
+            atributos = set(self.atributos_clave())
+            if indice is not None:
+                atributos |= {indice.particion} | ({indice.orden} if indice.orden else set())
+            respuesta['LastEvaluatedKey'] = {atributo: copy.deepcopy(ultimo[atributo]) for atributo in atributos}
+        return respuesta
+
+    def query(self, KeyConditionExpression, **parametros):
+        with self.base.lock:
+            self._contar('query')
+            return self._leer('Query', parametros, KeyConditionExpression)
+
+    def scan(self, **parametros):
+        with self.base.lock:
+            self._contar('scan')
+            return self._leer('Scan', parametros)
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _LoteEscritura(self, overwrite_by_pkeys)
+
+class _LoteEscritura:
+    """batch_writer: acumula puts y deletes y los escribe de a MAX_ITEMS_LOTE por llamada"""
+
+    def __init__(self, tabla, overwrite_by_pkeys=None):
+        self.tabla = tabla
+        self.sobrescribir = overwrite_by_pkeys
+        self.pendientes = []
+
+    def _agregar(self, tipo, datos):
+        if self.sobrescribir:
+            clave = tuple(datos.get(atributo) for atributo in self.sobrescribir)
+            self.pendientes = [(t, d) for t, d in self.pendientes if tuple(d.get(a) for a in self.sobrescribir) != clave]
+        self.pendientes.append((tipo, datos))
+        if len(self.pendientes) >= MAX_ITEMS_LOTE:
+            self._escribir()
+
+    def put_item(self, Item):
+        self._agregar('put', Item)
+
+    def delete_item(self, Key):
+        self._agregar('delete', Key)
+
+    def _escribir(self):
+        if not self.pendientes:
+            return
+        pendientes, self.pendientes = self.pendientes, []
+        with self.tabla.base.lock:
+            self.tabla._contar('batch_write_item')
+            escrituras = []
+            for tipo, datos in pendientes:
+                if tipo == 'put':
+                    item = normalizar(datos)
+                    escrituras.append((self.tabla._clave(item, 'BatchWriteItem'), item))
+                else:
+                    escrituras.append((self.tabla._clave_exacta(datos, 'BatchWriteItem'), None))
+            if len({clave for clave, _ in escrituras}) < len(escrituras):
+                raise error_dynamodb('ValidationException', 'Provided list of item keys contains duplicates', 'BatchWriteItem')
+            for clave, item in escrituras:
+                self.tabla.guardar(clave, item)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self._escribir()
+
+class _ClienteEnMemoria:
+    """meta.client del recurso: operaciones sobre varias tablas"""
+
+    def __init__(self, base):
+        self.base = base
+
+    def batch_get_item(self, RequestItems):
+        return self.base.batch_get_item(RequestItems=RequestItems)
+
+    def transact_write_items(self, TransactItems, **parametros):
+        base = self.base
+        if len(TransactItems) > MAX_ITEMS_TRANSACCION:
+            raise error_dynamodb('ValidationException', f'Member must have length less than or equal to {MAX_ITEMS_TRANSACCION}', 'TransactWriteItems')
+
+        with base.lock:
+            tablas = sorted({next(iter(operacion.values()))['TableName'] for operacion in TransactItems})
+            base.llamadas[('transact_write_items', ','.join(tablas))] += 1
+
+            escrituras = []
+            motivos = []
+            for operacion in TransactItems:
+                (tipo, datos), = operacion.items()
+                tabla = base.Table(datos['TableName'])
+                try:
+                    if tipo == 'Put':
+                        clave, item = tabla.preparar_put(datos, 'TransactWriteItems')
+                    elif tipo == 'Update':
+                        clave, item, _ = tabla.preparar_update(datos, 'TransactWriteItems')
+                    elif tipo == 'Delete':
+                        clave, item = tabla.preparar_delete(datos, 'TransactWriteItems'), None
+                    elif tipo == 'ConditionCheck':
+                        clave, item = tabla.preparar_verificacion(datos, 'TransactWriteItems'), _FALTA
+                    else:
+                        raise error_dynamodb('ValidationException', f'Unknown operation {tipo}', 'TransactWriteItems')
+                    motivos.append({'Code': 'None'})
+                except ClientError as e:
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        raise
+                    clave, item = e, _FALTA
+                    motivos.append({'Code': 'ConditionalCheckFailed', 'Message': 'The conditional request failed'})
+                escrituras.append((tabla, clave, item))
+
+            claves = [(tabla.name, clave) for tabla, clave, _ in escrituras if not isinstance(clave, ClientError)]
+            if len(set(claves)) < len(claves):
+                raise error_dynamodb('ValidationException', 'Transaction request cannot include multiple operations on one item', 'TransactWriteItems')
+
+            if any(motivo['Code'] != 'None' for motivo in motivos):
+                codigos = ', '.join(motivo['Code'] for motivo in motivos)
+                error = error_dynamodb('TransactionCanceledException', f'Transaction cancelled, please refer cancellation reasons for specific reasons [{codigos}]', 'TransactWriteItems')
+                error.response['CancellationReasons'] = motivos
+                raise error
+
+            for tabla, clave, item in escrituras:
+                if item is not _FALTA:
+                    tabla.guardar(clave, item)
+            return {}
+
+class DynamoDBEnMemoria:
+    """Recurso de DynamoDB en memoria con la interfaz de boto3.resource('dynamodb')"""
+
+    def __init__(self, limite_pagina=LIMITE_PAGINA):
+        self.tablas = {}
+        self.lock = threading.RLock()
+        self.llamadas = Counter()
+        self.stream = []
+        self.limite_pagina = limite_pagina
+        self.meta = SimpleNamespace(client=_ClienteEnMemoria(self))
+
+    def crear_tabla(self, nombre, particion, orden=None, indices=(), stream=False):
+        """indices: tuplas (nombre, particion, orden, proyeccion) con proyeccion None para ALL"""
+        tabla = TablaEnMemoria(self, nombre, particion, orden, [_Indice(*indice) for indice in indices], stream)
+        self.tablas[nombre] = tabla
+        return tabla
+
+    def Table(self, nombre):
+        if nombre not in self.tablas:
+            raise error_dynamodb('ResourceNotFoundException', f'Requested resource not found: Table: {nombre} not found', 'DescribeTable')
+        return self.tablas[nombre]
+
+    def batch_get_item(self, RequestItems):
+        with self.lock:
+            self.llamadas[('batch_get_item', ','.join(sorted(RequestItems)))] += 1
+            if sum(len(solicitud['Keys']) for solicitud in RequestItems.values()) > MAX_CLAVES_BATCH_GET:
+                raise error_dynamodb('ValidationException', f'Too many items requested for the BatchGetItem call', 'BatchGetItem')
+
+            respuestas = {}
+            for nombre, solicitud in RequestItems.items():
+                tabla = self.Table(nombre)
+                claves = [tabla._clave_exacta(key, 'BatchGetItem') for key in solicitud['Keys']]
+                if len(set(claves)) < len(claves):
+                    raise error_dynamodb('ValidationException', 'Provided list of item keys contains duplicates', 'BatchGetItem')
+                rutas = _Expresiones(solicitud).proyeccion(solicitud.get('ProjectionExpression'))
+                respuestas[nombre] = [
+                    proyectar(tabla.items[clave], rutas) if rutas else copy.deepcopy(tabla.items[clave])
+                    for clave in claves if clave in tabla.items
+                ]
+            return {'Responses': respuestas, 'UnprocessedKeys': {}}
+
+    def drenar_stream(self):
+        """Registros de stream acumulados desde la última llamada"""
+        with self.lock:
+            registros, self.stream = self.stream, []
+            return registros
+
+    def metricas(self):
+        """Llamadas por operación y tabla"""
+        por_operacion = defaultdict(dict)
+        for (operacion, tabla), cantidad in sorted(self.llamadas.items()):
+            por_operacion[operacion][tabla] = cantidad
+        return dict(por_operacion)
@@ -0,0 +1,1048 @@
+"""
+Generador de carga sintética a partir de los escenarios de postman_collection.json.
+
+Cada escenario de la carpeta "Test Scenarios" se convierte en un perfil de
+tráfico (tasa de llegada, locales, empleados por rol, demora de confirmación)
+que se puede ejecutar de tres formas:
+
+- simulado: simulación de eventos discretos del workflow (admisión, etapas con
+  reintentos, capacidad de empleados y confirmación del usuario) con la misma
+  configuración que el despliegue. No necesita AWS y simula horas en segundos.
+- proceso: ejecuta los lambda_handler reales en este proceso contra tablas de
+  DynamoDB en memoria, con la definición generada del Step Function
+  interpretada en tiempo simulado, notificaciones locales y un usuario que
+  confirma al recibir la notificación. Tampoco necesita AWS y además cuenta las
+  llamadas a DynamoDB y Step Functions que haría el despliegue.
+- http: crea pedidos de prueba en la tabla de pedidos (TABLE_PEDIDOS, solo
+  tablas de prueba y con --sembrar) y los envía al API desplegado con las
+  peticiones de la carpeta "Workflow Completo" (iniciar y confirmar-recepción),
+  en un local de carga (prefijo CARGA-) que debe tener empleados cargados. Al
+  terminar borra los pedidos creados.
+
+En todos los casos reporta throughput, tasa de saturación y latencia de punta a punta.
+
+Uso:
+    python carga/generador_carga.py --listar
+    python carga/generador_carga.py "Flujo Completo - Demo Mode" --tasa 2 --duracion 600
+    python carga/generador_carga.py "Flujo Completo - Modo Realista" --locales 3 --empleados 4,3,6
+    python carga/generador_carga.py "Flujo Completo - Demo Mode" --modo proceso --duracion 300
+    TABLE_PEDIDOS=ChinaWok-Pedidos-dev python carga/generador_carga.py "Flujo Completo - Demo Mode" \
+        --modo http --base-url https://.../dev --sembrar
+"""
+import argparse
+import contextlib
+import heapq
+import importlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+
+from boto3.resources.base import ServiceResource
+from botocore.client import BaseClient
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_COLECCION = os.path.join(RAIZ, 'postman_collection.json')
+
+sys.path.append(os.path.join(RAIZ, 'stepfunctions'))
+sys.path.append(os.path.join(RAIZ, 'workflow'))
+from generar_definicion import generar_definicion, ETAPAS, MAX_INTENTOS, ESPERA_REINTENTO_SEGUNDOS, TIMEOUT_CONFIRMACION_SEGUNDOS
+from utils import dynamodb_helper, limitador, notificaciones
+from utils.admision import decidir_admision, DURACION_CICLO_SEGUNDOS
+from utils.dynamodb_helper import (
+    CAPACIDAD_POR_ROL,
+    INDICE_EMPLEADOS_DISPONIBILIDAD,
+    INDICE_PEDIDOS_EN_ESPERA,
+    INDICE_PEDIDOS_POR_ARCHIVAR,
+    particiones_local,
+    particion_empleado,
+    particion_pedido,
+    _atributo_libres,
+    _atributo_totales
+)
+from utils.historial import nueva_entrada
+from utils.limitador import TablaLimitada, CONFIG_SIN_REINTENTOS
+from dynamodb_en_memoria import DynamoDBEnMemoria
+from stepfunctions_en_memoria import StepFunctionsEnMemoria, LambdaEnMemoria, ErrorEstado, invocar_handler
+
+ROL_POR_ETAPA = {'cocinar': 'Cocinero', 'empacar': 'Despachador', 'enviar': 'Repartidor'}
+ROLES = ['Cocinero', 'Despachador', 'Repartidor']
+
+# Los pedidos de carga van a locales con este prefijo y notifican al simulador
+# de buzones de SES, que acepta el correo sin entregarlo a nadie
+PREFIJO_LOCAL_CARGA = 'CARGA-'
+CORREO_CARGA = 'success@simulator.amazonses.com'
+# Los pedidos sembrados expiran aunque el generador se interrumpa antes de limpiarlos
+MARGEN_EXPIRACION_SEGUNDOS = 24 * 3600
+
+# Tráfico por defecto de cada escenario; la línea de comandos los sobrescribe.
+# tasa: pedidos por segundo en total; empleados: cantidad por rol en cada local
+PERFILES = {
+    'Flujo Completo - Demo Mode': {
+        'tasa': 0.5,
+        'duracion': 600,
+        'locales': 1,
+        'empleados': {'Cocinero': 2, 'Despachador': 2, 'Repartidor': 2},
+        'confirmacion': 'exp:20'
+    },
+    'Flujo Completo - Modo Realista': {
+        'tasa': 1 / 60,
+        'duracion': 4 * 3600,
+        'locales': 1,
+        'empleados': {'Cocinero': 4, 'Despachador': 2, 'Repartidor': 6},
+        'confirmacion': 'exp:600'
+    },
+    'Test - Sin Empleados Disponibles': {
+        'tasa': 0.2,
+        'duracion': 300,
+        'locales': 1,
+        'empleados': {'Cocinero': 0, 'Despachador': 0, 'Repartidor': 0},
+        'confirmacion': 'fijo:10'
+    }
+}
+
+def cargar_escenarios(ruta=RUTA_COLECCION):
+    """Escenarios de la colección: nombre -> {local_id, modo_realista, descripcion}"""
+    with open(ruta, encoding='utf-8') as f:
+        coleccion = json.load(f)
+
+    carpeta = next(item for item in coleccion['item'] if item['name'] == 'Test Scenarios')
+    escenarios = {}
+    for item in carpeta['item']:
+        # El body usa variables de Postman ({{$timestamp}}) que no son JSON válido
+        crudo = item['request'].get('body', {}).get('raw', '{}')
+        body = json.loads(re.sub(r'\{\{[^}]+\}\}', '0', crudo))
+        contadores = body.get('contadores', {})
+        escenarios[item['name']] = {
+            'local_id': body.get('local_id', 'LOCAL001'),
+            'usuario_correo': body.get('usuario_correo'),
+            'modo_realista': str(contadores.get('modo_realista', 'false')).lower() == 'true',
+            'descripcion': item['request'].get('description', '')
+        }
+    return escenarios
+
+def peticiones_workflow(ruta=RUTA_COLECCION):
+    """Peticiones de la carpeta "Workflow Completo": nombre de endpoint -> body (plantilla)"""
+    with open(ruta, encoding='utf-8') as f:
+        coleccion = json.load(f)
+
+    carpeta = next(item for item in coleccion['item'] if 'Workflow Completo' in item['name'])
+    peticiones = {}
+    for item in carpeta['item']:
+        endpoint = item['request']['url']['path'][-1]
+        peticiones[endpoint] = item['request']['body']['raw']
+    return peticiones
+
+def crear_muestreador(especificacion):
+    """Distribución de la demora de confirmación: exp:<media>, fijo:<s> o uniforme:<min>:<max>"""
+    tipo, *parametros = especificacion.split(':')
+    valores = [float(valor) for valor in parametros]
+    if tipo == 'exp':
+        return lambda: random.expovariate(1 / valores[0])
+    if tipo == 'fijo':
+        return lambda: valores[0]
+    if tipo == 'uniforme':
+        return lambda: random.uniform(valores[0], valores[1])
+    raise ValueError(f'Distribución desconocida: {especificacion}')
+
+def _pedido_inicial(local_id, pedido_id, usuario_correo):
+    """Pedido en estado "procesando", como lo deja el API de pedidos"""
+    return {
+        'local_id': particion_pedido(local_id, pedido_id),
+        'pedido_id': pedido_id,
+        'usuario_correo': usuario_correo,
+        'estado': 'procesando',
+        'historial_estados': [nueva_entrada('procesando')]
+    }
+
+def _locales(local_base, cantidad):
+    return [local_base] + [f'{local_base}-{indice}' for indice in range(1, cantidad)]
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+# ---------------------------------------------------------------------------
+# Modo simulado
+# ---------------------------------------------------------------------------
+
+class _Local:
+    """Estado de un local en la simulación: slots ocupados por rol y pedidos en curso.
+
+    Hace de tabla de capacidad en memoria para la regla de admisión del
+    workflow y cuenta las llamadas que el despliegue haría a esa tabla.
+    """
+
+    def __init__(self, local_id, empleados):
+        self.local_id = local_id
+        self.slots = {role: empleados.get(role, 0) * CAPACIDAD_POR_ROL[role] for role in ROLES}
+        self.ocupados = {role: 0 for role in ROLES}
+        self.en_curso = 0
+        self.ocupacion = {role: 0.0 for role in ROLES}
+        self.ultimo_cambio = 0.0
+        self.llamadas = Counter()
+
+    def acumular(self, ahora):
+        for role in ROLES:
+            self.ocupacion[role] += self.ocupados[role] * (ahora - self.ultimo_cambio)
+        self.ultimo_cambio = ahora
+
+    def capacidad(self):
+        """Contadores del local como los retorna obtener_capacidad_local"""
+        # Una lectura por partición de contadores del local
+        self.llamadas['get_item'] += len(particiones_local(self.local_id))
+        contadores = {'pedidos_en_curso': self.en_curso}
+        for role in ROLES:
+            contadores[_atributo_libres(role)] = self.slots[role] - self.ocupados[role]
+            contadores[_atributo_totales(role)] = self.slots[role]
+        return contadores
+
+    def reservar(self, limite):
+        """Como reservar_cupo_pedido: update condicionado sobre pedidos_en_curso"""
+        particiones = particiones_local(self.local_id)
+        if len(particiones) > 1:
+            # Un local caliente relee todos los shards para comparar la suma
+            self.llamadas['get_item'] += len(particiones)
+        self.llamadas['update_item'] += 1
+        if self.en_curso >= limite:
+            return False
+        self.en_curso += 1
+        return True
+
+    def liberar_cupo(self):
+        self.llamadas['update_item'] += 1
+        self.en_curso -= 1
+
+    def ajustar_ocupados(self, role, delta, ahora):
+        """Ocupa (1) o libera (-1) un slot del rol; ajustar_slots_libres hace un update"""
+        self.acumular(ahora)
+        self.ocupados[role] += delta
+        self.llamadas['update_item'] += 1
+
+    def admitir(self, modo_realista):
+        """Evalúa la admisión con la regla del workflow. Retorna (decision, eta)"""
+        admision = decidir_admision(self.capacidad(), DURACION_CICLO_SEGUNDOS[modo_realista], self.reservar)
+        return admision['decision'], admision['eta_segundos']
+
+def simular(perfil, modo_realista, semilla=None, local_base='LOCAL001'):
+    """Simula el perfil y retorna las métricas"""
+    aleatorio = random.Random(semilla)
+    random.seed(semilla)
+    muestrear_confirmacion = crear_muestreador(perfil['confirmacion'])
+    clave_espera = 'realista' if modo_realista else 'demo'
+
+    locales = [_Local(local_id, perfil['empleados']) for local_id in _locales(local_base, perfil['locales'])]
+    eventos = []
+    secuencia = 0
+
+    def programar(instante, tipo, pedido):
+        nonlocal secuencia
+        secuencia += 1
+        heapq.heappush(eventos, (instante, secuencia, tipo, pedido))
+
+    # Llegadas de Poisson repartidas al azar entre los locales
+    instante = 0.0
+    numero = 0
+    while True:
+        instante += aleatorio.expovariate(perfil['tasa'])
+        if instante > perfil['duracion']:
+            break
+        numero += 1
+        programar(instante, 'llegada', {'id': numero, 'local': aleatorio.randrange(len(locales)), 'llegada': instante})
+
+    resultados = Counter()
+    latencias = []
+    reintentos = Counter()
+    ahora = 0.0
+
+    while eventos:
+        ahora, _, tipo, pedido = heapq.heappop(eventos)
+        local = locales[pedido['local']]
+
+        if tipo == 'llegada':
+            resultados['generados'] += 1
+            decision, eta = local.admitir(modo_realista)
+            if decision == 'iniciar':
+                pedido.update({'etapa': 0, 'intentos': 0, 'role': None})
+                programar(ahora, 'intentar', pedido)
+            elif decision == 'diferir' and not pedido.get('diferido'):
+                # El cliente reintenta una vez pasado el ETA que devuelve iniciar
+                resultados['diferidos'] += 1
+                pedido['diferido'] = True
+                programar(ahora + eta, 'reintento_cliente', pedido)
+            else:
+                resultados['rechazados'] += 1
+
+        elif tipo == 'reintento_cliente':
+            decision, _ = local.admitir(modo_realista)
+            if decision == 'iniciar':
+                pedido.update({'etapa': 0, 'intentos': 0, 'role': None})
+                programar(ahora, 'intentar', pedido)
+            else:
+                resultados['rechazados'] += 1
+
+        elif tipo == 'intentar':
+            etapa = ETAPAS[pedido['etapa']]
+            role = ROL_POR_ETAPA[etapa['clave']]
+            if local.ocupados[role] < local.slots[role]:
+                local.ajustar_ocupados(role, 1, ahora)
+                # El empleado de la etapa anterior se libera al asignar el nuevo
+                if pedido['role']:
+                    local.ajustar_ocupados(pedido['role'], -1, ahora)
+                pedido['role'] = role
+                pedido['intentos'] = 0
+                programar(ahora + etapa['espera'][clave_espera], 'fin_etapa', pedido)
+            else:
+                pedido['intentos'] += 1
+                reintentos[role] += 1
+                if pedido['intentos'] >= MAX_INTENTOS:
+                    # ServicioSaturado: liberar_pedido suelta al empleado y el cupo
+                    if pedido['role']:
+                        local.ajustar_ocupados(pedido['role'], -1, ahora)
+                    local.liberar_cupo()
+                    resultados['saturados'] += 1
+                else:
+                    programar(ahora + ESPERA_REINTENTO_SEGUNDOS, 'intentar', pedido)
+
+        elif tipo == 'fin_etapa':
+            pedido['etapa'] += 1
+            if pedido['etapa'] < len(ETAPAS):
+                programar(ahora, 'intentar', pedido)
+            else:
+                demora = min(muestrear_confirmacion(), TIMEOUT_CONFIRMACION_SEGUNDOS)
+                programar(ahora + demora, 'confirmado', pedido)
+
+        elif tipo == 'confirmado':
+            local.ajustar_ocupados(pedido['role'], -1, ahora)
+            local.liberar_cupo()
+            resultados['completados'] += 1
+            latencias.append(ahora - pedido['llegada'])
+
+    for local in locales:
+        local.acumular(ahora)
+
+    horizonte = max(ahora, perfil['duracion'])
+    utilizacion = {}
+    for role in ROLES:
+        slots = sum(local.slots[role] for local in locales)
+        ocupacion = sum(local.ocupacion[role] for local in locales)
+        utilizacion[role] = ocupacion / (slots * horizonte) if slots else None
+
+    return {
+        'resultados': dict(resultados),
+        'latencias': latencias,
+        'horizonte_segundos': horizonte,
+        'utilizacion': utilizacion,
+        'reintentos_por_rol': dict(reintentos),
+        'llamadas_tabla_capacidad': dict(sum((local.llamadas for local in locales), Counter()))
+    }
+
+# ---------------------------------------------------------------------------
+# Modo en proceso
+# ---------------------------------------------------------------------------
+
+# Handlers que corren en el proceso: los del API, los del Step Function y los
+# programados. El Step Function y lambda.invoke los ubican por su nombre.
+MODULOS_EN_PROCESO = [
+    'router',
+    'iniciar_workflow',
+    'confirmar_recepcion',
+    'cocinar',
+    'empacar',
+    'enviar',
+    'confirmar',
+    'notificar_usuario',
+    'esperar_empleado',
+    'liberar_pedido',
+    'asignar_empleados',
+    'despachar_notificaciones',
+    'reconciliar_capacidad'
+]
+
+# Disparadores programados del despliegue (serverless.yml): módulo -> segundos
+PROGRAMADAS = {
+    'despachar_notificaciones': 60,
+    'asignar_empleados': 60,
+    'reconciliar_capacidad': 900
+}
+# Stream del outbox: ventana y tamaño de lote del disparador de despachar_notificaciones
+VENTANA_STREAM_SEGUNDOS = 5
+LOTE_STREAM = 100
+
+# Todas las invocaciones comparten este proceso, así que el presupuesto del
+# limitador por contenedor no aplica: se deja tan alto que nunca espera
+PRESUPUESTO_SIN_LIMITE = 1e9
+
+STATE_MACHINE_ARN_LOCAL = 'arn:aws:states:local:000000000000:stateMachine:pedido-workflow'
+
+def crear_tablas(dynamodb):
+    """Tablas del workflow con las claves, índices y stream del despliegue"""
+    dynamodb.crear_tabla(os.environ['TABLE_PEDIDOS'], 'local_id', 'pedido_id', [
+        (INDICE_PEDIDOS_EN_ESPERA, 'espera_local_rol', 'espera_desde', ('esperando_empleado', 'prioridad', 'inicio_pedido', 'token_espera_empleado')),
+        (INDICE_PEDIDOS_POR_ARCHIVAR, 'por_archivar', 'finalizado_en', None)
+    ])
+    dynamodb.crear_tabla(os.environ['TABLE_EMPLEADOS'], 'local_id', 'dni', [
+        (INDICE_EMPLEADOS_DISPONIBILIDAD, 'local_id', 'role', ('carga_actual', 'ocupado', 'capacidad', 'calificacion_prom'))
+    ])
+    dynamodb.crear_tabla(os.environ['TABLE_USUARIOS'], 'correo')
+    dynamodb.crear_tabla(os.environ['TABLE_IDEMPOTENCIA'], 'clave')
+    dynamodb.crear_tabla(os.environ['TABLE_CAPACIDAD_LOCALES'], 'local_id')
+    dynamodb.crear_tabla(os.environ['TABLE_NOTIFICACIONES'], 'notificacion_id', stream=True)
+
+def _cargar_empleados(tabla, local_id, empleados):
+    for role in ROLES:
+        for numero in range(1, empleados.get(role, 0) + 1):
+            dni = f'{local_id}-{role[:3].upper()}{numero:03d}'
+            tabla.cargar({
+                'local_id': particion_empleado(local_id, dni),
+                'dni': dni,
+                'nombre': role,
+                'apellido': str(numero),
+                'role': role,
+                'calificacion_prom': Decimal('4.5'),
+                'carga_actual': 0,
+                'ocupado': False
+            })
+
+class _RelojSimulado:
+    """Reemplaza al módulo time en los módulos del workflow: el tiempo solo avanza con la agenda.
+
+    Un sleep dentro de un handler adelanta el reloj, como si la invocación
+    hubiera tardado eso.
+    """
+
+    def __init__(self, inicio):
+        self.ahora = inicio
+
+    def time(self):
+        return self.ahora
+
+    def monotonic(self):
+        return self.ahora
+
+    def sleep(self, segundos):
+        self.ahora += segundos
+
+    def __getattr__(self, nombre):
+        return getattr(time, nombre)
+
+def _datetime_simulado(reloj):
+    class DatetimeSimulado(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromtimestamp(reloj.ahora, tz)
+
+    return DatetimeSimulado
+
+class _AgendaSimulada:
+    """Eventos en tiempo simulado: cada uno corre cuando el reloj llega a su instante"""
+
+    def __init__(self, reloj):
+        self.reloj = reloj
+        self.eventos = []
+        self.secuencia = 0
+        self.lock = threading.Lock()
+
+    def programar(self, instante, funcion, *args):
+        # El Step Function en memoria programa desde los hilos de ejecutar_en_paralelo
+        with self.lock:
+            self.secuencia += 1
+            heapq.heappush(self.eventos, (instante, self.secuencia, funcion, args))
+
+    def correr(self, mientras):
+        """Corre los eventos en orden mientras quede trabajo; el resto (timeouts vencidos de ejecuciones ya terminadas) se descarta"""
+        while mientras():
+            with self.lock:
+                if not self.eventos:
+                    return
+                instante, _, funcion, args = heapq.heappop(self.eventos)
+            # Un handler que durmió pudo adelantar el reloj más allá del evento
+            self.reloj.ahora = max(self.reloj.ahora, instante)
+            funcion(*args)
+
+def _reemplazar(pila, objeto, atributo, valor):
+    """setattr que se deshace al cerrar la pila"""
+    pila.callback(setattr, objeto, atributo, getattr(objeto, atributo))
+    setattr(objeto, atributo, valor)
+
+def _vaciar(pila, contenedor):
+    """Vacía un dict o lista de estado por módulo y lo restaura al cerrar la pila"""
+    copia = contenedor.copy()
+    contenedor.clear()
+
+    def restaurar():
+        contenedor.clear()
+        if isinstance(contenedor, list):
+            contenedor.extend(copia)
+        else:
+            contenedor.update(copia)
+
+    pila.callback(restaurar)
+
+def _fijar_entorno(pila, variables):
+    anteriores = {nombre: os.environ.get(nombre) for nombre in variables}
+
+    def restaurar():
+        for nombre, valor in anteriores.items():
+            if valor is None:
+                os.environ.pop(nombre, None)
+            else:
+                os.environ[nombre] = valor
+
+    pila.callback(restaurar)
+    os.environ.update(variables)
+
+def _instalar_simulacion(pila, dynamodb, stepfunctions, lambda_client, reloj):
+    """Cambia los clientes de AWS, el reloj y el estado por contenedor de los módulos del workflow"""
+    clientes = {'stepfunctions': stepfunctions, 'lambda': lambda_client}
+    datetime_simulado = _datetime_simulado(reloj)
+    carpeta = os.path.join(RAIZ, 'workflow')
+
+    for modulo in list(sys.modules.values()):
+        archivo = getattr(modulo, '__file__', None) or ''
+        if not os.path.abspath(archivo).startswith(carpeta):
+            continue
+        for atributo, valor in list(vars(modulo).items()):
+            if isinstance(valor, ServiceResource) and valor.meta.service_name == 'dynamodb':
+                _reemplazar(pila, modulo, atributo, dynamodb)
+            elif isinstance(valor, BaseClient) and valor.meta.service_model.service_name in clientes:
+                _reemplazar(pila, modulo, atributo, clientes[valor.meta.service_model.service_name])
+            elif valor is time:
+                _reemplazar(pila, modulo, atributo, reloj)
+            elif valor is datetime:
+                _reemplazar(pila, modulo, atributo, datetime_simulado)
+
+    _reemplazar(pila, dynamodb_helper, '_dynamodb', lambda: dynamodb)
+    _reemplazar(pila, limitador, 'PRESUPUESTOS', {api: PRESUPUESTO_SIN_LIMITE for api in limitador.PRESUPUESTOS})
+    _vaciar(pila, limitador._buckets)
+    _vaciar(pila, dynamodb_helper._rosters)
+    _vaciar(pila, notificaciones.ENVIADAS_LOCAL)
+
+def _modulo_funcion(function_name):
+    """"${NotificarUsuarioLambdaArn}" -> "notificar_usuario\""""
+    nombre = function_name.strip('${}').removesuffix('LambdaArn')
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', nombre).lower()
+
+def _funciones_definicion(definicion):
+    return {
+        estado['Parameters']['FunctionName']
+        for estado in definicion['States'].values()
+        if estado['Type'] == 'Task'
+    }
+
+def ejecutar_en_proceso(perfil, escenario, semilla=None):
+    """Ejecuta el perfil con los handlers reales del workflow en este proceso y retorna las métricas.
+
+    Los servicios de AWS son los de dynamodb_en_memoria y
+    stepfunctions_en_memoria y el reloj de los módulos del workflow es el de la
+    simulación, así que las esperas del Step Function no demoran la ejecución.
+    Cada handler corre completo en su instante: no se reproducen las carreras
+    entre invocaciones concurrentes, que el modo simulado tampoco modela.
+    """
+    aleatorio = random.Random(semilla)
+    random.seed(semilla)
+    muestrear_confirmacion = crear_muestreador(perfil['confirmacion'])
+    plantillas = peticiones_workflow()
+    locales = _locales(escenario['local_id'], perfil['locales'])
+    usuario_correo = escenario.get('usuario_correo') or CORREO_CARGA
+
+    reloj = _RelojSimulado(float(int(time.time())))
+    inicio = reloj.ahora
+    agenda = _AgendaSimulada(reloj)
+    dynamodb = DynamoDBEnMemoria()
+    modulos = {nombre: importlib.import_module(nombre) for nombre in MODULOS_EN_PROCESO}
+
+    definicion = generar_definicion()
+    stepfunctions = StepFunctionsEnMemoria(
+        definicion,
+        {
+            function_name: (_modulo_funcion(function_name), modulos[_modulo_funcion(function_name)].lambda_handler)
+            for function_name in _funciones_definicion(definicion)
+        },
+        reloj.time,
+        agenda.programar,
+        STATE_MACHINE_ARN_LOCAL
+    )
+    lambda_client = LambdaEnMemoria({
+        nombre.replace('_', '-'): (nombre, modulo.lambda_handler) for nombre, modulo in modulos.items()
+    })
+
+    resultados = Counter()
+    estados = Counter()
+    invocaciones = Counter()
+    errores_handlers = Counter()
+    pedidos = {}
+    pendientes = 0
+    enviadas_vistas = 0
+
+    def invocar(nombre, evento):
+        invocaciones[nombre] += 1
+        try:
+            return invocar_handler(nombre, modulos[nombre].lambda_handler, evento)
+        except ErrorEstado as e:
+            errores_handlers[f'{nombre} {e.nombre}'] += 1
+            return None
+
+    def peticion(endpoint, pedido_id):
+        """Petición al router como la entrega API Gateway, con el body de la colección"""
+        crudo = plantillas[endpoint].replace('{{local_id}}', pedidos[pedido_id]['local']).replace('{{pedido_id}}', pedido_id)
+        respuesta = invocar('router', {'path': f'/workflow/{endpoint}', 'body': crudo})
+        estado = respuesta['statusCode'] if respuesta else 502
+        estados[f'{endpoint} {estado}'] += 1
+        return estado, json.loads(respuesta['body']) if respuesta else {}
+
+    def activo():
+        return pendientes > 0 or any(ejecucion.estado == 'RUNNING' for ejecucion in stepfunctions.ejecuciones.values())
+
+    def programar_pendiente(instante, funcion, *args):
+        nonlocal pendientes
+        pendientes += 1
+        agenda.programar(instante, atender, funcion, args)
+
+    def atender(funcion, args):
+        nonlocal pendientes
+        pendientes -= 1
+        funcion(*args)
+
+    def llegar(pedido_id):
+        pedido = pedidos[pedido_id]
+        tablas['pedidos'].cargar(_pedido_inicial(pedido['local'], pedido_id, usuario_correo))
+        iniciar(pedido_id)
+
+    def iniciar(pedido_id, reintento=False):
+        estado, respuesta = peticion('iniciar', pedido_id)
+        if estado == 200:
+            return
+        if estado == 202 and not reintento:
+            # Igual que en los otros modos, el cliente reintenta una vez pasado el ETA
+            resultados['diferidos'] += 1
+            programar_pendiente(reloj.ahora + float(respuesta.get('eta_segundos', 0)), iniciar, pedido_id, True)
+        else:
+            pedidos[pedido_id]['resultado'] = 'rechazados' if estado in (202, 429) else 'errores'
+
+    def despachar(evento):
+        """Despacha el outbox y el usuario contesta cada notificación recibida"""
+        nonlocal enviadas_vistas
+        invocar('despachar_notificaciones', evento)
+        nuevas = notificaciones.ENVIADAS_LOCAL[enviadas_vistas:]
+        enviadas_vistas += len(nuevas)
+        for notificacion in nuevas:
+            demora = muestrear_confirmacion()
+            # Si el usuario no contesta antes del timeout, el Step Function confirma solo
+            if demora < TIMEOUT_CONFIRMACION_SEGUNDOS:
+                programar_pendiente(reloj.ahora + demora, peticion, 'confirmar-recepcion', notificacion['pedido_id'])
+
+    def leer_stream():
+        registros = dynamodb.drenar_stream()
+        for inicio_lote in range(0, len(registros), LOTE_STREAM):
+            despachar({'Records': registros[inicio_lote:inicio_lote + LOTE_STREAM]})
+        if activo():
+            agenda.programar(reloj.ahora + VENTANA_STREAM_SEGUNDOS, leer_stream)
+
+    def programada(nombre, periodo):
+        evento = {'source': 'aws.events', 'detail-type': 'Scheduled Event'}
+        if nombre == 'despachar_notificaciones':
+            despachar(evento)
+        else:
+            invocar(nombre, evento)
+        if activo():
+            agenda.programar(reloj.ahora + periodo, programada, nombre, periodo)
+
+    entorno = {
+        'TABLE_PEDIDOS': 'ChinaWok-Pedidos',
+        'TABLE_EMPLEADOS': 'ChinaWok-Empleados',
+        'TABLE_USUARIOS': 'ChinaWok-Usuarios',
+        'TABLE_IDEMPOTENCIA': 'ChinaWok-Workflow-Idempotencia',
+        'TABLE_CAPACIDAD_LOCALES': 'ChinaWok-Workflow-Capacidad-Locales',
+        'TABLE_NOTIFICACIONES': 'ChinaWok-Workflow-Notificaciones',
+        'STATE_MACHINE_ARN': STATE_MACHINE_ARN_LOCAL,
+        'NOTIFICACIONES_PROVEEDOR': 'local',
+        'MODO_REALISTA': 'true' if escenario['modo_realista'] else 'false'
+    }
+
+    with contextlib.ExitStack() as pila:
+        _fijar_entorno(pila, entorno)
+        _instalar_simulacion(pila, dynamodb, stepfunctions, lambda_client, reloj)
+        # Los handlers escriben su log con print; en una carga solo interesan las métricas
+        pila.enter_context(contextlib.redirect_stdout(pila.enter_context(open(os.devnull, 'w'))))
+
+        crear_tablas(dynamodb)
+        tablas = {'pedidos': dynamodb.Table(entorno['TABLE_PEDIDOS'])}
+        for local_id in locales:
+            _cargar_empleados(dynamodb.Table(entorno['TABLE_EMPLEADOS']), local_id, perfil['empleados'])
+
+        # Llegadas de Poisson repartidas al azar entre los locales
+        instante = 0.0
+        numero = 0
+        while True:
+            instante += aleatorio.expovariate(perfil['tasa'])
+            if instante > perfil['duracion']:
+                break
+            numero += 1
+            pedido_id = f'PED-PROCESO-{numero}'
+            pedidos[pedido_id] = {'local': aleatorio.choice(locales), 'llegada': inicio + instante}
+            programar_pendiente(inicio + instante, llegar, pedido_id)
+
+        agenda.programar(inicio + VENTANA_STREAM_SEGUNDOS, leer_stream)
+        for nombre, periodo in PROGRAMADAS.items():
+            agenda.programar(inicio + periodo, programada, nombre, periodo)
+        agenda.correr(activo)
+
+    # Cada pedido admitido termina como su última ejecución
+    ultimas = {}
+    for ejecucion in sorted(stepfunctions.ejecuciones.values(), key=lambda ejecucion: ejecucion.inicio):
+        ultimas[ejecucion.entrada['pedido_id']] = ejecucion
+
+    resultados['generados'] = len(pedidos)
+    latencias = []
+    for pedido_id, pedido in pedidos.items():
+        ejecucion = ultimas.get(pedido_id)
+        if 'resultado' in pedido:
+            resultados[pedido['resultado']] += 1
+        elif ejecucion is not None and ejecucion.estado == 'SUCCEEDED':
+            resultados['completados'] += 1
+            latencias.append(ejecucion.fin - pedido['llegada'])
+        elif ejecucion is not None and ejecucion.error == 'ServicioSaturado':
+            resultados['saturados'] += 1
+        else:
+            resultados['errores'] += 1
+
+    estados_reintento = {f'IncrementarIntentos{etapa["nombre"]}': etapa['rol'] for etapa in ETAPAS}
+    reintentos = Counter()
+    automaticas = 0
+    for ejecucion in stepfunctions.ejecuciones.values():
+        for estado in ejecucion.transiciones:
+            if estado in estados_reintento:
+                reintentos[estados_reintento[estado]] += 1
+        automaticas += 'ConfirmacionAutomatica' in ejecucion.transiciones
+
+    return {
+        'resultados': dict(resultados),
+        'latencias': latencias,
+        'horizonte_segundos': max(reloj.ahora - inicio, perfil['duracion']),
+        'estados_http': dict(estados),
+        'reintentos_por_rol': dict(reintentos),
+        'confirmaciones_automaticas': automaticas,
+        'errores_handlers': dict(errores_handlers),
+        'invocaciones_lambda': dict(invocaciones + stepfunctions.invocaciones + lambda_client.invocaciones),
+        'llamadas_stepfunctions': dict(stepfunctions.llamadas),
+        'llamadas_dynamodb': dynamodb.metricas()
+    }
+
+# ---------------------------------------------------------------------------
+# Modo http
+# ---------------------------------------------------------------------------
+
+def _post(url, body, timeout=30):
+    inicio = time.monotonic()
+    peticion = urllib.request.Request(
+        url,
+        data=json.dumps(body).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(peticion, timeout=timeout) as respuesta:
+            estado, contenido = respuesta.status, respuesta.read()
+    except urllib.error.HTTPError as e:
+        estado, contenido = e.code, e.read()
+    except Exception as e:
+        estado, contenido = 0, str(e).encode('utf-8')
+    return estado, contenido, time.monotonic() - inicio
+
+def es_tabla_de_prueba(nombre):
+    """Solo se siembran tablas cuyo nombre marca un ambiente de prueba (ChinaWok-Pedidos-dev, ...)"""
+    return re.search(r'(^|[-_.])(test|dev|qa|staging|carga)([-_.]|$)', nombre, re.IGNORECASE) is not None
+
+def _tabla_pedidos_de_prueba(local_id):
+    nombre = os.environ['TABLE_PEDIDOS']
+    if not es_tabla_de_prueba(nombre):
+        raise ValueError(f'{nombre} no es una tabla de prueba: el generador no escribe en producción')
+    if not local_id.startswith(PREFIJO_LOCAL_CARGA):
+        raise ValueError(f'El local {local_id} no es de carga (prefijo {PREFIJO_LOCAL_CARGA})')
+
+    import boto3
+
+    # Mismo presupuesto y sin reintentos propios, como las lambdas
+    recurso = boto3.resource('dynamodb', region_name=os.environ.get('AWS_REGION', 'us-east-1'), config=CONFIG_SIN_REINTENTOS)
+    return TablaLimitada(recurso.Table(nombre))
+
+def sembrar_pedidos(local_id, pedido_ids, expira_en):
+    """Crea los pedidos de prueba en estado "procesando", como los deja el API de pedidos.
+
+    Solo en tablas de prueba y locales de carga. Nunca sobrescribe un pedido
+    existente y cada uno expira (TTL expira_en) aunque la limpieza no corra.
+    """
+    tabla = _tabla_pedidos_de_prueba(local_id)
+    for pedido_id in pedido_ids:
+        tabla.put_item(
+            Item={**_pedido_inicial(local_id, pedido_id, CORREO_CARGA), 'expira_en': expira_en},
+            ConditionExpression='attribute_not_exists(pedido_id)'
+        )
+
+def limpiar_pedidos(local_id, pedido_ids):
+    """Borra los pedidos sembrados por sembrar_pedidos"""
+    tabla = _tabla_pedidos_de_prueba(local_id)
+    for pedido_id in pedido_ids:
+        tabla.delete_item(Key={'local_id': particion_pedido(local_id, pedido_id), 'pedido_id': pedido_id})
+
+class _Agenda:
+    """Eventos programados en el tiempo que se despachan a un pool de hilos.
+
+    Los hilos solo hacen peticiones: las esperas (llegadas, demora de
+    confirmación, sondeo) son eventos de la agenda y no bloquean el pool.
+    """
+
+    def __init__(self, executor, reloj=time.monotonic):
+        self.executor = executor
+        self.reloj = reloj
+        self.eventos = []
+        self.secuencia = 0
+        self.pendientes = 0
+        self.condicion = threading.Condition()
+
+    def programar(self, instante, funcion, *args):
+        with self.condicion:
+            self.secuencia += 1
+            heapq.heappush(self.eventos, (instante, self.secuencia, funcion, args))
+            self.condicion.notify()
+
+    def _ejecutar(self, funcion, args):
+        try:
+            funcion(*args)
+        finally:
+            with self.condicion:
+                self.pendientes -= 1
+                self.condicion.notify()
+
+    def correr(self):
+        """Despacha los eventos a su hora hasta que no quede ninguno ni peticiones en curso"""
+        with self.condicion:
+            while self.eventos or self.pendientes:
+                espera = self.eventos[0][0] - self.reloj() if self.eventos else None
+                if espera is None or espera > 0:
+                    self.condicion.wait(espera)
+                    continue
+                _, _, funcion, args = heapq.heappop(self.eventos)
+                self.pendientes += 1
+                self.executor.submit(self._ejecutar, funcion, args)
+
+def _eta(contenido, defecto):
+    try:
+        return float(json.loads(contenido).get('eta_segundos', defecto))
+    except (ValueError, AttributeError):
+        return defecto
+
+def ejecutar_http(perfil, escenario, base_url, intervalo_sondeo=5, hilos=64):
+    """Envía el perfil al API desplegado y retorna las métricas.
+
+    Los pedidos se siembran en la tabla de pedidos antes de empezar, se borran
+    al terminar y llegan
+    en lazo abierto: cada uno se envía en su instante planificado aunque el
+    API esté lento, y su latencia se mide desde ese instante.
+    """
+    plantillas = peticiones_workflow()
+    muestrear_confirmacion = crear_muestreador(perfil['confirmacion'])
+    local_id = escenario['local_id']
+
+    # Llegadas de Poisson planificadas de antemano
+    llegadas = []
+    instante = 0.0
+    while True:
+        instante += random.expovariate(perfil['tasa'])
+        if instante > perfil['duracion']:
+            break
+        llegadas.append(instante)
+
+    prefijo = f'PED-CARGA-{int(time.time())}'
+    pedidos = [{'id': f'{prefijo}-{numero}', 'llegada': llegada} for numero, llegada in enumerate(llegadas, 1)]
+    pedido_ids = [pedido['id'] for pedido in pedidos]
+    expira_en = int(time.time() + perfil['duracion'] + TIMEOUT_CONFIRMACION_SEGUNDOS + MARGEN_EXPIRACION_SEGUNDOS)
+    sembrar_pedidos(local_id, pedido_ids, expira_en)
+    print(f'{len(pedidos)} pedidos creados en el local {local_id}')
+
+    resultados = Counter({'generados': len(pedidos)})
+    estados = Counter()
+    latencias = []
+    latencias_peticion = defaultdict(list)
+    retrasos_envio = []
+    lock = threading.Lock()
+
+    def body(endpoint, pedido_id):
+        crudo = plantillas[endpoint].replace('{{local_id}}', local_id).replace('{{pedido_id}}', pedido_id)
+        return json.loads(crudo)
+
+    def enviar(endpoint, pedido):
+        estado, contenido, segundos = _post(f'{base_url}/workflow/{endpoint}', body(endpoint, pedido['id']))
+        with lock:
+            estados[f'{endpoint} {estado}'] += 1
+            latencias_peticion[endpoint].append(segundos)
+        return estado, contenido
+
+    def contar(resultado):
+        with lock:
+            resultados[resultado] += 1
+
+    def iniciar(pedido, planificado, reintento=False):
+        with lock:
+            retrasos_envio.append(time.monotonic() - planificado)
+        estado, contenido = enviar('iniciar', pedido)
+        if estado == 200:
+            # La confirmación solo se acepta cuando el workflow llegó a
+            # EsperarConfirmacionUsuario; antes responde 400 y se vuelve a intentar
+            ahora = time.monotonic()
+            pedido['limite'] = ahora + TIMEOUT_CONFIRMACION_SEGUNDOS
+            agenda.programar(ahora + muestrear_confirmacion(), confirmar, pedido)
+        elif estado == 202 and not reintento:
+            # Igual que en la simulación, el cliente reintenta una vez pasado el ETA
+            contar('diferidos')
+            reintento_en = time.monotonic() + _eta(contenido, intervalo_sondeo)
+            agenda.programar(reintento_en, iniciar, pedido, reintento_en, True)
+        else:
+            contar('rechazados' if estado in (202, 429) else 'errores')
+
+    def confirmar(pedido):
+        estado, _ = enviar('confirmar-recepcion', pedido)
+        ahora = time.monotonic()
+        if estado == 200:
+            contar('completados')
+            with lock:
+                latencias.append(ahora - pedido['llegada'])
+        elif ahora + intervalo_sondeo < pedido['limite']:
+            agenda.programar(ahora + intervalo_sondeo, confirmar, pedido)
+        else:
+            contar('saturados')
+
+    inicio = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=hilos) as executor:
+            agenda = _Agenda(executor)
+            for pedido in pedidos:
+                pedido['llegada'] += inicio
+                agenda.programar(pedido['llegada'], iniciar, pedido, pedido['llegada'])
+            agenda.correr()
+    finally:
+        limpiar_pedidos(local_id, pedido_ids)
+        print(f'{len(pedidos)} pedidos borrados del local {local_id}')
+
+    return {
+        'resultados': dict(resultados),
+        'latencias': latencias,
+        'horizonte_segundos': time.monotonic() - inicio,
+        'estados_http': dict(estados),
+        'latencia_peticiones': {
+            endpoint: {'p50': percentil(valores, 50), 'p99': percentil(valores, 99)}
+            for endpoint, valores in latencias_peticion.items()
+        },
+        # Atraso del generador respecto del instante planificado de cada envío
+        'retraso_envio_segundos': {'p50': percentil(retrasos_envio, 50), 'p99': percentil(retrasos_envio, 99)}
+    }
+
+# ---------------------------------------------------------------------------
+
+def _redondear(valor):
+    if isinstance(valor, float):
+        return round(valor, 2)
+    if isinstance(valor, dict):
+        return {clave: _redondear(v) for clave, v in valor.items()}
+    return valor
+
+def resumen(metricas):
+    """Agrega throughput, saturación y percentiles de latencia a las métricas"""
+    resultados = metricas['resultados']
+    generados = resultados.get('generados', 0)
+    no_atendidos = resultados.get('saturados', 0) + resultados.get('rechazados', 0)
+    latencias = metricas.pop('latencias')
+    return _redondear({
+        **metricas,
+        'throughput_por_hora': resultados.get('completados', 0) / metricas['horizonte_segundos'] * 3600,
+        'tasa_saturacion': no_atendidos / generados if generados else 0,
+        'latencia_segundos': {
+            'p50': percentil(latencias, 50),
+            'p90': percentil(latencias, 90),
+            'p99': percentil(latencias, 99),
+            'max': max(latencias) if latencias else None
+        }
+    })
+
+def _leer_empleados(valor):
+    """"cocineros,despachadores,repartidores" -> dict por rol"""
+    return dict(zip(ROLES, (int(cantidad) for cantidad in valor.split(','))))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Genera carga sintética a partir de los escenarios de Postman')
+    parser.add_argument('escenario', nargs='?', help='Nombre del escenario en "Test Scenarios"')
+    parser.add_argument('--listar', action='store_true', help='Lista los escenarios y sus perfiles por defecto')
+    parser.add_argument('--modo', choices=['simulado', 'proceso', 'http'], default='simulado')
+    parser.add_argument('--tasa', type=float, help='Pedidos por segundo (todos los locales)')
+    parser.add_argument('--duracion', type=float, help='Segundos de generación de pedidos')
+    parser.add_argument('--locales', type=int, help='Cantidad de locales que reciben pedidos')
+    parser.add_argument('--empleados', type=_leer_empleados, help='Empleados por local: cocineros,despachadores,repartidores')
+    parser.add_argument('--confirmacion', help='Demora de confirmación: exp:<media>, fijo:<s> o uniforme:<min>:<max>')
+    parser.add_argument('--semilla', type=int, help='Semilla para repetir una simulación')
+    parser.add_argument('--base-url', help='URL base del API (modo http)')
+    parser.add_argument('--sembrar', action='store_true', help='Autoriza crear y borrar pedidos de prueba en TABLE_PEDIDOS (modo http)')
+    parser.add_argument('--local', help=f'Local de carga del modo http (prefijo {PREFIJO_LOCAL_CARGA}, por defecto {PREFIJO_LOCAL_CARGA}<local del escenario>)')
+    args = parser.parse_args(argv)
+
+    escenarios = cargar_escenarios()
+
+    if args.listar or not args.escenario:
+        for nombre, escenario in escenarios.items():
+            print(f'{nombre} (local {escenario["local_id"]}, modo_realista={escenario["modo_realista"]})')
+            print(f'    {json.dumps(PERFILES.get(nombre, {}), ensure_ascii=False)}')
+        return 0
+
+    if args.escenario not in escenarios:
+        parser.error(f'Escenario desconocido: {args.escenario}')
+
+    escenario = escenarios[args.escenario]
+
+    if args.modo == 'http':
+        # El API atiende el local de carga con los empleados que tenga cargados
+        if args.locales is not None or args.empleados is not None:
+            parser.error('--locales y --empleados no aplican al modo http')
+        if not args.sembrar:
+            parser.error('El modo http crea pedidos de prueba en TABLE_PEDIDOS: confirmar con --sembrar')
+        if not es_tabla_de_prueba(os.environ.get('TABLE_PEDIDOS', '')):
+            parser.error('El modo http necesita TABLE_PEDIDOS con una tabla de prueba (-dev, -test, -qa, -staging o -carga)')
+        local_id = args.local or f'{PREFIJO_LOCAL_CARGA}{escenario["local_id"]}'
+        if not local_id.startswith(PREFIJO_LOCAL_CARGA):
+            parser.error(f'El local del modo http debe empezar con {PREFIJO_LOCAL_CARGA}')
+        escenario = {**escenario, 'local_id': local_id}
+
+    perfil = dict(PERFILES.get(args.escenario, PERFILES['Flujo Completo - Demo Mode']))
+    for campo in ('tasa', 'duracion', 'locales', 'empleados', 'confirmacion'):
+        if getattr(args, campo) is not None:
+            perfil[campo] = getattr(args, campo)
+
+    print(f'Escenario: {args.escenario} ({args.modo})')
+    print(f'Perfil: {json.dumps(perfil, ensure_ascii=False)}')
+
+    if args.modo == 'http':
+        base_url = args.base_url or os.environ.get('BASE_URL')
+        if not base_url:
+            parser.error('El modo http necesita --base-url o BASE_URL')
+        metricas = ejecutar_http(perfil, escenario, base_url.rstrip('/'))
+    elif args.modo == 'proceso':
+        metricas = ejecutar_en_proceso(perfil, escenario, args.semilla)
+    else:
+        metricas = simular(perfil, escenario['modo_realista'], args.semilla, escenario['local_id'])
+
+    print(json.dumps(resumen(metricas), indent=2, ensure_ascii=False))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
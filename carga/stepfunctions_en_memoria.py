@@ -0,0 +1,542 @@
+"""
+Step Functions y Lambda en memoria para el modo en proceso del generador de carga.
+
+StepFunctionsEnMemoria interpreta la definición generada por
+stepfunctions/generar_definicion.py (Pass, Task, Choice, Wait, Succeed y Fail
+con Parameters, ResultSelector, ResultPath, OutputPath, Retry, Catch y
+States.MathAdd) e invoca los lambda_handler del workflow en el mismo proceso.
+Los estados waitForTaskToken quedan esperando hasta que alguien llame a
+send_task_success con su token o hasta que vence su TimeoutSeconds.
+
+Las esperas no bloquean: cada continuación se entrega a la función
+programar(instante, callback) del que conduce la simulación, que decide
+cuándo corre (en tiempo simulado o real).
+"""
+import copy
+import io
+import itertools
+import json
+import re
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+
+from botocore.exceptions import ClientError
+
+TIMEOUT_LAMBDA_SEGUNDOS = 60
+
+class ExecutionAlreadyExists(ClientError):
+    pass
+
+def _error(codigo, mensaje, operacion, clase=ClientError):
+    return clase({'Error': {'Code': codigo, 'Message': mensaje}}, operacion)
+
+class ErrorEstado(Exception):
+    """Error de un estado, con el nombre que ven Retry y Catch"""
+
+    def __init__(self, nombre, causa=''):
+        super().__init__(f'{nombre}: {causa}')
+        self.nombre = nombre
+        self.causa = causa
+
+class _Contexto:
+    """Contexto de Lambda mínimo que esperan respetar_plazo y perfilar"""
+
+    _secuencia = itertools.count(1)
+
+    def __init__(self, function_name, timeout=TIMEOUT_LAMBDA_SEGUNDOS):
+        self.function_name = function_name
+        self.aws_request_id = f'local-{next(self._secuencia)}'
+        self._timeout = timeout
+
+    def get_remaining_time_in_millis(self):
+        return self._timeout * 1000
+
+def invocar_handler(nombre, handler, evento):
+    """Invoca el handler como lo haría Lambda: el evento y la respuesta viajan como JSON"""
+    evento = json.loads(json.dumps(evento))
+    try:
+        respuesta = handler(evento, _Contexto(nombre))
+    except Exception as e:
+        raise ErrorEstado(type(e).__name__, str(e)) from e
+    try:
+        return json.loads(json.dumps(respuesta))
+    except (TypeError, ValueError) as e:
+        raise ErrorEstado('Runtime.MarshalError', f'Unable to marshal response: {str(e)}') from e
+
+# ---------------------------------------------------------------------------
+# Rutas JSON y funciones intrínsecas
+# ---------------------------------------------------------------------------
+
+# _FALTA marca una ruta ausente; _ERROR, que una ruta ausente es un error
+_FALTA = object()
+_ERROR = object()
+
+def _partes(ruta):
+    return [parte for parte in re.split(r'\.', ruta) if parte]
+
+def leer_ruta(ruta, datos, contexto=None, defecto=_ERROR):
+    """Valor de una ruta "$.a.b" sobre los datos (o "$$.x" sobre el objeto de contexto)"""
+    if ruta.startswith('$$'):
+        actual, resto = contexto or {}, ruta[2:]
+    elif ruta.startswith('$'):
+        actual, resto = datos, ruta[1:]
+    else:
+        raise ErrorEstado('States.Runtime', f'Ruta inválida: {ruta}')
+    for parte in _partes(resto):
+        if not isinstance(actual, dict) or parte not in actual:
+            if defecto is _ERROR:
+                raise ErrorEstado('States.Runtime', f'La ruta {ruta} no existe en la entrada')
+            return defecto
+        actual = actual[parte]
+    return actual
+
+def escribir_ruta(ruta, datos, valor):
+    """Resultado de ResultPath: la entrada con el valor en la ruta (None descarta el valor)"""
+    if ruta is None:
+        return datos
+    if ruta == '$':
+        return valor
+    salida = copy.deepcopy(datos)
+    actual = salida
+    partes = _partes(ruta[1:])
+    for parte in partes[:-1]:
+        actual = actual.setdefault(parte, {})
+    actual[partes[-1]] = valor
+    return salida
+
+def _argumentos(texto):
+    argumentos, profundidad, actual = [], 0, ''
+    for caracter in texto:
+        if caracter == ',' and profundidad == 0:
+            argumentos.append(actual.strip())
+            actual = ''
+            continue
+        profundidad += {'(': 1, ')': -1}.get(caracter, 0)
+        actual += caracter
+    if actual.strip():
+        argumentos.append(actual.strip())
+    return argumentos
+
+def evaluar_valor(expresion, datos, contexto):
+    """Valor de un campo ".$": una ruta o una función intrínseca"""
+    coincidencia = re.fullmatch(r'(States\.\w+)\((.*)\)', expresion.strip(), re.S)
+    if not coincidencia:
+        return leer_ruta(expresion, datos, contexto)
+
+    funcion = coincidencia.group(1)
+    argumentos = []
+    for argumento in _argumentos(coincidencia.group(2)):
+        if argumento.startswith('$'):
+            argumentos.append(leer_ruta(argumento, datos, contexto))
+        elif argumento.startswith('States.'):
+            argumentos.append(evaluar_valor(argumento, datos, contexto))
+        else:
+            argumentos.append(json.loads(argumento.replace("'", '"')))
+
+    if funcion == 'States.MathAdd':
+        return argumentos[0] + argumentos[1]
+    if funcion == 'States.Format':
+        plantilla, *valores = argumentos
+        for valor in valores:
+            plantilla = plantilla.replace('{}', str(valor), 1)
+        return plantilla
+    if funcion == 'States.StringToJson':
+        return json.loads(argumentos[0])
+    if funcion == 'States.JsonToString':
+        return json.dumps(argumentos[0])
+    raise ErrorEstado('States.Runtime', f'Función intrínseca no soportada: {funcion}')
+
+def aplicar_plantilla(plantilla, datos, contexto):
+    """Parameters / ResultSelector: los campos terminados en ".$" se evalúan"""
+    if isinstance(plantilla, dict):
+        salida = {}
+        for clave, valor in plantilla.items():
+            if clave.endswith('.$'):
+                salida[clave[:-2]] = evaluar_valor(valor, datos, contexto)
+            else:
+                salida[clave] = aplicar_plantilla(valor, datos, contexto)
+        return salida
+    if isinstance(plantilla, list):
+        return [aplicar_plantilla(valor, datos, contexto) for valor in plantilla]
+    return plantilla
+
+_NUMERICOS = {
+    'NumericEquals': lambda a, b: a == b,
+    'NumericLessThan': lambda a, b: a < b,
+    'NumericLessThanEquals': lambda a, b: a <= b,
+    'NumericGreaterThan': lambda a, b: a > b,
+    'NumericGreaterThanEquals': lambda a, b: a >= b
+}
+_TEXTO = {
+    'StringEquals': lambda a, b: a == b,
+    'StringLessThan': lambda a, b: a < b,
+    'StringGreaterThan': lambda a, b: a > b
+}
+
+def evaluar_regla(regla, datos):
+    """True si la regla de un estado Choice se cumple"""
+    if 'And' in regla:
+        return all(evaluar_regla(subregla, datos) for subregla in regla['And'])
+    if 'Or' in regla:
+        return any(evaluar_regla(subregla, datos) for subregla in regla['Or'])
+    if 'Not' in regla:
+        return not evaluar_regla(regla['Not'], datos)
+
+    valor = leer_ruta(regla['Variable'], datos, defecto=_FALTA)
+    for operador, esperado in regla.items():
+        if operador in ('Variable', 'Next'):
+            continue
+        if operador == 'IsPresent':
+            return (valor is not _FALTA) == esperado
+        if valor is _FALTA:
+            raise ErrorEstado('States.Runtime', f'Invalid path {regla["Variable"]}: the choice state could not find the variable')
+        if operador.endswith('Path'):
+            operador, esperado = operador[:-4], leer_ruta(esperado, datos)
+        if operador == 'IsNull':
+            return (valor is None) == esperado
+        if operador == 'IsBoolean':
+            return isinstance(valor, bool) == esperado
+        if operador == 'IsNumeric':
+            return (isinstance(valor, (int, float)) and not isinstance(valor, bool)) == esperado
+        if operador == 'IsString':
+            return isinstance(valor, str) == esperado
+        if operador == 'BooleanEquals':
+            return isinstance(valor, bool) and valor == esperado
+        if operador in _NUMERICOS:
+            return isinstance(valor, (int, float)) and not isinstance(valor, bool) and _NUMERICOS[operador](valor, esperado)
+        if operador in _TEXTO:
+            return isinstance(valor, str) and _TEXTO[operador](valor, esperado)
+        raise ErrorEstado('States.Runtime', f'Operador de Choice no soportado: {operador}')
+    raise ErrorEstado('States.Runtime', 'Regla de Choice sin operador')
+
+def _coincide(errores, nombre):
+    if 'States.ALL' in errores:
+        return nombre != 'States.Runtime'
+    if 'States.TaskFailed' in errores and nombre not in ('States.Timeout', 'States.Runtime'):
+        return True
+    return nombre in errores
+
+# ---------------------------------------------------------------------------
+# Step Functions
+# ---------------------------------------------------------------------------
+
+class _Ejecucion:
+    def __init__(self, arn, nombre, entrada, inicio):
+        self.arn = arn
+        self.nombre = nombre
+        self.entrada = entrada
+        self.inicio = inicio
+        self.fin = None
+        self.estado = 'RUNNING'
+        self.salida = None
+        self.error = None
+        self.causa = None
+        self.estado_actual = None
+        # Cambia en cada transición: una continuación programada de un paso
+        # anterior (timeout, espera) se descarta
+        self.paso = 0
+        self.reintentos = Counter()
+        self.transiciones = []
+
+class StepFunctionsEnMemoria:
+    """Cliente de Step Functions (start/stop/list_executions y send_task_success) sobre una sola máquina de estados"""
+
+    def __init__(self, definicion, funciones, reloj, programar, state_machine_arn='arn:aws:states:local:0:stateMachine:pedido-workflow'):
+        self.definicion = definicion
+        # FunctionName del Parameters ("${CocinarLambdaArn}") -> (nombre, handler)
+        self.funciones = funciones
+        self.reloj = reloj
+        self.programar = programar
+        self.state_machine_arn = state_machine_arn
+        self.ejecuciones = {}
+        self.tokens = {}
+        self.llamadas = Counter()
+        self.invocaciones = Counter()
+        self.exceptions = SimpleNamespace(ExecutionAlreadyExists=ExecutionAlreadyExists)
+        self._tokens = itertools.count(1)
+
+    # API de boto3
+
+    def start_execution(self, stateMachineArn, name, input='{}'):
+        self.llamadas['start_execution'] += 1
+        if stateMachineArn != self.state_machine_arn:
+            raise _error('StateMachineDoesNotExist', f'State Machine Does Not Exist: {stateMachineArn}', 'StartExecution')
+        arn = f'{self.state_machine_arn.replace(":stateMachine:", ":execution:")}:{name}'
+        if arn in self.ejecuciones:
+            raise _error('ExecutionAlreadyExists', f'Execution Already Exists: {arn}', 'StartExecution', ExecutionAlreadyExists)
+
+        ejecucion = _Ejecucion(arn, name, json.loads(input), self.reloj())
+        self.ejecuciones[arn] = ejecucion
+        self._programar(ejecucion, self.reloj(), self.definicion['StartAt'], ejecucion.entrada)
+        return {'executionArn': arn, 'startDate': datetime.fromtimestamp(ejecucion.inicio)}
+
+    def list_executions(self, stateMachineArn, statusFilter=None, maxResults=100, **kwargs):
+        self.llamadas['list_executions'] += 1
+        ejecuciones = [
+            ejecucion for ejecucion in self.ejecuciones.values()
+            if statusFilter is None or ejecucion.estado == statusFilter
+        ]
+        ejecuciones.sort(key=lambda ejecucion: ejecucion.inicio, reverse=True)
+        return {'executions': [
+            {
+                'executionArn': ejecucion.arn,
+                'stateMachineArn': self.state_machine_arn,
+                'name': ejecucion.nombre,
+                'status': ejecucion.estado,
+                'startDate': datetime.fromtimestamp(ejecucion.inicio)
+            }
+            for ejecucion in ejecuciones[:maxResults]
+        ]}
+
+    def describe_execution(self, executionArn):
+        self.llamadas['describe_execution'] += 1
+        ejecucion = self._ejecucion(executionArn, 'DescribeExecution')
+        descripcion = {
+            'executionArn': ejecucion.arn,
+            'name': ejecucion.nombre,
+            'status': ejecucion.estado,
+            'startDate': datetime.fromtimestamp(ejecucion.inicio),
+            'input': json.dumps(ejecucion.entrada)
+        }
+        if ejecucion.fin is not None:
+            descripcion['stopDate'] = datetime.fromtimestamp(ejecucion.fin)
+        if ejecucion.salida is not None:
+            descripcion['output'] = json.dumps(ejecucion.salida)
+        if ejecucion.error is not None:
+            descripcion.update({'error': ejecucion.error, 'cause': ejecucion.causa})
+        return descripcion
+
+    def stop_execution(self, executionArn, error=None, cause=None):
+        self.llamadas['stop_execution'] += 1
+        ejecucion = self._ejecucion(executionArn, 'StopExecution')
+        if ejecucion.estado == 'RUNNING':
+            self._terminar(ejecucion, 'ABORTED', error=error, causa=cause)
+        return {'stopDate': datetime.fromtimestamp(self.reloj())}
+
+    def send_task_success(self, taskToken, output):
+        self.llamadas['send_task_success'] += 1
+        espera = self.tokens.get(taskToken)
+        if espera is None:
+            raise _error('InvalidToken', 'Invalid Token', 'SendTaskSuccess')
+        if espera['estado'] == 'vencido':
+            raise _error('TaskTimedOut', 'Task Timed Out', 'SendTaskSuccess')
+        if espera['estado'] != 'esperando':
+            raise _error('TaskDoesNotExist', 'Task Does Not Exist', 'SendTaskSuccess')
+        try:
+            resultado = json.loads(output)
+        except ValueError:
+            raise _error('InvalidOutput', 'Invalid Output', 'SendTaskSuccess')
+
+        espera['estado'] = 'completado'
+        ejecucion = espera['ejecucion']
+        # La ejecución sigue después, no dentro de la llamada de quien envía el token
+        self.programar(self.reloj(), lambda: self._completar_tarea(ejecucion, espera, resultado))
+        return {}
+
+    # Intérprete
+
+    def _ejecucion(self, arn, operacion):
+        if arn not in self.ejecuciones:
+            raise _error('ExecutionDoesNotExist', f'Execution Does Not Exist: {arn}', operacion)
+        return self.ejecuciones[arn]
+
+    def _programar(self, ejecucion, instante, nombre, datos, reintento=False):
+        paso = ejecucion.paso
+        self.programar(instante, lambda: paso == ejecucion.paso and self._correr(ejecucion, nombre, datos, reintento))
+
+    def _terminar(self, ejecucion, estado, salida=None, error=None, causa=None):
+        ejecucion.estado = estado
+        ejecucion.fin = self.reloj()
+        ejecucion.salida = salida
+        ejecucion.error = error
+        ejecucion.causa = causa
+        ejecucion.paso += 1
+        for espera in self.tokens.values():
+            if espera['ejecucion'] is ejecucion and espera['estado'] == 'esperando':
+                espera['estado'] = 'cancelado'
+
+    def _correr(self, ejecucion, nombre, datos, reintento=False):
+        """Avanza la ejecución desde el estado nombre hasta que espera o termina"""
+        while ejecucion.estado == 'RUNNING':
+            if not reintento:
+                # Los intentos de Retry se cuentan por cada entrada al estado
+                for clave in [clave for clave in ejecucion.reintentos if clave[0] == nombre]:
+                    del ejecucion.reintentos[clave]
+            reintento = False
+            ejecucion.paso += 1
+            ejecucion.estado_actual = nombre
+            ejecucion.transiciones.append(nombre)
+            estado = self.definicion['States'][nombre]
+            try:
+                siguiente = self._ejecutar_estado(ejecucion, nombre, estado, datos)
+            except ErrorEstado as e:
+                siguiente = self._manejar_error(ejecucion, nombre, estado, datos, e)
+            if siguiente is None:
+                return
+            nombre, datos = siguiente
+
+    def _contexto(self, ejecucion, nombre, token=None):
+        contexto = {
+            'Execution': {'Id': ejecucion.arn, 'Name': ejecucion.nombre, 'Input': ejecucion.entrada},
+            'State': {'Name': nombre},
+            'StateMachine': {'Id': self.state_machine_arn}
+        }
+        if token:
+            contexto['Task'] = {'Token': token}
+        return contexto
+
+    def _salida(self, estado, entrada, resultado, contexto):
+        if 'ResultSelector' in estado:
+            resultado = aplicar_plantilla(estado['ResultSelector'], resultado, contexto)
+        datos = escribir_ruta(estado.get('ResultPath', '$'), entrada, resultado)
+        return leer_ruta(estado['OutputPath'], datos) if 'OutputPath' in estado else datos
+
+    def _ejecutar_estado(self, ejecucion, nombre, estado, datos):
+        """Retorna (siguiente, datos), o None si la ejecución queda esperando o terminó"""
+        tipo = estado['Type']
+        entrada = leer_ruta(estado['InputPath'], datos) if 'InputPath' in estado else datos
+        contexto = self._contexto(ejecucion, nombre)
+
+        if tipo == 'Pass':
+            if 'Parameters' in estado:
+                resultado = aplicar_plantilla(estado['Parameters'], entrada, contexto)
+            else:
+                resultado = estado.get('Result', entrada)
+            return self._siguiente(ejecucion, estado, self._salida(estado, datos, resultado, contexto))
+
+        if tipo == 'Choice':
+            for regla in estado['Choices']:
+                if evaluar_regla(regla, entrada):
+                    return regla['Next'], datos
+            if 'Default' not in estado:
+                raise ErrorEstado('States.NoChoiceMatched', f'Ninguna regla de {nombre} se cumplió')
+            return estado['Default'], datos
+
+        if tipo == 'Wait':
+            segundos = estado['Seconds'] if 'Seconds' in estado else leer_ruta(estado['SecondsPath'], entrada)
+            self._programar(ejecucion, self.reloj() + segundos, estado['Next'], datos)
+            return None
+
+        if tipo == 'Succeed':
+            salida = leer_ruta(estado['OutputPath'], entrada) if 'OutputPath' in estado else entrada
+            self._terminar(ejecucion, 'SUCCEEDED', salida=salida)
+            return None
+
+        if tipo == 'Fail':
+            self._terminar(ejecucion, 'FAILED', error=estado.get('Error'), causa=estado.get('Cause'))
+            return None
+
+        if tipo == 'Task':
+            return self._tarea(ejecucion, nombre, estado, datos, entrada)
+
+        raise ErrorEstado('States.Runtime', f'Tipo de estado no soportado: {tipo}')
+
+    def _siguiente(self, ejecucion, estado, datos):
+        if estado.get('End'):
+            self._terminar(ejecucion, 'SUCCEEDED', salida=datos)
+            return None
+        return estado['Next'], datos
+
+    def _funcion(self, parametros):
+        nombre_funcion = parametros['FunctionName']
+        if nombre_funcion not in self.funciones:
+            raise ErrorEstado('Lambda.ResourceNotFoundException', f'Function not found: {nombre_funcion}')
+        return self.funciones[nombre_funcion]
+
+    def _tarea(self, ejecucion, nombre, estado, datos, entrada):
+        recurso = estado['Resource']
+        if not recurso.startswith('arn:aws:states:::lambda:invoke'):
+            raise ErrorEstado('States.Runtime', f'Recurso no soportado: {recurso}')
+
+        if recurso.endswith('.waitForTaskToken'):
+            token = f'token-{next(self._tokens)}-{ejecucion.nombre}'
+            parametros = aplicar_plantilla(estado['Parameters'], entrada, self._contexto(ejecucion, nombre, token))
+            nombre_funcion, handler = self._funcion(parametros)
+            # El token vale desde antes de invocar: el handler puede reanudar la
+            # ejecución en la misma invocación
+            espera = {'ejecucion': ejecucion, 'estado': 'esperando', 'nombre': nombre, 'datos': datos, 'paso': ejecucion.paso}
+            self.tokens[token] = espera
+            self.invocaciones[nombre_funcion] += 1
+            try:
+                invocar_handler(nombre_funcion, handler, parametros.get('Payload', {}))
+            except ErrorEstado:
+                if espera['estado'] == 'esperando':
+                    espera['estado'] = 'cancelado'
+                raise
+            if 'TimeoutSeconds' in estado:
+                self.programar(self.reloj() + estado['TimeoutSeconds'], lambda: self._vencer_token(ejecucion, espera))
+            return None
+
+        contexto = self._contexto(ejecucion, nombre)
+        parametros = aplicar_plantilla(estado['Parameters'], entrada, contexto)
+        nombre_funcion, handler = self._funcion(parametros)
+        self.invocaciones[nombre_funcion] += 1
+        respuesta = invocar_handler(nombre_funcion, handler, parametros.get('Payload', {}))
+        resultado = {'ExecutedVersion': '$LATEST', 'Payload': respuesta, 'StatusCode': 200}
+        return self._siguiente(ejecucion, estado, self._salida(estado, datos, resultado, contexto))
+
+    def _completar_tarea(self, ejecucion, espera, resultado):
+        if ejecucion.estado != 'RUNNING' or ejecucion.paso != espera['paso']:
+            return
+        estado = self.definicion['States'][espera['nombre']]
+        contexto = self._contexto(ejecucion, espera['nombre'])
+        try:
+            siguiente = self._siguiente(ejecucion, estado, self._salida(estado, espera['datos'], resultado, contexto))
+        except ErrorEstado as e:
+            siguiente = self._manejar_error(ejecucion, espera['nombre'], estado, espera['datos'], e)
+        if siguiente:
+            self._correr(ejecucion, *siguiente)
+
+    def _vencer_token(self, ejecucion, espera):
+        if espera['estado'] != 'esperando' or ejecucion.estado != 'RUNNING' or ejecucion.paso != espera['paso']:
+            return
+        espera['estado'] = 'vencido'
+        estado = self.definicion['States'][espera['nombre']]
+        siguiente = self._manejar_error(ejecucion, espera['nombre'], estado, espera['datos'], ErrorEstado('States.Timeout', 'Task timed out'))
+        if siguiente:
+            self._correr(ejecucion, *siguiente)
+
+    def _manejar_error(self, ejecucion, nombre, estado, datos, error):
+        """Aplica Retry y Catch del estado. Retorna (siguiente, datos) o None"""
+        for indice, reintento in enumerate(estado.get('Retry', [])):
+            if not _coincide(reintento['ErrorEquals'], error.nombre):
+                continue
+            intentos = ejecucion.reintentos[(nombre, indice)]
+            if intentos < reintento.get('MaxAttempts', 3):
+                ejecucion.reintentos[(nombre, indice)] += 1
+                espera = reintento.get('IntervalSeconds', 1) * reintento.get('BackoffRate', 2.0) ** intentos
+                self._programar(ejecucion, self.reloj() + espera, nombre, datos, reintento=True)
+                return None
+            break
+
+        for captura in estado.get('Catch', []):
+            if _coincide(captura['ErrorEquals'], error.nombre):
+                salida = escribir_ruta(captura.get('ResultPath', '$'), datos, {'Error': error.nombre, 'Cause': error.causa})
+                return captura['Next'], salida
+
+        self._terminar(ejecucion, 'FAILED', error=error.nombre, causa=error.causa)
+        return None
+
+class LambdaEnMemoria:
+    """Cliente de Lambda que invoca los handlers del proceso por el sufijo del nombre de la función"""
+
+    def __init__(self, funciones):
+        # sufijo del FunctionName ("liberar-pedido") -> (nombre, handler)
+        self.funciones = funciones
+        self.invocaciones = Counter()
+
+    def invoke(self, FunctionName, InvocationType='RequestResponse', Payload=b'{}'):
+        for sufijo, (nombre, handler) in self.funciones.items():
+            if FunctionName.endswith(sufijo):
+                break
+        else:
+            raise _error('ResourceNotFoundException', f'Function not found: {FunctionName}', 'Invoke')
+
+        self.invocaciones[nombre] += 1
+        try:
+            respuesta = invocar_handler(nombre, handler, json.loads(Payload))
+            return {'StatusCode': 200, 'Payload': io.BytesIO(json.dumps(respuesta).encode('utf-8'))}
+        except ErrorEstado as e:
+            error = {'errorType': e.nombre, 'errorMessage': e.causa}
+            return {'StatusCode': 200, 'FunctionError': 'Unhandled', 'Payload': io.BytesIO(json.dumps(error).encode('utf-8'))}
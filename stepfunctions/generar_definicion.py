@@ -0,0 +1,340 @@
+"""
+Genera la definición del Step Function de pedidos a partir de la tabla de etapas.
+
+Escribe la definición en stepfunctions/pedido_workflow.asl.json y la incrusta en
+serverless.yml (resources.Resources.PedidoWorkflowStateMachine.DefinitionString).
+
+Las esperas de preparación se eligen en cada ejecución con el campo modo_realista
+del input, que iniciar_workflow toma de la variable MODO_REALISTA.
+
+Uso:
+    python stepfunctions/generar_definicion.py              # actualiza los archivos
+    python stepfunctions/generar_definicion.py --verificar  # falla si hay cambios sin generar
+"""
+import argparse
+import json
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_ASL = os.path.join(RAIZ, 'stepfunctions', 'pedido_workflow.asl.json')
+RUTA_SERVERLESS = os.path.join(RAIZ, 'serverless.yml')
+
+# Tabla de etapas con asignación de empleado, en orden de ejecución.
+# - entrada: campos extra del Payload, tomados del resultado de etapas anteriores
+# - salida: campos del resultado de la Lambda que se conservan en el estado
+# - espera: segundos de preparación antes de pasar a la siguiente etapa
+# - rol: empleado que asigna la etapa; si no hay uno libre, la ejecución queda
+#   esperando hasta que la asignación por lotes le reserve uno
+ETAPAS = [
+    {
+        'nombre': 'Cocinar',
+        'clave': 'cocinar',
+        'funcion': 'CocinarLambdaArn',
+        'rol': 'Cocinero',
+        'entrada': {},
+        'salida': ['cocinero_dni'],
+        'espera': {'realista': 900, 'demo': 10}
+    },
+    {
+        'nombre': 'Empacar',
+        'clave': 'empacar',
+        'funcion': 'EmpacarLambdaArn',
+        'rol': 'Despachador',
+        'entrada': {'cocinero_dni': '$.cocinar.cocinero_dni'},
+        'salida': ['despachador_dni'],
+        'espera': {'realista': 300, 'demo': 10}
+    },
+    {
+        'nombre': 'Enviar',
+        'clave': 'enviar',
+        'funcion': 'EnviarLambdaArn',
+        'rol': 'Repartidor',
+        'entrada': {'despachador_dni': '$.empacar.despachador_dni'},
+        'salida': ['repartidor_dni', 'usuario_correo'],
+        'espera': {'realista': 1800, 'demo': 10}
+    }
+]
+
+MAX_INTENTOS = 5
+ESPERA_REINTENTO_SEGUNDOS = 30
+TIMEOUT_CONFIRMACION_SEGUNDOS = 3600
+
+def _payload_base(entrada=None):
+    """Payload mínimo (solo IDs) que recibe cada Lambda"""
+    payload = {
+        'local_id.$': '$.local_id',
+        'pedido_id.$': '$.pedido_id',
+        'execution_id.$': '$$.Execution.Id'
+    }
+    for campo, ruta in (entrada or {}).items():
+        payload[f'{campo}.$'] = ruta
+    return payload
+
+def _estados_etapa(etapa, siguiente):
+    """Estados de una etapa: tarea, espera de preparación y bucle de reintentos"""
+    nombre = etapa['nombre']
+    clave = etapa['clave']
+    contador = f'intentos_{clave}'
+
+    contadores = {}
+    for otra in ETAPAS:
+        otro_contador = f'intentos_{otra["clave"]}'
+        if otra is etapa:
+            contadores[f'{otro_contador}.$'] = f'States.MathAdd($.contadores.{otro_contador}, 1)'
+        else:
+            contadores[f'{otro_contador}.$'] = f'$.contadores.{otro_contador}'
+
+    return {
+        f'Intentar{nombre}': {
+            'Type': 'Task',
+            'Resource': 'arn:aws:states:::lambda:invoke',
+            'Parameters': {
+                'FunctionName': f'${{{etapa["funcion"]}}}',
+                # Los contadores de reintentos alimentan la prioridad del pedido
+                'Payload': _payload_base({**etapa['entrada'], 'contadores': '$.contadores'})
+            },
+            # Solo se conservan los IDs del resultado, no el sobre completo de la Lambda
+            'ResultSelector': {f'{campo}.$': f'$.Payload.{campo}' for campo in etapa['salida']},
+            'ResultPath': f'$.{clave}',
+            'Retry': [{'ErrorEquals': ['States.TaskFailed'], 'MaxAttempts': 0}],
+            'Catch': [{'ErrorEquals': ['States.ALL'], 'ResultPath': '$.error', 'Next': f'IncrementarIntentos{nombre}'}],
+            'Next': f'EsperaPreparacion{nombre}'
+        },
+        f'EsperaPreparacion{nombre}': {
+            'Type': 'Choice',
+            'Choices': [{
+                'And': [
+                    {'Variable': '$.modo_realista', 'IsPresent': True},
+                    {'Variable': '$.modo_realista', 'BooleanEquals': True}
+                ],
+                'Next': f'EsperaRealista{nombre}'
+            }],
+            'Default': f'EsperaDemo{nombre}'
+        },
+        f'EsperaRealista{nombre}': {
+            'Type': 'Wait',
+            'Seconds': etapa['espera']['realista'],
+            'Next': siguiente
+        },
+        f'EsperaDemo{nombre}': {
+            'Type': 'Wait',
+            'Seconds': etapa['espera']['demo'],
+            'Next': siguiente
+        },
+        f'IncrementarIntentos{nombre}': {
+            'Type': 'Pass',
+            'Parameters': contadores,
+            'ResultPath': '$.contadores',
+            'Next': f'VerificarMaximoIntentos{nombre}'
+        },
+        f'VerificarMaximoIntentos{nombre}': {
+            'Type': 'Choice',
+            'Choices': [{'Variable': f'$.contadores.{contador}', 'NumericLessThan': MAX_INTENTOS, 'Next': f'EsperarEmpleado{nombre}'}],
+            'Default': 'ServicioSaturado'
+        },
+        # La asignación por lotes reanuda la ejecución (SendTaskSuccess) apenas
+        # reserva un empleado para el pedido; si no llega, se reintenta igual
+        f'EsperarEmpleado{nombre}': {
+            'Type': 'Task',
+            'Resource': 'arn:aws:states:::lambda:invoke.waitForTaskToken',
+            'Parameters': {
+                'FunctionName': '${EsperarEmpleadoLambdaArn}',
+                'Payload': {
+                    'local_id.$': '$.local_id',
+                    'pedido_id.$': '$.pedido_id',
+                    'role': etapa['rol'],
+                    'taskToken.$': '$$.Task.Token'
+                }
+            },
+            'ResultPath': None,
+            'TimeoutSeconds': ESPERA_REINTENTO_SEGUNDOS,
+            'Catch': [
+                {'ErrorEquals': ['States.Timeout'], 'ResultPath': None, 'Next': f'Intentar{nombre}'},
+                {'ErrorEquals': ['States.ALL'], 'ResultPath': None, 'Next': f'EsperarReintentoEmpleado{nombre}'}
+            ],
+            'Next': f'Intentar{nombre}'
+        },
+        f'EsperarReintentoEmpleado{nombre}': {
+            'Type': 'Wait',
+            'Seconds': ESPERA_REINTENTO_SEGUNDOS,
+            'Next': f'Intentar{nombre}'
+        }
+    }
+
+def generar_definicion():
+    """Construye la definición ASL completa del workflow"""
+    estados = {
+        'InicializarContadores': {
+            'Type': 'Pass',
+            'Result': {f'intentos_{etapa["clave"]}': 0 for etapa in ETAPAS},
+            'ResultPath': '$.contadores',
+            'Next': f'Intentar{ETAPAS[0]["nombre"]}'
+        }
+    }
+
+    for indice, etapa in enumerate(ETAPAS):
+        if indice + 1 < len(ETAPAS):
+            siguiente = f'Intentar{ETAPAS[indice + 1]["nombre"]}'
+        else:
+            siguiente = 'EsperarConfirmacionUsuario'
+        estados.update(_estados_etapa(etapa, siguiente))
+
+    ultima = ETAPAS[-1]['clave']
+
+    estados.update({
+        'EsperarConfirmacionUsuario': {
+            'Type': 'Task',
+            'Resource': 'arn:aws:states:::lambda:invoke.waitForTaskToken',
+            'Parameters': {
+                'FunctionName': '${NotificarUsuarioLambdaArn}',
+                'Payload': {
+                    'local_id.$': '$.local_id',
+                    'pedido_id.$': '$.pedido_id',
+                    'usuario_correo.$': f'$.{ultima}.usuario_correo',
+                    'repartidor_dni.$': f'$.{ultima}.repartidor_dni',
+                    'taskToken.$': '$$.Task.Token'
+                }
+            },
+            'ResultPath': '$.confirmacion_usuario',
+            'TimeoutSeconds': TIMEOUT_CONFIRMACION_SEGUNDOS,
+            'Catch': [
+                {'ErrorEquals': ['States.Timeout'], 'ResultPath': '$.error', 'Next': 'ConfirmacionAutomatica'},
+                {'ErrorEquals': ['States.ALL'], 'ResultPath': '$.error', 'Next': 'ErrorWorkflow'}
+            ],
+            'Next': 'ConfirmarEntrega'
+        },
+        'ConfirmacionAutomatica': {
+            'Type': 'Pass',
+            'Result': {'confirmado': True, 'tipo': 'automatico', 'mensaje': 'Confirmación automática por timeout'},
+            'ResultPath': '$.confirmacion_usuario',
+            'Next': 'ConfirmarEntrega'
+        },
+        'ConfirmarEntrega': {
+            'Type': 'Task',
+            'Resource': 'arn:aws:states:::lambda:invoke',
+            'Parameters': {
+                'FunctionName': '${ConfirmarLambdaArn}',
+                'Payload': _payload_base({
+                    'repartidor_dni': f'$.{ultima}.repartidor_dni',
+                    'confirmacion_usuario': '$.confirmacion_usuario'
+                })
+            },
+            'ResultSelector': {'pedido_id.$': '$.Payload.pedido_id', 'estado.$': '$.Payload.estado'},
+            'ResultPath': '$.resultado_final',
+            'Catch': [{'ErrorEquals': ['States.ALL'], 'ResultPath': '$.error', 'Next': 'ErrorWorkflow'}],
+            'Next': 'PedidoCompletado'
+        },
+        'PedidoCompletado': {'Type': 'Succeed', 'OutputPath': '$.resultado_final'},
+        'ServicioSaturado': {
+            'Type': 'Task',
+            'Resource': 'arn:aws:states:::lambda:invoke',
+            'Parameters': {
+                'FunctionName': '${LiberarPedidoLambdaArn}',
+                'Payload': {'local_id.$': '$.local_id', 'pedido_id.$': '$.pedido_id', 'motivo': 'servicio_saturado'}
+            },
+            'ResultPath': None,
+            'Next': 'ServicioSaturadoFinal',
+            'Catch': [{'ErrorEquals': ['States.ALL'], 'ResultPath': None, 'Next': 'ServicioSaturadoFinal'}]
+        },
+        'ServicioSaturadoFinal': {
+            'Type': 'Fail',
+            'Error': 'ServicioSaturado',
+            'Cause': f'No se encontraron empleados disponibles después de {MAX_INTENTOS} intentos.'
+        },
+        # Cualquier otro fallo también libera los empleados y el cupo del pedido.
+        # El pedido ya se entregó, así que conserva su estado e historial
+        'ErrorWorkflow': {
+            'Type': 'Task',
+            'Resource': 'arn:aws:states:::lambda:invoke',
+            'Parameters': {
+                'FunctionName': '${LiberarPedidoLambdaArn}',
+                'Payload': {
+                    'local_id.$': '$.local_id',
+                    'pedido_id.$': '$.pedido_id',
+                    'motivo': 'error_workflow',
+                    'resetear_estado': False
+                }
+            },
+            'ResultPath': None,
+            'Next': 'ErrorWorkflowFinal',
+            'Catch': [{'ErrorEquals': ['States.ALL'], 'ResultPath': None, 'Next': 'ErrorWorkflowFinal'}]
+        },
+        'ErrorWorkflowFinal': {
+            'Type': 'Fail',
+            'Error': 'ErrorWorkflow',
+            'Cause': 'El pedido falló en la confirmación de la entrega; sus empleados y su cupo fueron liberados.'
+        }
+    })
+
+    return {
+        'Comment': 'Workflow de procesamiento de pedidos ChinaWok',
+        'StartAt': 'InicializarContadores',
+        'States': estados
+    }
+
+def _renderizar_serverless(definicion, sangria):
+    """Renderiza la definición con un estado por línea, como en serverless.yml"""
+    lineas = [
+        '{',
+        f'  "Comment": {json.dumps(definicion["Comment"], ensure_ascii=False)},',
+        f'  "StartAt": {json.dumps(definicion["StartAt"])},',
+        '  "States": {'
+    ]
+    estados = list(definicion['States'].items())
+    for indice, (nombre, estado) in enumerate(estados):
+        coma = ',' if indice + 1 < len(estados) else ''
+        lineas.append(f'    {json.dumps(nombre)}: {json.dumps(estado, ensure_ascii=False)}{coma}')
+    lineas.extend(['  }', '}'])
+    return ''.join(f'{sangria}{linea}\n' for linea in lineas)
+
+def _contenido_asl(definicion):
+    documento = {
+        '_comment': '⚠️ ARCHIVO GENERADO por stepfunctions/generar_definicion.py - no editar a mano',
+        '_comment2': 'Modifica la tabla ETAPAS del script y vuelve a ejecutarlo; también actualiza serverless.yml'
+    }
+    documento.update(definicion)
+    return json.dumps(documento, indent=2, ensure_ascii=False) + '\n'
+
+def _contenido_serverless(definicion):
+    with open(RUTA_SERVERLESS, encoding='utf-8') as f:
+        lineas = f.readlines()
+
+    inicio = next(i for i, linea in enumerate(lineas) if linea.strip() == 'Fn::Sub:') + 2
+    fin = next(i for i in range(inicio, len(lineas)) if lineas[i].strip().startswith('- CocinarLambdaArn:'))
+    sangria = ' ' * (len(lineas[inicio - 1]) - len(lineas[inicio - 1].lstrip()) + 2)
+
+    return ''.join(lineas[:inicio]) + _renderizar_serverless(definicion, sangria) + ''.join(lineas[fin:])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Genera la definición del Step Function de pedidos')
+    parser.add_argument('--verificar', action='store_true', help='No escribe archivos, falla si no están actualizados')
+    args = parser.parse_args(argv)
+
+    definicion = generar_definicion()
+    archivos = {
+        RUTA_ASL: _contenido_asl(definicion),
+        RUTA_SERVERLESS: _contenido_serverless(definicion)
+    }
+
+    desactualizados = []
+    for ruta, contenido in archivos.items():
+        actual = ''
+        if os.path.exists(ruta):
+            with open(ruta, encoding='utf-8') as f:
+                actual = f.read()
+        if actual == contenido:
+            continue
+        desactualizados.append(ruta)
+        if not args.verificar:
+            with open(ruta, 'w', encoding='utf-8') as f:
+                f.write(contenido)
+
+    for ruta in desactualizados:
+        accion = 'Desactualizado' if args.verificar else 'Actualizado'
+        print(f'{accion}: {os.path.relpath(ruta, RAIZ)}')
+
+    return 1 if args.verificar and desactualizados else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
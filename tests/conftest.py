@@ -0,0 +1,51 @@
+"""
+Tablas compartidas por los tests.
+
+pytest carga este módulo solo; con unittest cada test lo importa (discover -s
+tests deja esta carpeta en sys.path). Las tablas son las de
+carga/dynamodb_en_memoria.py con las claves e índices del despliegue, así que
+las condiciones y expresiones de los helpers se evalúan de verdad.
+"""
+import os
+import sys
+from unittest import mock
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'workflow'))
+sys.path.insert(0, os.path.join(RAIZ, 'carga'))
+
+TABLAS_TEST = {
+    'TABLE_PEDIDOS': 'ChinaWok-Pedidos-Test',
+    'TABLE_EMPLEADOS': 'ChinaWok-Empleados-Test',
+    'TABLE_USUARIOS': 'ChinaWok-Usuarios-Test',
+    'TABLE_IDEMPOTENCIA': 'ChinaWok-Workflow-Idempotencia-Test',
+    'TABLE_CAPACIDAD_LOCALES': 'ChinaWok-Workflow-Capacidad-Locales-Test',
+    'TABLE_NOTIFICACIONES': 'ChinaWok-Workflow-Notificaciones-Test'
+}
+for variable, nombre in TABLAS_TEST.items():
+    os.environ.setdefault(variable, nombre)
+
+from dynamodb_en_memoria import DynamoDBEnMemoria, LIMITE_PAGINA
+from generador_carga import crear_tablas
+from utils import dynamodb_helper
+
+
+def crear_dynamodb(limite_pagina=LIMITE_PAGINA):
+    """DynamoDB en memoria con las tablas del workflow"""
+    dynamodb = DynamoDBEnMemoria(limite_pagina)
+    crear_tablas(dynamodb)
+    return dynamodb
+
+
+def tabla(dynamodb, variable):
+    """Tabla en memoria de la variable de entorno (TABLE_PEDIDOS, ...)"""
+    return dynamodb.Table(os.environ[variable])
+
+
+def usar_dynamodb(test, dynamodb, *modulos):
+    """Durante el test, dynamodb_helper y el resource `dynamodb` de cada módulo usan la base en memoria"""
+    parches = [mock.patch.object(dynamodb_helper, '_dynamodb', return_value=dynamodb)]
+    parches += [mock.patch.object(modulo, 'dynamodb', dynamodb) for modulo in modulos]
+    for parche in parches:
+        parche.start()
+        test.addCleanup(parche.stop)
@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'workflow'))
+
+from utils import archivo_pedidos
+
+
+def _pedido(pedido_id):
+    return {
+        'local_id': 'LOCAL001',
+        'pedido_id': pedido_id,
+        'estado': 'recibido',
+        'historial_estados': [{'estado': 'recibido'}],
+        '_particion': 'LOCAL001'
+    }
+
+
+class ArchivoPedidosTest(unittest.TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        entorno = mock.patch.dict(os.environ, {'ARCHIVO_PEDIDOS_URI': carpeta.name})
+        entorno.start()
+        self.addCleanup(entorno.stop)
+
+    def test_reintentar_el_mismo_grupo_sobrescribe_el_archivo(self):
+        primera = archivo_pedidos.escribir_particion('LOCAL001', '2026-10-01', [_pedido('P1'), _pedido('P2')])
+        segunda = archivo_pedidos.escribir_particion('LOCAL001', '2026-10-01', [_pedido('P2'), _pedido('P1')])
+
+        self.assertEqual(primera, segunda)
+        self.assertEqual(len(archivo_pedidos._listar('local_id=LOCAL001/')), 1)
+
+    def test_lector_entrega_cada_pedido_una_vez(self):
+        archivo_pedidos.escribir_particion('LOCAL001', '2026-10-01', [_pedido('P1')])
+        archivo_pedidos.escribir_particion('LOCAL001', '2026-10-01', [_pedido('P1'), _pedido('P2')])
+
+        pedidos = list(archivo_pedidos.leer_pedidos_archivados('LOCAL001', '2026-10-01', '2026-10-01', ['estado']))
+
+        self.assertEqual(len(pedidos), 2)
+        self.assertEqual(pedidos[0], {'estado': 'recibido'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'workflow'))
+
+from utils import dynamodb_helper
+
+
+def hace(minutos):
+    return (datetime.now() - timedelta(minutes=minutos)).isoformat()
+
+
+class CalcularAsignacionesTest(unittest.TestCase):
+
+    def _pedidos_asignados(self, pedidos, empleados):
+        return [(pedido['pedido_id'], empleado['dni']) for pedido, empleado in dynamodb_helper.calcular_asignaciones(pedidos, empleados)]
+
+    def test_atiende_primero_la_mayor_prioridad_vigente(self):
+        pedidos = [
+            {'pedido_id': 'reciente', 'prioridad': Decimal('0'), 'inicio_pedido': hace(1), 'espera_desde': hace(1)},
+            {'pedido_id': 'vip', 'prioridad': Decimal('30'), 'inicio_pedido': hace(1), 'espera_desde': hace(1)},
+            {'pedido_id': 'antiguo', 'prioridad': Decimal('0'), 'inicio_pedido': hace(20), 'espera_desde': hace(2)}
+        ]
+        empleados = [{'dni': 'C1', 'capacidad': 3, 'carga_actual': 0}]
+
+        self.assertEqual(
+            [pedido_id for pedido_id, _ in self._pedidos_asignados(pedidos, empleados)],
+            ['vip', 'antiguo', 'reciente']
+        )
+
+    def test_a_igual_prioridad_atiende_la_espera_mas_antigua(self):
+        inicio = hace(5)
+        pedidos = [
+            {'pedido_id': 'P2', 'prioridad': 0, 'inicio_pedido': inicio, 'espera_desde': '2026-01-01T10:00:02'},
+            {'pedido_id': 'P1', 'prioridad': 0, 'inicio_pedido': inicio, 'espera_desde': '2026-01-01T10:00:01'}
+        ]
+        empleados = [{'dni': 'C1', 'capacidad': 1, 'carga_actual': 0}]
+
+        self.assertEqual(self._pedidos_asignados(pedidos, empleados), [('P1', 'C1')])
+
+    def test_reparte_los_slots_por_rondas_segun_calificacion(self):
+        pedidos = [{'pedido_id': f'P{numero}', 'prioridad': 10 - numero, 'inicio_pedido': hace(0)} for numero in range(5)]
+        empleados = [
+            {'dni': 'regular', 'calificacion_prom': Decimal('4.0'), 'capacidad': 2, 'carga_actual': 1},
+            {'dni': 'mejor', 'calificacion_prom': Decimal('4.8'), 'capacidad': 2, 'carga_actual': 0},
+            {'dni': 'lleno', 'calificacion_prom': Decimal('5.0'), 'capacidad': 1, 'carga_actual': 1}
+        ]
+
+        self.assertEqual(
+            self._pedidos_asignados(pedidos, empleados),
+            [('P0', 'mejor'), ('P1', 'regular'), ('P2', 'mejor')]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'workflow'))
+
+from utils.concurrencia import ejecutar_en_paralelo, ErrorEjecucionParalela
+
+
+def fallar():
+    raise ValueError('sin stock')
+
+
+class EjecutarEnParaleloTest(unittest.TestCase):
+
+    def setUp(self):
+        salida = mock.patch('sys.stdout')
+        salida.start()
+        self.addCleanup(salida.stop)
+
+    def test_sin_errores_no_compensa(self):
+        compensar = mock.Mock()
+
+        resultados = ejecutar_en_paralelo({'a': lambda: 1, 'b': lambda: 2}, {'a': compensar})
+
+        self.assertEqual(resultados, {'a': 1, 'b': 2})
+        compensar.assert_not_called()
+
+    def test_un_error_compensa_solo_las_tareas_que_terminaron_bien(self):
+        compensaciones = {'a': mock.Mock(), 'b': mock.Mock(), 'c': mock.Mock()}
+
+        with self.assertRaises(ErrorEjecucionParalela) as contexto:
+            ejecutar_en_paralelo({'a': lambda: 'reserva-a', 'b': fallar, 'c': lambda: 'reserva-c'}, compensaciones)
+
+        compensaciones['a'].assert_called_once_with('reserva-a')
+        compensaciones['c'].assert_called_once_with('reserva-c')
+        compensaciones['b'].assert_not_called()
+        self.assertEqual(list(contexto.exception.errores), ['b'])
+        self.assertEqual(contexto.exception.resultados, {'a': 'reserva-a', 'c': 'reserva-c'})
+        self.assertEqual(contexto.exception.errores_compensacion, {})
+
+    def test_un_error_compensando_no_impide_compensar_las_demas(self):
+        compensar_c = mock.Mock()
+
+        with self.assertRaises(ErrorEjecucionParalela) as contexto:
+            ejecutar_en_paralelo(
+                {'a': lambda: 1, 'b': fallar, 'c': lambda: 3},
+                {'a': mock.Mock(side_effect=RuntimeError('tabla caída')), 'c': compensar_c}
+            )
+
+        compensar_c.assert_called_once_with(3)
+        self.assertEqual(list(contexto.exception.errores_compensacion), ['a'])
+
+    def test_dentro_del_pool_las_tareas_corren_en_el_mismo_hilo(self):
+        def hilos_anidados():
+            return ejecutar_en_paralelo({
+                'x': lambda: threading.current_thread().name,
+                'y': lambda: threading.current_thread().name
+            })
+
+        resultados = ejecutar_en_paralelo({'uno': hilos_anidados, 'dos': hilos_anidados})
+
+        for anidados in resultados.values():
+            self.assertEqual(anidados['x'], anidados['y'])
+            self.assertTrue(anidados['x'].startswith('workflow'))
+
+
+if __name__ == '__main__':
+    unittest.main()
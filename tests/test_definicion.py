@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'stepfunctions'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'carga'))
+
+import generar_definicion
+from stepfunctions_en_memoria import StepFunctionsEnMemoria
+
+
+class DefinicionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.estados = generar_definicion.generar_definicion()['States']
+
+    def test_error_tras_la_entrega_no_resetea_el_pedido(self):
+        payload = self.estados['ErrorWorkflow']['Parameters']['Payload']
+
+        self.assertEqual(payload['motivo'], 'error_workflow')
+        self.assertIs(payload['resetear_estado'], False)
+
+    def test_la_confirmacion_y_la_entrega_fallidas_liberan_el_pedido(self):
+        for estado in ('EsperarConfirmacionUsuario', 'ConfirmarEntrega'):
+            destinos = {captura['Next'] for captura in self.estados[estado]['Catch']}
+            self.assertIn('ErrorWorkflow', destinos)
+
+
+class EsperasPreparacionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ahora = 0
+        self.eventos = []
+        definicion = generar_definicion.generar_definicion()
+        funciones = {
+            estado['Parameters']['FunctionName']: ('etapa', self._etapa)
+            for estado in definicion['States'].values() if estado['Type'] == 'Task'
+        }
+        self.sfn = StepFunctionsEnMemoria(definicion, funciones, lambda: self.ahora, self._programar, 'arn:maquina')
+
+    def _etapa(self, evento, contexto):
+        return {'cocinero_dni': 'C1', 'despachador_dni': 'D1', 'repartidor_dni': 'R1', 'usuario_correo': 'u@x.com'}
+
+    def _programar(self, instante, funcion):
+        self.eventos.append((instante, funcion))
+        self.eventos.sort(key=lambda evento: evento[0])
+
+    def _hasta_la_confirmacion(self, entrada):
+        """Corre la ejecución hasta que espera la confirmación del usuario y retorna la ejecución"""
+        # Los eventos pendientes de una ejecución anterior (su timeout) no cuentan
+        self.eventos.clear()
+        arn = self.sfn.start_execution(stateMachineArn='arn:maquina', name=f'E{len(self.sfn.ejecuciones)}', input=json.dumps(entrada))['executionArn']
+        ejecucion = self.sfn.ejecuciones[arn]
+        while self.eventos and 'EsperarConfirmacionUsuario' not in ejecucion.transiciones:
+            self.ahora, funcion = self.eventos.pop(0)
+            funcion()
+        return ejecucion
+
+    def _esperas(self, modo):
+        return sum(etapa['espera'][modo] for etapa in generar_definicion.ETAPAS)
+
+    def test_modo_realista_usa_las_esperas_realistas(self):
+        inicio = self.ahora
+        ejecucion = self._hasta_la_confirmacion({'local_id': 'L1', 'pedido_id': 'P1', 'modo_realista': True})
+
+        self.assertIn('EsperaRealistaCocinar', ejecucion.transiciones)
+        self.assertNotIn('EsperaDemoCocinar', ejecucion.transiciones)
+        self.assertEqual(self.ahora - inicio, self._esperas('realista'))
+
+    def test_sin_modo_realista_usa_las_esperas_demo(self):
+        for entrada in ({'modo_realista': False}, {}):
+            with self.subTest(entrada=entrada):
+                inicio = self.ahora
+                ejecucion = self._hasta_la_confirmacion({'local_id': 'L1', 'pedido_id': 'P1', **entrada})
+
+                self.assertNotIn('EsperaRealistaEnviar', ejecucion.transiciones)
+                self.assertEqual(self.ahora - inicio, self._esperas('demo'))
+
+
+if __name__ == '__main__':
+    unittest.main()
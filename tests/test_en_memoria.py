@@ -0,0 +1,184 @@
+import os
+import sys
+import unittest
+
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'carga'))
+
+from dynamodb_en_memoria import DynamoDBEnMemoria
+from stepfunctions_en_memoria import StepFunctionsEnMemoria, evaluar_regla
+
+
+class DynamoDBEnMemoriaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dynamodb = DynamoDBEnMemoria(limite_pagina=2)
+        self.dynamodb.crear_tabla('Pedidos', 'local_id', 'pedido_id', [
+            ('en-espera', 'espera', 'desde', ('estado',))
+        ])
+        self.tabla = self.dynamodb.Table('Pedidos')
+
+    def _codigo(self, contexto):
+        return contexto.exception.response['Error']['Code']
+
+    def test_update_condicional_falla_sin_escribir(self):
+        self.tabla.put_item(Item={'local_id': 'L1', 'pedido_id': 'P1', 'carga': 1})
+
+        with self.assertRaises(ClientError) as contexto:
+            self.tabla.update_item(
+                Key={'local_id': 'L1', 'pedido_id': 'P1'},
+                UpdateExpression='SET carga = carga + :uno',
+                ConditionExpression='carga < :limite',
+                ExpressionAttributeValues={':uno': 1, ':limite': 1}
+            )
+
+        self.assertEqual(self._codigo(contexto), 'ConditionalCheckFailedException')
+        self.assertEqual(self.tabla.get_item(Key={'local_id': 'L1', 'pedido_id': 'P1'})['Item']['carga'], 1)
+
+    def test_indice_disperso_pagina_y_proyecta(self):
+        for numero in range(3):
+            self.tabla.put_item(Item={'local_id': 'L1', 'pedido_id': f'P{numero}', 'espera': 'L1#Cocinero', 'desde': numero, 'estado': 'cocinando', 'otro': 1})
+        self.tabla.put_item(Item={'local_id': 'L1', 'pedido_id': 'P9'})
+
+        pagina = self.tabla.query(IndexName='en-espera', KeyConditionExpression='espera = :e', ExpressionAttributeValues={':e': 'L1#Cocinero'})
+        siguiente = self.tabla.query(
+            IndexName='en-espera',
+            KeyConditionExpression='espera = :e',
+            ExpressionAttributeValues={':e': 'L1#Cocinero'},
+            ExclusiveStartKey=pagina['LastEvaluatedKey']
+        )
+
+        self.assertEqual([item['pedido_id'] for item in pagina['Items'] + siguiente['Items']], ['P0', 'P1', 'P2'])
+        self.assertNotIn('otro', pagina['Items'][0])
+        self.assertNotIn('LastEvaluatedKey', siguiente)
+
+    def test_valores_sin_usar_son_invalidos(self):
+        with self.assertRaises(ClientError) as contexto:
+            self.tabla.put_item(
+                Item={'local_id': 'L1', 'pedido_id': 'P1'},
+                ConditionExpression='attribute_not_exists(pedido_id)',
+                ExpressionAttributeValues={':sobra': 1}
+            )
+
+        self.assertEqual(self._codigo(contexto), 'ValidationException')
+
+    def test_transaccion_cancelada_no_escribe_nada(self):
+        self.tabla.put_item(Item={'local_id': 'L1', 'pedido_id': 'P1'})
+
+        with self.assertRaises(ClientError) as contexto:
+            self.dynamodb.meta.client.transact_write_items(TransactItems=[
+                {'Put': {'TableName': 'Pedidos', 'Item': {'local_id': 'L1', 'pedido_id': 'P2'}}},
+                {'Put': {
+                    'TableName': 'Pedidos',
+                    'Item': {'local_id': 'L1', 'pedido_id': 'P1'},
+                    'ConditionExpression': 'attribute_not_exists(pedido_id)'
+                }}
+            ])
+
+        razones = [razon['Code'] for razon in contexto.exception.response['CancellationReasons']]
+        self.assertEqual(razones, ['None', 'ConditionalCheckFailed'])
+        self.assertNotIn('Item', self.tabla.get_item(Key={'local_id': 'L1', 'pedido_id': 'P2'}))
+
+
+class StepFunctionsEnMemoriaTest(unittest.TestCase):
+
+    DEFINICION = {
+        'StartAt': 'Tarea',
+        'States': {
+            'Tarea': {
+                'Type': 'Task',
+                'Resource': 'arn:aws:states:::lambda:invoke',
+                'Parameters': {'FunctionName': '${TareaLambdaArn}', 'Payload.$': '$'},
+                'ResultSelector': {'valor.$': '$.Payload.valor'},
+                'Retry': [{'ErrorEquals': ['ValueError'], 'IntervalSeconds': 2, 'MaxAttempts': 1}],
+                'Catch': [{'ErrorEquals': ['States.ALL'], 'ResultPath': '$.error', 'Next': 'Fallo'}],
+                'Next': 'Esperar'
+            },
+            'Esperar': {
+                'Type': 'Task',
+                'Resource': 'arn:aws:states:::lambda:invoke.waitForTaskToken',
+                'Parameters': {'FunctionName': '${EsperaLambdaArn}', 'Payload': {'token.$': '$$.Task.Token'}},
+                'TimeoutSeconds': 60,
+                'Catch': [{'ErrorEquals': ['States.Timeout'], 'Next': 'Fallo'}],
+                'End': True
+            },
+            'Fallo': {'Type': 'Fail', 'Error': 'Fallo'}
+        }
+    }
+
+    def setUp(self):
+        self.ahora = 0
+        self.eventos = []
+        self.tokens = []
+        self.fallos = []
+        funciones = {
+            '${TareaLambdaArn}': ('tarea', self._tarea),
+            '${EsperaLambdaArn}': ('espera', lambda evento, contexto: self.tokens.append(evento['token']))
+        }
+        self.sfn = StepFunctionsEnMemoria(self.DEFINICION, funciones, lambda: self.ahora, self._programar, 'arn:maquina')
+
+    def _tarea(self, evento, contexto):
+        if self.fallos:
+            raise self.fallos.pop(0)
+        return {'valor': evento['valor'] * 2}
+
+    def _programar(self, instante, funcion):
+        self.eventos.append((instante, funcion))
+        self.eventos.sort(key=lambda evento: evento[0])
+
+    def _correr(self, hasta=float('inf')):
+        while self.eventos and self.eventos[0][0] <= hasta:
+            self.ahora, funcion = self.eventos.pop(0)
+            funcion()
+
+    def _iniciar(self):
+        arn = self.sfn.start_execution(stateMachineArn='arn:maquina', name='E1', input='{"valor": 2}')['executionArn']
+        return self.sfn.ejecuciones[arn]
+
+    def test_reintenta_y_espera_el_token(self):
+        self.fallos = [ValueError('una vez')]
+        ejecucion = self._iniciar()
+        self._correr(hasta=10)
+
+        self.assertEqual(ejecucion.estado, 'RUNNING')
+        self.assertEqual(ejecucion.transiciones, ['Tarea', 'Tarea', 'Esperar'])
+        self.sfn.send_task_success(taskToken=self.tokens[0], output='{"ok": true}')
+        self._correr()
+
+        self.assertEqual(ejecucion.estado, 'SUCCEEDED')
+        self.assertEqual(ejecucion.salida, {'ok': True})
+        self.assertEqual(ejecucion.fin, 2)
+
+    def test_token_vencido_va_al_catch(self):
+        ejecucion = self._iniciar()
+        self._correr()
+
+        self.assertEqual(ejecucion.estado, 'FAILED')
+        self.assertEqual(ejecucion.transiciones[-1], 'Fallo')
+        with self.assertRaises(ClientError) as contexto:
+            self.sfn.send_task_success(taskToken=self.tokens[0], output='{}')
+        self.assertEqual(contexto.exception.response['Error']['Code'], 'TaskTimedOut')
+
+    def test_error_sin_reintentos_va_al_catch_y_no_repite_la_ejecucion(self):
+        self.fallos = [KeyError('x')]
+        ejecucion = self._iniciar()
+        self._correr()
+
+        self.assertEqual(ejecucion.transiciones, ['Tarea', 'Fallo'])
+        with self.assertRaises(self.sfn.exceptions.ExecutionAlreadyExists):
+            self._iniciar()
+
+    def test_is_present_de_una_variable_ausente_no_es_un_error(self):
+        regla = {'And': [
+            {'Variable': '$.modo', 'IsPresent': True},
+            {'Variable': '$.modo', 'BooleanEquals': True}
+        ]}
+
+        self.assertFalse(evaluar_regla(regla, {}))
+        self.assertTrue(evaluar_regla(regla, {'modo': True}))
+        self.assertTrue(evaluar_regla({'Variable': '$.modo', 'IsPresent': False}, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
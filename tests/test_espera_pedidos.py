@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+
+from conftest import crear_dynamodb, tabla, usar_dynamodb
+from utils import dynamodb_helper
+
+LOCAL = 'LOCAL001'
+
+
+class EsperaPedidosTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dynamodb = crear_dynamodb(limite_pagina=2)
+        self.pedidos = tabla(self.dynamodb, 'TABLE_PEDIDOS')
+        self.empleados = tabla(self.dynamodb, 'TABLE_EMPLEADOS')
+        usar_dynamodb(self, self.dynamodb)
+        dynamodb_helper._rosters.clear()
+        self.addCleanup(dynamodb_helper._rosters.clear)
+        salida = mock.patch('sys.stdout')
+        salida.start()
+        self.addCleanup(salida.stop)
+
+    def _pedido(self, pedido_id, estado='procesando'):
+        self.pedidos.cargar({'local_id': LOCAL, 'pedido_id': pedido_id, 'estado': estado})
+
+    def _leer_pedido(self, pedido_id):
+        return self.pedidos.get_item(Key={'local_id': LOCAL, 'pedido_id': pedido_id})['Item']
+
+    def test_el_indice_devuelve_los_pedidos_en_espera_del_rol(self):
+        for numero in range(3):
+            self._pedido(f'P{numero}')
+            dynamodb_helper.registrar_pedido_en_espera(LOCAL, f'P{numero}', 'Cocinero')
+        self._pedido('P9', estado='cocinando')
+        dynamodb_helper.registrar_pedido_en_espera(LOCAL, 'P9', 'Despachador')
+
+        en_espera = dynamodb_helper.buscar_pedidos_en_espera(LOCAL, 'Cocinero')
+
+        self.assertEqual(sorted(pedido['pedido_id'] for pedido in en_espera), ['P0', 'P1', 'P2'])
+        self.assertEqual([pedido['pedido_id'] for pedido in dynamodb_helper.buscar_pedidos_en_espera(LOCAL, 'Despachador')], ['P9'])
+
+    def test_un_pedido_en_otro_estado_no_queda_en_espera(self):
+        self._pedido('P1', estado='cocinando')
+
+        self.assertIsNone(dynamodb_helper.registrar_pedido_en_espera(LOCAL, 'P1', 'Cocinero'))
+        self.assertEqual(dynamodb_helper.buscar_pedidos_en_espera(LOCAL, 'Cocinero'), [])
+
+    def test_la_asignacion_reserva_el_empleado_y_reanuda_la_ejecucion(self):
+        self._pedido('P1')
+        dynamodb_helper.registrar_pedido_en_espera(LOCAL, 'P1', 'Cocinero')
+        self.assertEqual(dynamodb_helper.registrar_token_espera(LOCAL, 'P1', 'Cocinero', 'token-1'), 'esperando')
+        self.empleados.cargar({'local_id': LOCAL, 'dni': 'C1', 'nombre': 'Ana', 'apellido': 'Paz', 'role': 'Cocinero', 'capacidad': 1, 'carga_actual': 0, 'ocupado': False})
+
+        with mock.patch.object(dynamodb_helper, 'reanudar_ejecucion') as reanudar:
+            asignadas = dynamodb_helper.asignar_pedidos_en_espera(LOCAL, 'Cocinero')
+
+        self.assertEqual([(asignada['pedido_id'], asignada['dni']) for asignada in asignadas], [('P1', 'C1')])
+        reanudar.assert_called_once_with('token-1', {'empleado_reservado': 'C1'})
+        pedido = self._leer_pedido('P1')
+        self.assertEqual(pedido['empleado_reservado']['dni'], 'C1')
+        self.assertNotIn('espera_local_rol', pedido)
+        self.assertEqual(dynamodb_helper.buscar_pedidos_en_espera(LOCAL, 'Cocinero'), [])
+        self.assertEqual(dynamodb_helper.registrar_token_espera(LOCAL, 'P1', 'Cocinero', 'token-2'), 'reservado')
+        self.assertTrue(self.empleados.get_item(Key={'local_id': LOCAL, 'dni': 'C1'})['Item']['ocupado'])
+
+    def test_sin_empleados_libres_el_pedido_sigue_esperando(self):
+        self._pedido('P1')
+        dynamodb_helper.registrar_pedido_en_espera(LOCAL, 'P1', 'Cocinero')
+        dynamodb_helper.registrar_token_espera(LOCAL, 'P1', 'Cocinero', 'token-1')
+        self.empleados.cargar({'local_id': LOCAL, 'dni': 'C1', 'nombre': 'Ana', 'apellido': 'Paz', 'role': 'Cocinero', 'capacidad': 1, 'carga_actual': 1, 'ocupado': True})
+
+        with mock.patch.object(dynamodb_helper, 'reanudar_ejecucion') as reanudar:
+            self.assertEqual(dynamodb_helper.asignar_pedidos_en_espera(LOCAL, 'Cocinero'), [])
+
+        reanudar.assert_not_called()
+        self.assertEqual(self._leer_pedido('P1')['token_espera_empleado'], 'token-1')
+
+
+if __name__ == '__main__':
+    unittest.main()
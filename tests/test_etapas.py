@@ -0,0 +1,88 @@
+import unittest
+from unittest import mock
+
+from conftest import crear_dynamodb, tabla, usar_dynamodb
+from utils import idempotencia
+import cocinar
+import empacar
+
+LOCAL = 'LOCAL001'
+
+
+class RecuperacionEtapasTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dynamodb = crear_dynamodb()
+        self.pedidos = tabla(self.dynamodb, 'TABLE_PEDIDOS')
+        self.empleados = tabla(self.dynamodb, 'TABLE_EMPLEADOS')
+        usar_dynamodb(self, self.dynamodb, idempotencia)
+        salida = mock.patch('sys.stdout')
+        salida.start()
+        self.addCleanup(salida.stop)
+
+    def _empleado(self, dni, role, pedidos=()):
+        item = {'local_id': LOCAL, 'dni': dni, 'nombre': role, 'apellido': dni, 'role': role, 'capacidad': 2, 'carga_actual': len(pedidos), 'ocupado': False}
+        if pedidos:
+            item['pedidos_asignados'] = set(pedidos)
+        self.empleados.cargar(item)
+
+    def _pedido(self, estado, historial):
+        self.pedidos.cargar({'local_id': LOCAL, 'pedido_id': 'P1', 'usuario_correo': 'u@x.com', 'estado': estado, 'historial_estados': historial})
+
+    def _evento(self):
+        return {'local_id': LOCAL, 'pedido_id': 'P1', 'execution_id': 'E1'}
+
+    def _leer(self, tabla_memoria, clave):
+        return tabla_memoria.get_item(Key=clave)['Item']
+
+    def test_resultado_registrado_se_devuelve_sin_leer_el_pedido(self):
+        registrado = {'local_id': LOCAL, 'pedido_id': 'P1', 'cocinero_dni': 'C1', 'estado': 'cocinando'}
+        idempotencia.registrar_resultado('E1', 'cocinar', registrado)
+
+        self.assertEqual(cocinar.lambda_handler(self._evento(), None), registrado)
+        self.assertFalse([operacion for operacion, tablas in self.dynamodb.metricas().items() if self.pedidos.name in tablas])
+
+    def test_cocinar_ya_aplicado_se_completa_con_el_mismo_cocinero(self):
+        self._empleado('C1', 'Cocinero', ['P1'])
+        self._empleado('C2', 'Cocinero')
+        self._pedido('cocinando', [{'e': 'P', 'i': 100, 'f': 110}, {'e': 'C', 'i': 110, 'd': 'C1'}])
+
+        resultado = cocinar.lambda_handler(self._evento(), None)
+
+        self.assertEqual(resultado['cocinero_dni'], 'C1')
+        self.assertEqual(self._leer(self.empleados, {'local_id': LOCAL, 'dni': 'C2'})['carga_actual'], 0)
+        self.assertEqual(len(self._leer(self.pedidos, {'local_id': LOCAL, 'pedido_id': 'P1'})['historial_estados']), 2)
+        self.assertEqual(idempotencia.obtener_resultado_registrado('E1', 'cocinar'), resultado)
+
+    def test_empacar_ya_aplicado_libera_al_cocinero(self):
+        self._empleado('C1', 'Cocinero', ['P1'])
+        self._empleado('D1', 'Despachador', ['P1'])
+        self._pedido('empacando', [{'e': 'C', 'i': 110, 'f': 120, 'd': 'C1'}, {'e': 'E', 'i': 120, 'd': 'D1'}])
+
+        with mock.patch.object(empacar, 'reasignar_tras_liberar') as reasignar:
+            resultado = empacar.lambda_handler(self._evento(), None)
+
+        self.assertEqual(resultado['despachador_dni'], 'D1')
+        cocinero = self._leer(self.empleados, {'local_id': LOCAL, 'dni': 'C1'})
+        self.assertEqual(cocinero['carga_actual'], 0)
+        self.assertNotIn('P1', cocinero.get('pedidos_asignados') or set())
+        self.assertEqual(self._leer(self.empleados, {'local_id': LOCAL, 'dni': 'D1'})['carga_actual'], 1)
+        reasignar.assert_called_once_with(LOCAL, 'Cocinero')
+
+    def test_repetir_la_recuperacion_no_libera_otro_pedido_del_cocinero(self):
+        self._empleado('C1', 'Cocinero', ['P1', 'P2'])
+        self._empleado('D1', 'Despachador', ['P1'])
+        self._pedido('empacando', [{'e': 'C', 'i': 110, 'f': 120, 'd': 'C1'}, {'e': 'E', 'i': 120, 'd': 'D1'}])
+
+        with mock.patch.object(empacar, 'reasignar_tras_liberar'), \
+                mock.patch.object(empacar, 'registrar_resultado', return_value=False):
+            empacar.lambda_handler(self._evento(), None)
+            empacar.lambda_handler(self._evento(), None)
+
+        cocinero = self._leer(self.empleados, {'local_id': LOCAL, 'dni': 'C1'})
+        self.assertEqual(cocinero['carga_actual'], 1)
+        self.assertEqual(cocinero['pedidos_asignados'], {'P2'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'carga'))
+
+import generador_carga
+from utils import dynamodb_helper, limitador
+
+ESCENARIO = 'Flujo Completo - Demo Mode'
+
+
+class SimulacionTest(unittest.TestCase):
+
+    def test_cada_pedido_termina_en_un_resultado(self):
+        metricas = generador_carga.simular(generador_carga.PERFILES[ESCENARIO], False, semilla=7)
+        resultados = metricas['resultados']
+
+        finales = resultados.get('completados', 0) + resultados.get('rechazados', 0) + resultados.get('saturados', 0)
+        self.assertEqual(finales, resultados['generados'])
+        self.assertEqual(metricas, generador_carga.simular(generador_carga.PERFILES[ESCENARIO], False, semilla=7))
+
+    def test_admision_usa_la_regla_del_workflow_y_cuenta_llamadas(self):
+        local = generador_carga._Local('LOCAL001', {'Cocinero': 1, 'Despachador': 1, 'Repartidor': 1})
+
+        with mock.patch.dict(dynamodb_helper.LOCALES_CALIENTES, {'LOCAL001': 4}, clear=True):
+            particiones = dynamodb_helper.particiones_local('LOCAL001')
+            decision, _ = local.admitir(False)
+
+        self.assertEqual(decision, 'iniciar')
+        self.assertEqual(local.en_curso, 1)
+        # Lectura de la admisión y relectura consistente de la reserva
+        self.assertEqual(local.llamadas['get_item'], 2 * len(particiones))
+        self.assertEqual(local.llamadas['update_item'], 1)
+
+    def test_local_sin_empleados_rechaza_sin_reservar(self):
+        local = generador_carga._Local('LOCAL001', {})
+
+        decision, eta = local.admitir(False)
+
+        self.assertEqual(decision, 'rechazar')
+        self.assertEqual(eta, generador_carga.DURACION_CICLO_SEGUNDOS[False])
+        self.assertEqual(local.llamadas['update_item'], 0)
+
+
+class HttpTest(unittest.TestCase):
+
+    def setUp(self):
+        # Un solo pedido, que llega al empezar
+        llegadas = mock.patch.object(generador_carga.random, 'expovariate', side_effect=[0.0, 10.0])
+        llegadas.start()
+        self.addCleanup(llegadas.stop)
+        sembrar = mock.patch.object(generador_carga, 'sembrar_pedidos')
+        self.sembrar = sembrar.start()
+        self.addCleanup(sembrar.stop)
+        limpiar = mock.patch.object(generador_carga, 'limpiar_pedidos')
+        self.limpiar = limpiar.start()
+        self.addCleanup(limpiar.stop)
+
+    def _ejecutar(self, respuestas):
+        def post(url, body):
+            return respuestas[url.rsplit('/', 1)[-1]].pop(0) + (0.01,)
+
+        perfil = {**generador_carga.PERFILES[ESCENARIO], 'duracion': 1, 'confirmacion': 'fijo:0'}
+        escenario = {'local_id': 'CARGA-LOCAL001', 'usuario_correo': 'test@chinawok.com'}
+        with mock.patch.object(generador_carga, '_post', side_effect=post) as enviar:
+            metricas = generador_carga.ejecutar_http(perfil, escenario, 'http://api', intervalo_sondeo=0)
+        return metricas, enviar
+
+    def test_pedido_diferido_se_reintenta_una_vez(self):
+        metricas, enviar = self._ejecutar({
+            'iniciar': [(202, b'{"eta_segundos": 0}'), (200, b'{}')],
+            'confirmar-recepcion': [(400, b'{}'), (200, b'{}')]
+        })
+
+        self.assertEqual(metricas['resultados'], {'generados': 1, 'diferidos': 1, 'completados': 1})
+        self.assertEqual(enviar.call_count, 4)
+        pedido_id = self.sembrar.call_args.args[1][0]
+        self.assertEqual(enviar.call_args.args[1]['pedido_id'], pedido_id)
+        self.limpiar.assert_called_once_with('CARGA-LOCAL001', [pedido_id])
+
+    def test_diferido_dos_veces_cuenta_como_rechazado(self):
+        metricas, _ = self._ejecutar({'iniciar': [(202, b'{"eta_segundos": 0}'), (202, b'{"eta_segundos": 0}')]})
+
+        self.assertEqual(metricas['resultados'], {'generados': 1, 'diferidos': 1, 'rechazados': 1})
+
+    def test_limpia_los_pedidos_aunque_falle_el_envio(self):
+        with self.assertRaises(RuntimeError):
+            with mock.patch.object(generador_carga.random, 'expovariate', side_effect=[0.0, 10.0]), \
+                    mock.patch.object(generador_carga._Agenda, 'correr', side_effect=RuntimeError):
+                generador_carga.ejecutar_http(
+                    {**generador_carga.PERFILES[ESCENARIO], 'duracion': 1},
+                    {'local_id': 'CARGA-LOCAL001'},
+                    'http://api'
+                )
+
+        self.limpiar.assert_called_once()
+
+    def _main(self, tabla, *argumentos):
+        with mock.patch.dict(os.environ, {'TABLE_PEDIDOS': tabla}), \
+                mock.patch.object(generador_carga, 'ejecutar_http', return_value={'resultados': {}, 'latencias': [], 'horizonte_segundos': 1}) as ejecutar, \
+                mock.patch('sys.stdout'), mock.patch('sys.stderr'):
+            generador_carga.main([ESCENARIO, '--modo', 'http', '--base-url', 'http://api', *argumentos])
+        return ejecutar
+
+    def test_rechaza_locales_y_empleados_en_modo_http(self):
+        with self.assertRaises(SystemExit):
+            self._main('ChinaWok-Pedidos-Test', '--sembrar', '--empleados', '1,1,1')
+
+    def test_modo_http_exige_sembrar_y_tabla_de_prueba(self):
+        for tabla, argumentos in [('ChinaWok-Pedidos-Test', ()), ('ChinaWok-Pedidos', ('--sembrar',))]:
+            with self.subTest(tabla=tabla), self.assertRaises(SystemExit):
+                self._main(tabla, *argumentos)
+
+    def test_modo_http_usa_un_local_de_carga(self):
+        ejecutar = self._main('ChinaWok-Pedidos-dev', '--sembrar')
+
+        self.assertEqual(ejecutar.call_args.args[1]['local_id'], 'CARGA-LOCAL001')
+        with self.assertRaises(SystemExit):
+            self._main('ChinaWok-Pedidos-dev', '--sembrar', '--local', 'LOCAL001')
+
+
+class SiembraTest(unittest.TestCase):
+
+    def test_no_escribe_en_tablas_de_produccion_ni_locales_reales(self):
+        casos = [('ChinaWok-Pedidos', 'CARGA-LOCAL001'), ('ChinaWok-Pedidos-test', 'LOCAL001')]
+        for tabla, local_id in casos:
+            with self.subTest(tabla=tabla, local_id=local_id), \
+                    mock.patch.dict(os.environ, {'TABLE_PEDIDOS': tabla}), self.assertRaises(ValueError):
+                generador_carga.sembrar_pedidos(local_id, ['PED-1'], 0)
+
+    def test_tablas_de_prueba(self):
+        self.assertTrue(generador_carga.es_tabla_de_prueba('ChinaWok-Pedidos-dev'))
+        self.assertTrue(generador_carga.es_tabla_de_prueba('test_pedidos'))
+        self.assertFalse(generador_carga.es_tabla_de_prueba('ChinaWok-Pedidos'))
+        self.assertFalse(generador_carga.es_tabla_de_prueba('ChinaWok-Pedidos-latest'))
+
+
+class EnProcesoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.perfil = {**generador_carga.PERFILES[ESCENARIO], 'duracion': 30}
+        self.escenario = generador_carga.cargar_escenarios()[ESCENARIO]
+
+    def test_ejecuta_los_handlers_reales_hasta_terminar_cada_pedido(self):
+        metricas = generador_carga.ejecutar_en_proceso(self.perfil, self.escenario, semilla=3)
+        resultados = metricas['resultados']
+
+        finales = sum(resultados.get(resultado, 0) for resultado in ('completados', 'rechazados', 'saturados', 'errores'))
+        self.assertEqual(finales, resultados['generados'])
+        self.assertGreater(resultados.get('completados', 0), 0)
+        self.assertEqual(metricas['errores_handlers'], {})
+        self.assertEqual(
+            metricas['invocaciones_lambda']['notificar_usuario'],
+            metricas['estados_http']['confirmar-recepcion 200']
+        )
+        self.assertIn('ChinaWok-Pedidos', metricas['llamadas_dynamodb']['update_item'])
+        self.assertEqual(metricas, generador_carga.ejecutar_en_proceso(self.perfil, self.escenario, semilla=3))
+
+    def test_restaura_los_modulos_del_workflow(self):
+        from utils import notificaciones
+
+        dynamodb = dynamodb_helper._dynamodb
+        with mock.patch.dict(os.environ, {'NOTIFICACIONES_PROVEEDOR': 'ses'}):
+            generador_carga.ejecutar_en_proceso(self.perfil, self.escenario, semilla=3)
+
+            self.assertEqual(os.environ['NOTIFICACIONES_PROVEEDOR'], 'ses')
+        self.assertIs(dynamodb_helper._dynamodb, dynamodb)
+        self.assertEqual(notificaciones.ENVIADAS_LOCAL, [])
+        self.assertIs(limitador.time, generador_carga.time)
+
+
+if __name__ == '__main__':
+    unittest.main()
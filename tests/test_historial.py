@@ -0,0 +1,68 @@
+import os
+import sys
+import unittest
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'workflow'))
+
+from utils.historial import (
+    compactar_historial,
+    expandir_historial,
+    empleados_de_la_etapa,
+    dnis_del_historial
+)
+
+COMPACTO = [
+    {'e': 'P', 'i': 1760000000, 'f': 1760000010},
+    {'e': 'C', 'i': 1760000010, 'f': 1760000900, 'd': 'C1'},
+    {'e': 'E', 'i': 1760000900, 'd': 'D1'}
+]
+
+EXTENDIDO = [
+    {'estado': 'procesando', 'hora_inicio': '2025-10-09T09:00:00', 'hora_fin': '2025-10-09T09:00:10', 'activo': False, 'empleado': None},
+    {
+        'estado': 'cocinando',
+        'hora_inicio': '2025-10-09T09:00:10',
+        'hora_fin': '2025-10-09T09:00:10',
+        'activo': True,
+        'empleado': {'dni': 'C1', 'nombre_completo': 'Ana Paz', 'rol': 'cocinero', 'calificacion_prom': Decimal('4.5')}
+    }
+]
+
+
+class HistorialTest(unittest.TestCase):
+
+    def test_compacto_expandido_y_compactado_de_nuevo_no_cambia(self):
+        self.assertEqual(compactar_historial(expandir_historial(COMPACTO)), COMPACTO)
+
+    def test_expandir_completa_los_datos_del_empleado(self):
+        empleados = {'C1': {'nombre': 'Ana', 'apellido': 'Paz', 'role': 'Cocinero', 'calificacion_prom': 4.5}}
+
+        expandido = expandir_historial(COMPACTO, empleados)
+
+        self.assertIsNone(expandido[0]['empleado'])
+        self.assertEqual(expandido[1]['empleado'], {'dni': 'C1', 'nombre_completo': 'Ana Paz', 'rol': 'cocinero', 'calificacion_prom': Decimal('4.5')})
+        self.assertEqual(expandido[2]['empleado'], {'dni': 'D1', 'rol': 'despachador'})
+        self.assertEqual([entrada['activo'] for entrada in expandido], [False, False, True])
+
+    def test_formato_extendido_antiguo(self):
+        compacto = compactar_historial(EXTENDIDO)
+
+        self.assertEqual([entrada['e'] for entrada in compacto], ['P', 'C'])
+        self.assertNotIn('d', compacto[0])
+        # La entrada activa no se cierra aunque traiga hora_fin
+        self.assertNotIn('f', compacto[1])
+        self.assertEqual(expandir_historial(EXTENDIDO), EXTENDIDO)
+        self.assertEqual(empleados_de_la_etapa(EXTENDIDO), ('C1', None))
+
+    def test_empleados_de_la_etapa(self):
+        self.assertEqual(empleados_de_la_etapa(COMPACTO), ('D1', 'C1'))
+        self.assertEqual(empleados_de_la_etapa(COMPACTO[:2]), (None, None))
+        self.assertEqual(empleados_de_la_etapa([]), (None, None))
+
+    def test_dnis_de_un_historial_mixto(self):
+        self.assertEqual(dnis_del_historial(EXTENDIDO + COMPACTO), ['C1', 'D1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'workflow'))
+
+from utils import archivo_pedidos, limitador, notificaciones
+import despachar_notificaciones
+
+
+def _error(codigo):
+    return ClientError({'Error': {'Code': codigo, 'Message': codigo}}, 'Operacion')
+
+
+class ContextoFalso:
+
+    def __init__(self, restante_ms):
+        self.restante_ms = restante_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.restante_ms
+
+
+class LimitadorTest(unittest.TestCase):
+
+    def setUp(self):
+        limitador._buckets.clear()
+        self.addCleanup(limitador._buckets.clear)
+        self.addCleanup(limitador.fijar_plazo, None)
+        dormir = mock.patch.object(limitador.time, 'sleep')
+        self.dormir = dormir.start()
+        self.addCleanup(dormir.stop)
+
+    def test_reintenta_throttles_y_errores_transitorios(self):
+        funcion = mock.Mock(side_effect=[_error('ThrottlingException'), _error('InternalServerError'), 'ok'])
+
+        self.assertEqual(limitador.llamar_con_limite('prueba', funcion), 'ok')
+
+        metricas = limitador.metricas_limitador()['prueba']
+        self.assertEqual(metricas['throttles'], 1)
+        self.assertEqual(metricas['reintentos'], 2)
+
+    def test_no_reintenta_otros_errores(self):
+        funcion = mock.Mock(side_effect=_error('ConditionalCheckFailedException'))
+
+        with self.assertRaises(ClientError):
+            limitador.llamar_con_limite('prueba', funcion)
+
+        self.assertEqual(funcion.call_count, 1)
+
+    def test_sin_plazo_para_el_backoff_propaga_el_error(self):
+        limitador.fijar_plazo(ContextoFalso(restante_ms=limitador.MARGEN_PLAZO_SEGUNDOS * 1000))
+        funcion = mock.Mock(side_effect=_error('ThrottlingException'))
+
+        with mock.patch.object(limitador.random, 'uniform', return_value=0.5), self.assertRaises(ClientError):
+            limitador.llamar_con_limite('prueba', funcion)
+
+        self.assertEqual(funcion.call_count, 1)
+        self.dormir.assert_not_called()
+
+    def test_adquirir_no_espera_mas_alla_del_plazo(self):
+        bucket = limitador._bucket('prueba')
+        bucket.tokens = 0
+        bucket.tasa = 0.01
+        limitador.fijar_plazo(ContextoFalso(restante_ms=limitador.MARGEN_PLAZO_SEGUNDOS * 1000 + 500))
+
+        with self.assertRaises(limitador.PlazoAgotado):
+            bucket.adquirir()
+
+    def test_costo_mayor_que_la_capacidad_lo_paga_la_llamada_siguiente(self):
+        bucket = limitador._TokenBucket(10)
+
+        self.assertEqual(bucket.adquirir(costo=50), 0)
+        self.assertEqual(bucket.tokens, -40)
+        with mock.patch.object(limitador.time, 'monotonic', return_value=bucket.ultima_recarga):
+            with mock.patch.object(limitador, '_esperar', side_effect=limitador.PlazoAgotado) as esperar, \
+                    self.assertRaises(limitador.PlazoAgotado):
+                bucket.adquirir()
+        self.assertAlmostEqual(esperar.call_args.args[0], 4.1)
+
+    def test_los_clientes_limitados_no_reintentan_en_botocore(self):
+        self.assertEqual(limitador.CONFIG_SIN_REINTENTOS.retries['total_max_attempts'], 1)
+        for cliente in (notificaciones.sesv2, archivo_pedidos.s3):
+            self.assertEqual(cliente.meta.config.retries['total_max_attempts'], 1)
+        self.assertEqual(despachar_notificaciones.dynamodb.meta.client.meta.config.retries['total_max_attempts'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+import os
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from conftest import crear_dynamodb, tabla, usar_dynamodb
+from utils import notificaciones
+import despachar_notificaciones
+
+# Anterior a la gracia del stream, para que el barrido la tome
+CREADO_EN = (datetime.now() - timedelta(hours=1)).isoformat()
+
+
+def _notificacion(numero, **extra):
+    return {
+        'notificacion_id': f'P{numero}#entrega',
+        'pedido_id': f'P{numero}',
+        'destinatario': f'usuario{numero}@correo.com',
+        'asunto': f'Tu pedido P{numero} ha llegado',
+        'mensaje': notificaciones.construir_mensaje_entrega(f'P{numero}'),
+        'estado': 'pendiente',
+        'intentos': 0,
+        'creado_en': CREADO_EN,
+        **extra
+    }
+
+
+class ProveedorLocalTest(unittest.TestCase):
+
+    def setUp(self):
+        notificaciones.ENVIADAS_LOCAL.clear()
+
+    def test_registra_cada_notificacion_una_vez(self):
+        lote = [_notificacion(numero) for numero in range(3)]
+        with mock.patch.dict(os.environ, {'NOTIFICACIONES_PROVEEDOR': 'local'}):
+            enviadas, fallidas = notificaciones.enviar_notificaciones(lote)
+
+        self.assertEqual(enviadas, [n['notificacion_id'] for n in lote])
+        self.assertEqual(fallidas, {})
+        self.assertEqual(
+            [n['destinatario'] for n in notificaciones.ENVIADAS_LOCAL],
+            [n['destinatario'] for n in lote]
+        )
+
+    def test_reintenta_solo_las_fallidas(self):
+        lote = [_notificacion(numero) for numero in range(3)]
+        llamadas = []
+
+        def publicar(pendientes):
+            llamadas.append([n['notificacion_id'] for n in pendientes])
+            return {'P1#entrega': 'Throttling'} if len(llamadas) == 1 else {}
+
+        with mock.patch.dict(notificaciones.PROVEEDORES, {'local': publicar}), \
+                mock.patch.dict(os.environ, {'NOTIFICACIONES_PROVEEDOR': 'local'}), \
+                mock.patch.object(notificaciones, 'ESPERA_BASE_SEGUNDOS', 0):
+            enviadas, fallidas = notificaciones.enviar_notificaciones(lote)
+
+        self.assertEqual(llamadas[1], ['P1#entrega'])
+        self.assertEqual(sorted(enviadas), ['P0#entrega', 'P1#entrega', 'P2#entrega'])
+        self.assertEqual(fallidas, {})
+
+    def test_lote_que_falla_completo_queda_para_el_barrido(self):
+        lote = [_notificacion(numero) for numero in range(2)]
+        publicar = mock.Mock(side_effect=RuntimeError('sin conexión'))
+
+        with mock.patch.dict(notificaciones.PROVEEDORES, {'local': publicar}), \
+                mock.patch.dict(os.environ, {'NOTIFICACIONES_PROVEEDOR': 'local'}):
+            enviadas, fallidas = notificaciones.enviar_notificaciones(lote)
+
+        # Los throttles y errores transitorios ya los reintentó el limitador
+        self.assertEqual(publicar.call_count, 1)
+        self.assertEqual(enviadas, [])
+        self.assertEqual(set(fallidas), {'P0#entrega', 'P1#entrega'})
+
+
+class ProveedorSesTest(unittest.TestCase):
+
+    def test_cada_entrada_va_solo_a_su_destinatario(self):
+        lote = [_notificacion(numero) for numero in range(2)]
+        cliente = mock.Mock()
+        cliente.send_bulk_email.return_value = {
+            'BulkEmailEntryResults': [{'Status': 'SUCCESS'}, {'Status': 'FAILED', 'Error': 'rechazado'}]
+        }
+        entorno = {'NOTIFICACIONES_REMITENTE': 'no-responder@tu-app.com', 'NOTIFICACIONES_PLANTILLA': 'plantilla'}
+
+        with mock.patch.object(notificaciones, 'sesv2', cliente), mock.patch.dict(os.environ, entorno), \
+                mock.patch.object(notificaciones, 'llamar_con_limite', wraps=notificaciones.llamar_con_limite) as limitar:
+            errores = notificaciones._publicar_lote_ses(lote)
+
+        # Cada destinatario descuenta de la cuota de envío
+        self.assertEqual(limitar.call_args.args[0], 'ses')
+        self.assertEqual(limitar.call_args.kwargs['costo'], 2)
+
+        entradas = cliente.send_bulk_email.call_args.kwargs['BulkEmailEntries']
+        self.assertEqual(
+            [entrada['Destination']['ToAddresses'] for entrada in entradas],
+            [['usuario0@correo.com'], ['usuario1@correo.com']]
+        )
+        self.assertEqual(errores, {'P1#entrega': 'rechazado'})
+
+
+class DespacharNotificacionesTest(unittest.TestCase):
+
+    def setUp(self):
+        notificaciones.ENVIADAS_LOCAL.clear()
+        entorno = mock.patch.dict(os.environ, {'NOTIFICACIONES_PROVEEDOR': 'local'})
+        entorno.start()
+        self.addCleanup(entorno.stop)
+
+    def _outbox(self, notificaciones_outbox, limite_pagina=1):
+        self.dynamodb = crear_dynamodb(limite_pagina)
+        usar_dynamodb(self, self.dynamodb, despachar_notificaciones)
+        outbox = tabla(self.dynamodb, 'TABLE_NOTIFICACIONES')
+        for notificacion in notificaciones_outbox:
+            outbox.cargar(notificacion)
+        return outbox
+
+    def _item(self, outbox, notificacion_id):
+        return outbox.get_item(Key={'notificacion_id': notificacion_id}).get('Item')
+
+    def test_stream_ignora_reintentos_programados(self):
+        records = [
+            {'eventName': 'INSERT', 'dynamodb': {'NewImage': {
+                'notificacion_id': {'S': 'P0#entrega'}, 'estado': {'S': 'pendiente'}
+            }}},
+            {'eventName': 'MODIFY', 'dynamodb': {'NewImage': {
+                'notificacion_id': {'S': 'P1#entrega'}, 'estado': {'S': 'pendiente'},
+                'proximo_intento': {'N': str(int(time.time()) + 60)}
+            }}}
+        ]
+
+        pendientes = despachar_notificaciones._pendientes_del_stream(records)
+
+        self.assertEqual([n['notificacion_id'] for n in pendientes], ['P0#entrega'])
+
+    def test_barrido_recorre_todas_las_paginas(self):
+        outbox = self._outbox([_notificacion(0, estado='fallida'), _notificacion(1), _notificacion(2)])
+
+        resultado = despachar_notificaciones.lambda_handler({}, None)
+
+        self.assertEqual(self.dynamodb.metricas()['scan'], {outbox.name: 3})
+        self.assertEqual(resultado, {'enviadas': 2, 'fallidas': 0})
+        self.assertEqual(list(outbox.items), [('P0#entrega',)])
+
+    def test_no_borra_la_notificacion_que_la_reemplazo(self):
+        outbox = self._outbox([_notificacion(0)])
+        nueva = _notificacion(0, creado_en=datetime.now().isoformat())
+
+        def publicar(lote):
+            # Un reintento de NotificarUsuario reemplaza el item mientras se envía
+            outbox.cargar(nueva)
+            return {}
+
+        with mock.patch.dict(notificaciones.PROVEEDORES, {'local': publicar}):
+            resultado = despachar_notificaciones.lambda_handler({}, None)
+
+        self.assertEqual(resultado, {'enviadas': 1, 'fallidas': 0})
+        self.assertEqual(self._item(outbox, 'P0#entrega'), nueva)
+
+    def test_fallida_se_programa_con_backoff(self):
+        outbox = self._outbox([_notificacion(0, intentos=1)])
+        publicar = lambda lote: {n['notificacion_id']: 'rechazado' for n in lote}
+
+        with mock.patch.dict(notificaciones.PROVEEDORES, {'local': publicar}), \
+                mock.patch.object(notificaciones, 'ESPERA_BASE_SEGUNDOS', 0):
+            antes = int(time.time())
+            despachar_notificaciones.lambda_handler({}, None)
+
+        item = self._item(outbox, 'P0#entrega')
+        self.assertEqual(item['estado'], 'pendiente')
+        self.assertEqual(item['intentos'], 2)
+        self.assertGreaterEqual(item['proximo_intento'], antes + 2 * despachar_notificaciones.BACKOFF_BASE_SEGUNDOS)
+
+    def test_fallida_sin_intentos_restantes_queda_fallida(self):
+        intentos = despachar_notificaciones.MAX_INTENTOS - 1
+        outbox = self._outbox([_notificacion(0, intentos=intentos, proximo_intento=int(time.time()))])
+        publicar = lambda lote: {n['notificacion_id']: 'rechazado' for n in lote}
+
+        with mock.patch.dict(notificaciones.PROVEEDORES, {'local': publicar}), \
+                mock.patch.object(notificaciones, 'ESPERA_BASE_SEGUNDOS', 0):
+            despachar_notificaciones.lambda_handler({}, None)
+
+        item = self._item(outbox, 'P0#entrega')
+        self.assertEqual(item['estado'], 'fallida')
+        self.assertNotIn('proximo_intento', item)
+
+if __name__ == '__main__':
+    unittest.main()
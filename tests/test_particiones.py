@@ -0,0 +1,92 @@
+import unittest
+from unittest import mock
+
+from conftest import crear_dynamodb, tabla, usar_dynamodb
+from utils import dynamodb_helper
+
+
+class ParticionesTest(unittest.TestCase):
+
+    def setUp(self):
+        calientes = mock.patch.dict(dynamodb_helper.LOCALES_CALIENTES, {'LOCAL001': 4}, clear=True)
+        calientes.start()
+        self.addCleanup(calientes.stop)
+        self.dynamodb = crear_dynamodb()
+        self.pedidos = tabla(self.dynamodb, 'TABLE_PEDIDOS')
+        usar_dynamodb(self, self.dynamodb)
+
+    def test_pedido_no_migrado_se_lee_y_escribe_en_la_particion_del_local(self):
+        self.pedidos.cargar({'local_id': 'LOCAL001', 'pedido_id': 'P1', 'estado': 'cocinando'})
+
+        pedido = dynamodb_helper.obtener_pedido('LOCAL001', 'P1')
+        dynamodb_helper.resetear_pedido_a_inicial('LOCAL001', 'P1')
+
+        self.assertEqual(pedido['_particion'], 'LOCAL001')
+        self.assertEqual([item['local_id'] for item in self.pedidos.items.values()], ['LOCAL001'])
+        self.assertEqual(self.pedidos.get_item(Key={'local_id': 'LOCAL001', 'pedido_id': 'P1'})['Item']['estado'], 'procesando')
+
+    def test_pedido_migrado_se_escribe_en_su_shard(self):
+        shard = dynamodb_helper.particion_pedido('LOCAL001', 'P1')
+        self.pedidos.cargar({'local_id': shard, 'pedido_id': 'P1'})
+
+        self.assertEqual(dynamodb_helper.ubicar_pedido('LOCAL001', 'P1'), shard)
+
+    def test_local_sin_shards_no_lee_para_ubicar(self):
+        self.assertEqual(dynamodb_helper.ubicar_pedido('LOCAL002', 'P1'), 'LOCAL002')
+
+        self.assertEqual(self.dynamodb.metricas(), {})
+
+    def test_migracion_mueve_solo_si_el_item_no_cambio(self):
+        item = {'local_id': 'LOCAL001', 'pedido_id': 'P1', 'estado': 'cocinando'}
+        self.pedidos.cargar(item)
+        shard = dynamodb_helper.particion_pedido('LOCAL001', 'P1')
+
+        self.assertFalse(dynamodb_helper.migrar_item_a_shard('TABLE_PEDIDOS', {**item, 'estado': 'procesando'}))
+        self.assertTrue(dynamodb_helper.migrar_item_a_shard('TABLE_PEDIDOS', item))
+
+        self.assertEqual([clave[0] for clave in self.pedidos.items], [shard])
+
+
+class CupoPedidosTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dynamodb = crear_dynamodb()
+        usar_dynamodb(self, self.dynamodb)
+
+    def _reservar(self, cantidad, limite):
+        return sum(dynamodb_helper.reservar_cupo_pedido('LOCAL001', f'P{numero}', limite) for numero in range(cantidad))
+
+    def test_local_sin_shards_respeta_el_limite(self):
+        self.assertEqual(self._reservar(5, 2), 2)
+
+    def test_local_caliente_compara_el_limite_con_la_suma_de_los_shards(self):
+        with mock.patch.dict(dynamodb_helper.LOCALES_CALIENTES, {'LOCAL001': 4}, clear=True):
+            self.assertEqual(self._reservar(12, 2), 2)
+
+            capacidad = dynamodb_helper.obtener_capacidad_local('LOCAL001')
+
+        self.assertEqual(capacidad['pedidos_en_curso'], 2)
+
+    def test_local_caliente_relee_si_otro_pedido_cambio_el_shard(self):
+        shard = 'LOCAL001#3'
+        contadores = tabla(self.dynamodb, 'TABLE_CAPACIDAD_LOCALES')
+        leer = dynamodb_helper._leer_contadores
+
+        def leer_con_carrera(local_id, consistente=False):
+            leidos = leer(local_id, consistente)
+            if not contadores.items:
+                # Otro pedido del mismo shard se admite entre la lectura y la escritura
+                contadores.cargar({'local_id': shard, 'pedidos_en_curso': 1})
+            return leidos
+
+        with mock.patch.dict(dynamodb_helper.LOCALES_CALIENTES, {'LOCAL001': 4}, clear=True), \
+                mock.patch.object(dynamodb_helper, '_leer_contadores', side_effect=leer_con_carrera):
+            self.assertEqual(dynamodb_helper.particion_capacidad('LOCAL001', 'P1'), shard)
+            self.assertFalse(dynamodb_helper.reservar_cupo_pedido('LOCAL001', 'P1', 1))
+            self.assertTrue(dynamodb_helper.reservar_cupo_pedido('LOCAL001', 'P1', 2))
+
+        self.assertEqual(contadores.get_item(Key={'local_id': shard})['Item']['pedidos_en_curso'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import importlib
+import os
+import pstats
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'workflow'))
+
+from utils import perfilado
+from utils.concurrencia import ejecutar_en_paralelo
+
+
+def tarea_del_pool():
+    return sum(range(1000))
+
+
+class ContextoFalso:
+    function_name = 'prueba'
+    aws_request_id = 'req-1'
+
+
+class PerfiladoTest(unittest.TestCase):
+
+    def test_el_perfil_incluye_las_tareas_del_pool(self):
+        def handler(event, context):
+            return ejecutar_en_paralelo({'a': tarea_del_pool, 'b': tarea_del_pool})
+
+        with tempfile.TemporaryDirectory() as carpeta, \
+                mock.patch.object(perfilado, 'DESTINO', carpeta), mock.patch('sys.stdout'):
+            resultado = perfilado._invocar_perfilado(handler, {}, ContextoFalso())
+            estadisticas = pstats.Stats(os.path.join(carpeta, 'prueba', os.listdir(os.path.join(carpeta, 'prueba'))[0], 'req-1.prof'))
+
+        self.assertEqual(resultado, {'a': 499500, 'b': 499500})
+        llamadas = {funcion[2]: datos[1] for funcion, datos in estadisticas.stats.items()}
+        self.assertEqual(llamadas['tarea_del_pool'], 2)
+        self.assertIsNone(perfilado._perfiles_pool)
+
+    def test_sin_perfilado_las_tareas_no_se_perfilan(self):
+        with mock.patch.object(perfilado.cProfile, 'Profile') as perfil:
+            self.assertEqual(ejecutar_en_paralelo({'a': tarea_del_pool, 'b': tarea_del_pool})['a'], 499500)
+
+        perfil.assert_not_called()
+
+    def test_muestreo_por_defecto(self):
+        self.addCleanup(importlib.reload, perfilado)
+        with mock.patch.dict(os.environ):
+            os.environ.pop('PERFILADO_MUESTREO', None)
+            importlib.reload(perfilado)
+
+        self.assertEqual(perfilado.MUESTREO, 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
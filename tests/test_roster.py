@@ -0,0 +1,44 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'workflow'))
+os.environ.setdefault('TABLE_EMPLEADOS', 'ChinaWok-Empleados-Test')
+
+from utils import dynamodb_helper
+
+
+class RosterTest(unittest.TestCase):
+
+    def setUp(self):
+        dynamodb_helper.invalidar_roster()
+        self.addCleanup(dynamodb_helper.invalidar_roster)
+        recurso = mock.patch.object(dynamodb_helper, '_dynamodb')
+        self.recurso = recurso.start()
+        self.addCleanup(recurso.stop)
+        self.recurso.return_value.batch_get_item.return_value = {
+            'Responses': {os.environ['TABLE_EMPLEADOS']: [
+                {'local_id': 'LOCAL001', 'dni': '2', 'nombre': 'Ana', 'carga_actual': 1}
+            ]}
+        }
+
+    def test_solo_lee_los_empleados_que_no_estan_en_cache(self):
+        dynamodb_helper._guardar_en_roster('LOCAL001', {'dni': '1', 'nombre': 'Luis', 'carga_actual': 0})
+
+        empleados = dynamodb_helper.obtener_empleados('LOCAL001', ['1', '2'])
+
+        claves = self.recurso.return_value.batch_get_item.call_args.kwargs['RequestItems'][os.environ['TABLE_EMPLEADOS']]['Keys']
+        self.assertEqual(claves, [{'local_id': 'LOCAL001', 'dni': '2'}])
+        self.assertEqual(empleados['1'], {'dni': '1', 'nombre': 'Luis'})
+        self.assertEqual(empleados['2'], {'dni': '2', 'nombre': 'Ana'})
+
+    def test_los_leidos_quedan_en_cache(self):
+        dynamodb_helper.obtener_empleados('LOCAL001', ['2'])
+        dynamodb_helper.obtener_empleados('LOCAL001', ['2'])
+
+        self.assertEqual(self.recurso.return_value.batch_get_item.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import importlib
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'workflow'))
+
+import router
+
+
+class RouterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.handlers = {ruta: mock.Mock(return_value={'statusCode': 200, 'ruta': ruta}) for ruta in router.RUTAS}
+        parche = mock.patch.dict(router._handlers, self.handlers)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_cada_ruta_tiene_su_modulo(self):
+        for ruta, modulo in router.RUTAS.items():
+            with self.subTest(ruta=ruta):
+                self.assertTrue(callable(importlib.import_module(modulo).lambda_handler))
+
+    def test_despacha_segun_el_proxy_o_el_path(self):
+        eventos = {
+            'cocinar': {'pathParameters': {'proxy': 'cocinar'}, 'body': '{}'},
+            'confirmar-recepcion': {'path': '/dev/workflow/confirmar-recepcion/', 'body': '{}'},
+            'iniciar': {'path': 'iniciar', 'body': '{}'}
+        }
+
+        for ruta, evento in eventos.items():
+            with self.subTest(ruta=ruta):
+                self.assertEqual(router.lambda_handler(evento, None)['ruta'], ruta)
+
+    def test_el_handler_recibe_el_body_parseado(self):
+        evento = {'pathParameters': {'proxy': 'empacar'}, 'body': '{"pedido_id": "P1"}'}
+
+        router.lambda_handler(evento, 'contexto')
+
+        self.handlers['empacar'].assert_called_once_with({**evento, 'body': {'pedido_id': 'P1'}}, 'contexto')
+
+    def test_ruta_desconocida(self):
+        respuesta = router.lambda_handler({'path': '/workflow/cancelar', 'body': '{}'}, None)
+
+        self.assertEqual(respuesta['statusCode'], 404)
+        self.assertEqual(json.loads(respuesta['body'])['rutas'], sorted(router.RUTAS))
+        for handler in self.handlers.values():
+            handler.assert_not_called()
+
+    def test_body_invalido(self):
+        respuesta = router.lambda_handler({'pathParameters': {'proxy': 'enviar'}, 'body': '{pedido'}, None)
+
+        self.assertEqual(respuesta['statusCode'], 400)
+        self.handlers['enviar'].assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+
+from conftest import crear_dynamodb, tabla, usar_dynamodb
+from utils import dynamodb_helper
+
+LOCAL = 'LOCAL001'
+
+
+class SlotsEmpleadoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dynamodb = crear_dynamodb()
+        self.empleados = tabla(self.dynamodb, 'TABLE_EMPLEADOS')
+        usar_dynamodb(self, self.dynamodb)
+        salida = mock.patch('sys.stdout')
+        salida.start()
+        self.addCleanup(salida.stop)
+
+    def _empleado(self, **atributos):
+        self.empleados.cargar({'local_id': LOCAL, 'dni': 'C1', 'nombre': 'Ana', 'apellido': 'Paz', 'role': 'Cocinero', 'capacidad': 2, **atributos})
+
+    def _leer(self):
+        return self.empleados.get_item(Key={'local_id': LOCAL, 'dni': 'C1'})['Item']
+
+    def test_no_ocupa_mas_slots_que_su_capacidad(self):
+        self._empleado(carga_actual=0, ocupado=False)
+
+        ocupados = [dynamodb_helper.marcar_empleado_ocupado(LOCAL, 'C1', pedido_id) for pedido_id in ('P1', 'P2', 'P3')]
+
+        self.assertIsNotNone(ocupados[1])
+        self.assertIsNone(ocupados[2])
+        empleado = self._leer()
+        self.assertEqual(empleado['carga_actual'], 2)
+        self.assertEqual(empleado['pedidos_asignados'], {'P1', 'P2'})
+        self.assertTrue(empleado['ocupado'])
+
+    def test_repetir_la_ocupacion_de_un_pedido_no_suma_carga(self):
+        self._empleado(carga_actual=0, ocupado=False)
+
+        primero = dynamodb_helper.marcar_empleado_ocupado(LOCAL, 'C1', 'P1')
+        repetido = dynamodb_helper.marcar_empleado_ocupado(LOCAL, 'C1', 'P1')
+
+        self.assertEqual(repetido['carga_actual'], 1)
+        self.assertEqual(primero['pedidos_asignados'], repetido['pedidos_asignados'])
+        self.assertEqual(self._leer()['carga_actual'], 1)
+
+    def test_repetir_la_liberacion_no_libera_el_slot_de_otro_pedido(self):
+        self._empleado(carga_actual=2, ocupado=True, pedidos_asignados={'P1', 'P2'})
+
+        self.assertIsNotNone(dynamodb_helper.marcar_empleado_libre(LOCAL, 'C1', 'P1'))
+        self.assertIsNone(dynamodb_helper.marcar_empleado_libre(LOCAL, 'C1', 'P1'))
+
+        empleado = self._leer()
+        self.assertEqual(empleado['carga_actual'], 1)
+        self.assertEqual(empleado['pedidos_asignados'], {'P2'})
+        self.assertFalse(empleado['ocupado'])
+
+    def test_libera_los_slots_ocupados_antes_de_registrar_los_pedidos(self):
+        self._empleado(carga_actual=1, ocupado=False)
+
+        self.assertIsNotNone(dynamodb_helper.marcar_empleado_libre(LOCAL, 'C1', 'P1'))
+        self.assertIsNone(dynamodb_helper.marcar_empleado_libre(LOCAL, 'C1', 'P1'))
+
+        self.assertEqual(self._leer()['carga_actual'], 0)
+
+    def test_un_slot_sin_registrar_se_libera_junto_a_los_registrados(self):
+        self._empleado(carga_actual=2, ocupado=True, pedidos_asignados={'P2'})
+
+        self.assertIsNotNone(dynamodb_helper.marcar_empleado_libre(LOCAL, 'C1', 'P1'))
+        self.assertIsNone(dynamodb_helper.marcar_empleado_libre(LOCAL, 'C1', 'P1'))
+
+        empleado = self._leer()
+        self.assertEqual(empleado['carga_actual'], 1)
+        self.assertEqual(empleado['pedidos_asignados'], {'P2'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.append(os.path.dirname(__file__))
+from utils.dynamodb_helper import (
+    buscar_pedidos_por_archivar,
+    buscar_pedidos_antiguos_por_archivar,
+    marcar_pedido_archivado
+)
+from utils.archivo_pedidos import escribir_particion
+from utils.historial import expandir_historial
+from utils.limitador import respetar_plazo
+from utils.perfilado import perfilar
+
+# Días que un pedido archivado sigue en la tabla caliente antes de que el TTL
+# (atributo expira_en) lo elimine
+RETENCION_DIAS = int(os.environ.get('ARCHIVO_RETENCION_DIAS', 7))
+
+# Máximo de pedidos que archiva una ejecución; el resto queda para la siguiente
+MAX_PEDIDOS_POR_EJECUCION = int(os.environ.get('ARCHIVO_MAX_PEDIDOS', 5000))
+
+def _fecha_pedido(pedido):
+    """Fecha (AAAA-MM-DD) en que terminó el pedido, para particionar el archivo"""
+    if pedido.get('finalizado_en'):
+        return pedido['finalizado_en'][:10]
+
+    # Pedidos finalizados antes de registrar finalizado_en
+    for estado in reversed(expandir_historial(pedido.get('historial_estados'))):
+        hora = estado.get('hora_fin') or estado.get('hora_inicio')
+        if hora:
+            return hora[:10]
+
+    return datetime.now().date().isoformat()
+
+@perfilar
+@respetar_plazo
+def lambda_handler(event, context):
+    """Lambda para mover los pedidos finalizados al archivo columnar"""
+    event = event or {}
+    if 'body' in event and event['body']:
+        event = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
+
+    local_id = event.get('local_id')
+    if event.get('antiguos'):
+        # Pedidos finalizados antes de que existiera el índice de pedidos por archivar
+        pedidos = buscar_pedidos_antiguos_por_archivar(MAX_PEDIDOS_POR_EJECUCION)
+    else:
+        pedidos = buscar_pedidos_por_archivar(local_id, MAX_PEDIDOS_POR_EJECUCION)
+
+    print(f'Pedidos por archivar: {len(pedidos)}' + (f' (local {local_id})' if local_id else ''))
+
+    grupos = defaultdict(list)
+    for pedido in pedidos:
+        grupos[(pedido['local_id'], _fecha_pedido(pedido))].append(pedido)
+
+    archivado_en = datetime.now().isoformat()
+    expira_en = int(time.time()) + RETENCION_DIAS * 86400
+
+    archivos = []
+    archivados = 0
+    for (local, fecha), grupo in sorted(grupos.items()):
+        # Primero se escribe el archivo; si falla, los pedidos siguen sin
+        # archivado_en y se reintentan en la próxima ejecución. El nombre del
+        # archivo sale de sus pedidos, así que reintentar el mismo grupo lo
+        # sobrescribe en lugar de duplicarlo
+        archivos.append(escribir_particion(local, fecha, grupo))
+
+        for pedido in grupo:
+            try:
+                if marcar_pedido_archivado(pedido, archivado_en, expira_en):
+                    archivados += 1
+            except Exception as e:
+                print(f'Error marcando pedido {pedido["pedido_id"]} como archivado: {str(e)}')
+
+    return {
+        'archivados': archivados,
+        'archivos': archivos
+    }
@@ -0,0 +1,51 @@
+import json
+import sys
+import os
+
+sys.path.append(os.path.dirname(__file__))
+from utils.dynamodb_helper import (
+    asignar_pedidos_en_espera,
+    buscar_esperas_pendientes,
+    ESTADO_EN_ESPERA_POR_ROL
+)
+from utils.limitador import respetar_plazo
+from utils.perfilado import perfilar
+
+@perfilar
+@respetar_plazo
+def lambda_handler(event, context):
+    """Lambda para asignar en lote los pedidos en espera a los empleados libres.
+
+    Con local_id atiende ese local; sin él (invocación programada) recorre los
+    locales y roles que tienen pedidos en el índice de espera, para asignar los
+    que no alcanzó el pase lanzado al liberar un empleado.
+    """
+    event = event or {}
+    print(f'Asignando pedidos en espera: {json.dumps(event, default=str)}')
+
+    local_id = event.get('local_id')
+    role = event.get('role')
+
+    if local_id:
+        # Sin rol se hace un pase por cada rol del workflow
+        roles = [role] if role else list(ESTADO_EN_ESPERA_POR_ROL.keys())
+        esperas = [(local_id, rol) for rol in roles]
+    else:
+        esperas = buscar_esperas_pendientes()
+
+    asignaciones = {}
+    for local, rol in esperas:
+        try:
+            asignaciones.setdefault(local, {})[rol] = asignar_pedidos_en_espera(local, rol)
+        except Exception as e:
+            # Un local con error no debe frenar el barrido de los demás
+            print(f'Error asignando {rol} en local {local}: {str(e)}')
+
+    total = sum(len(asignadas) for por_rol in asignaciones.values() for asignadas in por_rol.values())
+    print(f'Total pedidos asignados: {total} ({len(esperas)} pases)')
+
+    return {
+        'local_id': local_id,
+        'asignados': total,
+        'asignaciones': asignaciones
+    }
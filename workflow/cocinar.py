@@ -5,52 +5,75 @@ import os
 sys.path.append(os.path.dirname(__file__))
 from utils.dynamodb_helper import (
     obtener_pedido,
-    buscar_empleado_disponible,
-    marcar_empleado_ocupado,
+    asignar_empleado_a_pedido,
+    marcar_empleado_libre,
     actualizar_estado_pedido_con_empleado
 )
-from utils.json_encoder import json_dumps
+from utils.historial import empleados_de_la_etapa
+from utils.idempotencia import respuesta_registrada, registrar_resultado
+from utils.http import es_http, leer_body, respuesta_http
+from utils.limitador import respetar_plazo
+from utils.perfilado import perfilar
 
+@perfilar
+@respetar_plazo
 def lambda_handler(event, context):
     """Lambda para asignar cocinero y comenzar a cocinar el pedido"""
     print(f'Iniciando proceso de cocinar: {json.dumps(event)}')
     
     # Manejar invocación desde API Gateway (HTTP) o Step Functions (directo)
-    if 'body' in event:
-        body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
-    else:
-        body = event
+    body = leer_body(event)
     
     local_id = body.get('local_id')
     pedido_id = body.get('pedido_id')
+    execution_id = body.get('execution_id')
     
     if not local_id or not pedido_id:
         raise ValueError('Faltan parámetros requeridos: local_id o pedido_id')
     
     try:
+        # Si la etapa ya se completó en esta ejecución (redrive o reintento tras
+        # un éxito parcial), devolver el resultado sin volver a escribir
+        respuesta = respuesta_registrada(event, execution_id, 'cocinar')
+        if respuesta:
+            return respuesta
+
         # Obtener información del pedido
         pedido = obtener_pedido(local_id, pedido_id)
         
-        # Validar que el pedido esté en estado "procesando"
-        if pedido.get('estado') != 'procesando':
-            raise ValueError(f'El pedido debe estar en estado "procesando", actualmente está en "{pedido.get("estado")}"')
-        
-        # Buscar cocinero disponible
-        cocinero = buscar_empleado_disponible(local_id, 'Cocinero')
-        
-        if not cocinero:
-            raise Exception('No hay cocineros disponibles en este momento')
+        cocinero_dni, _ = empleados_de_la_etapa(pedido.get('historial_estados'))
         
-        # Marcar cocinero como ocupado
-        marcar_empleado_ocupado(local_id, cocinero['dni'])
-        
-        # Actualizar estado del pedido
-        pedido_actualizado = actualizar_estado_pedido_con_empleado(
-            local_id,
-            pedido_id,
-            'cocinando',
-            cocinero
-        )
+        if pedido.get('estado') == 'cocinando' and cocinero_dni:
+            # Un intento anterior ya pasó el pedido a "cocinando" pero falló antes
+            # de registrar el resultado: la etapa está completa con ese cocinero
+            print(f'Pedido {pedido_id} ya estaba cocinando con el cocinero {cocinero_dni}')
+            cocinero = {'dni': cocinero_dni}
+        else:
+            # Validar que el pedido esté en estado "procesando"
+            if pedido.get('estado') != 'procesando':
+                raise ValueError(f'El pedido debe estar en estado "procesando", actualmente está en "{pedido.get("estado")}"')
+            
+            # Tomar el cocinero reservado para el pedido, o esperar turno según su prioridad
+            cocinero = asignar_empleado_a_pedido(local_id, pedido, 'Cocinero', body.get('contadores'))
+            
+            if not cocinero:
+                raise Exception('No hay cocineros disponibles en este momento')
+            
+            # Actualizar estado del pedido
+            try:
+                actualizar_estado_pedido_con_empleado(
+                    local_id,
+                    pedido_id,
+                    'cocinando',
+                    cocinero
+                )
+            except Exception:
+                # Compensar la asignación para no dejar al cocinero ocupado sin pedido;
+                # una reserva de la asignación por lotes se conserva para el siguiente intento
+                if not pedido.get('empleado_reservado'):
+                    marcar_empleado_libre(local_id, cocinero['dni'], pedido_id, cocinero.get('_particion'))
+                    print(f"Cocinero {cocinero['dni']} liberado tras fallo actualizando el pedido")
+                raise
         
         print(f"Pedido asignado a cocinero {cocinero['dni']}")
         
@@ -62,23 +85,17 @@ def lambda_handler(event, context):
             'estado': 'cocinando'
         }
         
+        registrar_resultado(execution_id, 'cocinar', result)
+        
         # Si fue invocado por HTTP, devolver respuesta HTTP
-        if 'body' in event:
-            return {
-                'statusCode': 200,
-                'body': json_dumps(result),
-                'headers': {'Content-Type': 'application/json'}
-            }
+        if es_http(event):
+            return respuesta_http(200, result)
         
         return result
         
     except Exception as e:
         print(f'Error en lambda cocinar: {str(e)}')
         
-        if 'body' in event:
-            return {
-                'statusCode': 500,
-                'body': json.dumps({'error': str(e)}),
-                'headers': {'Content-Type': 'application/json'}
-            }
+        if es_http(event):
+            return respuesta_http(500, {'error': str(e)})
         raise
@@ -5,30 +5,47 @@ import os
 sys.path.append(os.path.dirname(__file__))
 from utils.dynamodb_helper import (
     obtener_pedido,
+    marcar_empleado_ocupado,
     marcar_empleado_libre,
     finalizar_pedido,
-    agregar_pedido_a_usuario
+    restaurar_estado_pedido,
+    agregar_pedido_a_usuario,
+    quitar_pedido_de_usuario,
+    reasignar_tras_liberar,
+    liberar_cupo_pedido,
+    obtener_empleados
 )
-from utils.json_encoder import json_dumps
+from utils.historial import expandir_pedido, dnis_del_historial
+from utils.concurrencia import ejecutar_en_paralelo, ErrorEjecucionParalela
+from utils.idempotencia import respuesta_registrada, registrar_resultado
+from utils.http import es_http, leer_body, respuesta_http
+from utils.limitador import respetar_plazo
+from utils.perfilado import perfilar
 
+@perfilar
+@respetar_plazo
 def lambda_handler(event, context):
     """Lambda para confirmar la entrega del pedido"""
     print(f'Iniciando proceso de confirmar: {json.dumps(event)}')
     
     # Manejar invocación desde API Gateway (HTTP) o Step Functions (directo)
-    if 'body' in event:
-        body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
-    else:
-        body = event
+    body = leer_body(event)
     
     local_id = body.get('local_id')
     pedido_id = body.get('pedido_id')
+    execution_id = body.get('execution_id')
     repartidor_dni = body.get('repartidor_dni')
     
     if not local_id or not pedido_id:
         raise ValueError('Faltan parámetros requeridos: local_id o pedido_id')
     
     try:
+        # Si la entrega ya se confirmó en esta ejecución, devolver el resultado
+        # sin volver a escribir
+        respuesta = respuesta_registrada(event, execution_id, 'confirmar')
+        if respuesta:
+            return respuesta
+
         # Obtener información del pedido
         pedido = obtener_pedido(local_id, pedido_id)
         usuario_correo = pedido.get('usuario_correo')
@@ -37,43 +54,70 @@ def lambda_handler(event, context):
         if pedido.get('estado') != 'enviando':
             raise ValueError(f'El pedido debe estar en estado "enviando", actualmente está en "{pedido.get("estado")}"')
         
-        # Liberar al repartidor explícitamente antes de finalizar
-        if repartidor_dni:
-            marcar_empleado_libre(local_id, repartidor_dni)
-            print(f'Repartidor {repartidor_dni} liberado')
+        # Liberar al repartidor, finalizar el pedido y agregarlo al historial del
+        # usuario no dependen entre sí: se escriben en paralelo y, si alguna
+        # falla, se deshacen las demás para que el reintento parta de cero
+        tareas = {
+            'finalizar_pedido': lambda: finalizar_pedido(local_id, pedido_id)
+        }
+        compensaciones = {
+            'finalizar_pedido': lambda _: restaurar_estado_pedido(
+                local_id, pedido_id, pedido.get('estado'), pedido.get('historial_estados', []), pedido.get('_particion')
+            )
+        }
+        
+        def volver_a_ocupar_repartidor(liberado):
+            # Si otro pedido tomó el slot entretanto, la compensación no se
+            # aplicó y debe quedar como error de compensación
+            if liberado and not marcar_empleado_ocupado(local_id, repartidor_dni, pedido_id):
+                raise Exception(f'No se pudo volver a ocupar al repartidor {repartidor_dni} para el pedido {pedido_id}')
         
-        # Finalizar pedido (actualizar estado a recibido y cerrar historial)
-        pedido_actualizado = finalizar_pedido(local_id, pedido_id)
+        if repartidor_dni:
+            tareas['liberar_repartidor'] = lambda: marcar_empleado_libre(local_id, repartidor_dni, pedido_id)
+            compensaciones['liberar_repartidor'] = volver_a_ocupar_repartidor
         
-        # Agregar pedido al historial del usuario
         if usuario_correo:
-            agregar_pedido_a_usuario(usuario_correo, pedido_id)
+            tareas['agregar_a_usuario'] = lambda: agregar_pedido_a_usuario(usuario_correo, pedido_id)
+            compensaciones['agregar_a_usuario'] = lambda _: quitar_pedido_de_usuario(usuario_correo, pedido_id)
+        
+        resultados = ejecutar_en_paralelo(tareas, compensaciones)
+        pedido_actualizado = resultados['finalizar_pedido']
+        
+        if repartidor_dni:
+            print(f'Repartidor {repartidor_dni} liberado')
+            
+            # El slot liberado se asigna a los pedidos que esperaban un repartidor
+            reasignar_tras_liberar(local_id, 'Repartidor')
+        
+        # El pedido deja de contar para el control de admisión del local
+        liberar_cupo_pedido(local_id, pedido_id)
         
         print(f'Pedido confirmado y completado: {pedido_id}')
         
         result = {
             'message': 'Pedido completado exitosamente',
             'pedido_id': pedido_id,
-            'estado': 'recibido',
-            'pedido': pedido_actualizado
+            'estado': 'recibido'
         }
         
-        if 'body' in event:
-            return {
-                'statusCode': 200,
-                'body': json_dumps(result),
-                'headers': {'Content-Type': 'application/json'}
-            }
+        registrar_resultado(execution_id, 'confirmar', result)
+        
+        # El pedido completo solo se devuelve por HTTP, el Step Function
+        # únicamente necesita los IDs
+        if es_http(event):
+            # El historial se guarda compacto; al cliente se le entrega completo
+            empleados = obtener_empleados(local_id, dnis_del_historial(pedido_actualizado.get('historial_estados')))
+            return respuesta_http(200, {**result, 'pedido': expandir_pedido(pedido_actualizado, empleados)})
         
         return result
         
     except Exception as e:
         print(f'Error en lambda confirmar: {str(e)}')
         
-        if 'body' in event:
-            return {
-                'statusCode': 500,
-                'body': json.dumps({'error': str(e)}),
-                'headers': {'Content-Type': 'application/json'}
-            }
+        if isinstance(e, ErrorEjecucionParalela) and e.errores_compensacion:
+            # El reintento ya no parte de cero: queda registrado para revisarlo
+            print(f'Compensaciones fallidas en pedido {pedido_id}: {json.dumps({nombre: str(error) for nombre, error in e.errores_compensacion.items()})}')
+        
+        if es_http(event):
+            return respuesta_http(500, {'error': str(e)})
         raise
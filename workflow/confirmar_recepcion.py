@@ -1,53 +1,48 @@
 import json
 import boto3
 import os
+import sys
 
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-stepfunctions = boto3.client('stepfunctions', region_name='us-east-1')
+sys.path.append(os.path.dirname(__file__))
+from utils.dynamodb_helper import buscar_pedido
+from utils.http import leer_body, respuesta_http
+from utils.limitador import TablaLimitada, llamar_con_limite, respetar_plazo, CONFIG_SIN_REINTENTOS
+from utils.perfilado import perfilar
 
+dynamodb = boto3.resource('dynamodb', region_name='us-east-1', config=CONFIG_SIN_REINTENTOS)
+stepfunctions = boto3.client('stepfunctions', region_name='us-east-1', config=CONFIG_SIN_REINTENTOS)
+
+@perfilar
+@respetar_plazo
 def lambda_handler(event, context):
     """Lambda para procesar la confirmación del usuario y continuar el Step Function"""
     print(f'Procesando confirmación de recepción: {json.dumps(event)}')
     
     # Este lambda puede ser invocado por API Gateway cuando el usuario confirma
-    body = json.loads(event.get('body', '{}')) if isinstance(event.get('body'), str) else event
+    body = leer_body(event)
     
     local_id = body.get('local_id')
     pedido_id = body.get('pedido_id')
     confirmado = body.get('confirmado', True)
     
     if not local_id or not pedido_id:
-        return {
-            'statusCode': 400,
-            'body': json.dumps({'error': 'Faltan parámetros requeridos'})
-        }
+        return respuesta_http(400, {'error': 'Faltan parámetros requeridos'})
     
     try:
         # Obtener el taskToken del pedido
-        table = dynamodb.Table(os.environ['TABLE_PEDIDOS'])
-        response = table.get_item(
-            Key={
-                'local_id': local_id,
-                'pedido_id': pedido_id
-            }
-        )
-        
-        pedido = response.get('Item')
+        table = TablaLimitada(dynamodb.Table(os.environ['TABLE_PEDIDOS']))
+        pedido = buscar_pedido(local_id, pedido_id)
         if not pedido:
-            return {
-                'statusCode': 404,
-                'body': json.dumps({'error': 'Pedido no encontrado'})
-            }
+            return respuesta_http(404, {'error': 'Pedido no encontrado'})
         
         task_token = pedido.get('task_token')
         if not task_token:
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'error': 'No hay confirmación pendiente para este pedido'})
-            }
+            return respuesta_http(400, {'error': 'No hay confirmación pendiente para este pedido'})
         
         # Enviar éxito al Step Function para continuar
-        stepfunctions.send_task_success(
+        llamar_con_limite(
+            'send_task_success',
+            stepfunctions.send_task_success,
             taskToken=task_token,
             output=json.dumps({
                 'confirmado': confirmado,
@@ -59,25 +54,20 @@ def lambda_handler(event, context):
         # Limpiar el taskToken
         table.update_item(
             Key={
-                'local_id': local_id,
+                'local_id': pedido['_particion'],
                 'pedido_id': pedido_id
             },
-            UpdateExpression='REMOVE task_token, esperando_confirmacion'
+            UpdateExpression='REMOVE task_token, esperando_confirmacion',
+            ConditionExpression='attribute_exists(pedido_id)'
         )
         
         print(f'Confirmación procesada exitosamente para pedido {pedido_id}')
         
-        return {
-            'statusCode': 200,
-            'body': json.dumps({
-                'message': 'Confirmación procesada exitosamente',
-                'pedido_id': pedido_id
-            })
-        }
+        return respuesta_http(200, {
+            'message': 'Confirmación procesada exitosamente',
+            'pedido_id': pedido_id
+        })
         
     except Exception as e:
         print(f'Error al procesar confirmación: {str(e)}')
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
-        }
+        return respuesta_http(500, {'error': str(e)})
@@ -0,0 +1,152 @@
+import boto3
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+sys.path.append(os.path.dirname(__file__))
+from utils.notificaciones import enviar_notificaciones
+from utils.limitador import respetar_plazo, TablaLimitada, CONFIG_SIN_REINTENTOS
+from utils.perfilado import perfilar
+
+# Este lambda drena el outbox de notificaciones. Se dispara con el stream de la
+# tabla (lotes de registros nuevos) y de forma programada para barrer las
+# notificaciones pendientes. Los reintentos de las fallidas solo los hace el
+# barrido, cuando vence su proximo_intento.
+dynamodb = boto3.resource('dynamodb', region_name='us-east-1', config=CONFIG_SIN_REINTENTOS)
+deserializer = TypeDeserializer()
+
+MAX_INTENTOS = int(os.environ.get('NOTIFICACIONES_MAX_INTENTOS', 5))
+# Espera antes del primer reintento; se duplica en cada intento fallido
+BACKOFF_BASE_SEGUNDOS = int(os.environ.get('NOTIFICACIONES_BACKOFF_SEGUNDOS', 60))
+BACKOFF_MAX_SEGUNDOS = 3600
+# Antigüedad desde la que el barrido toma una notificación nunca intentada
+# (la que el stream no llegó a procesar)
+GRACIA_STREAM_SEGUNDOS = 300
+# Máximo de notificaciones que despacha un barrido
+LIMITE_BARRIDO = 500
+
+def _pendientes_del_stream(records):
+    """Notificaciones pendientes de los registros INSERT/MODIFY del stream"""
+    notificaciones = {}
+    for record in records:
+        if record.get('eventName') not in ('INSERT', 'MODIFY'):
+            continue
+        imagen = record.get('dynamodb', {}).get('NewImage')
+        if not imagen:
+            continue
+        notificacion = {clave: deserializer.deserialize(valor) for clave, valor in imagen.items()}
+        # Un reintento programado también pasa por el stream; lo envía el barrido
+        if notificacion.get('estado') == 'pendiente' and 'proximo_intento' not in notificacion:
+            # Si llegan varias versiones del mismo item, vale la última
+            notificaciones[notificacion['notificacion_id']] = notificacion
+    return list(notificaciones.values())
+
+def _pendientes_del_outbox(table):
+    """Barre el outbox buscando notificaciones pendientes cuyo envío ya corresponde"""
+    ahora = int(time.time())
+    limite_gracia = (datetime.now() - timedelta(seconds=GRACIA_STREAM_SEGUNDOS)).isoformat()
+    filtro = Attr('estado').eq('pendiente') & (
+        Attr('proximo_intento').lte(ahora) |
+        (Attr('proximo_intento').not_exists() & Attr('creado_en').lt(limite_gracia))
+    )
+
+    # El filtro se aplica después de leer cada página, así que se pagina hasta
+    # recorrer la tabla o juntar LIMITE_BARRIDO notificaciones
+    notificaciones = []
+    kwargs = {'FilterExpression': filtro}
+    while len(notificaciones) < LIMITE_BARRIDO:
+        response = table.scan(**kwargs)
+        notificaciones.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    return notificaciones[:LIMITE_BARRIDO]
+
+def _misma_version(notificacion):
+    """Condición de que el item del outbox sigue siendo la notificación que se envió.
+
+    El id es fijo por pedido ("<pedido_id>#entrega"): un reintento de
+    NotificarUsuario lo reemplaza con otro creado_en mientras se envía el
+    anterior, y ese item nuevo no se debe borrar ni marcar.
+    """
+    if 'creado_en' not in notificacion:
+        return Attr('notificacion_id').exists() & Attr('creado_en').not_exists()
+    return Attr('creado_en').eq(notificacion['creado_en'])
+
+def _proximo_intento(intentos):
+    """Epoch del siguiente reintento con backoff exponencial"""
+    espera = min(BACKOFF_BASE_SEGUNDOS * (2 ** (intentos - 1)), BACKOFF_MAX_SEGUNDOS)
+    return int(time.time()) + espera
+
+@perfilar
+@respetar_plazo
+def lambda_handler(event, context):
+    """Lambda para enviar por lotes las notificaciones pendientes del outbox"""
+    table = TablaLimitada(dynamodb.Table(os.environ['TABLE_NOTIFICACIONES']))
+    
+    if 'Records' in event:
+        notificaciones = _pendientes_del_stream(event['Records'])
+    else:
+        notificaciones = _pendientes_del_outbox(table)
+    
+    print(f'Notificaciones pendientes a despachar: {len(notificaciones)}')
+    
+    if not notificaciones:
+        return {'enviadas': 0, 'fallidas': 0}
+    
+    enviadas, fallidas = enviar_notificaciones(notificaciones)
+    por_id = {notificacion['notificacion_id']: notificacion for notificacion in notificaciones}
+    
+    # Las enviadas salen del outbox, solo si nadie las reemplazó mientras tanto
+    # (un borrado condicional no se puede agrupar en batch_writer)
+    for notificacion_id in enviadas:
+        try:
+            table.delete_item(
+                Key={'notificacion_id': notificacion_id},
+                ConditionExpression=_misma_version(por_id[notificacion_id])
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                print(f'Notificación {notificacion_id} reemplazada durante el envío, queda la nueva')
+            else:
+                print(f'Error borrando notificación {notificacion_id}: {str(e)}')
+    
+    # Las fallidas suman un intento y se programan para el barrido con backoff
+    # hasta agotar MAX_INTENTOS
+    for notificacion_id, error in fallidas.items():
+        intentos = int(por_id[notificacion_id].get('intentos', 0)) + 1
+        expresion = 'SET intentos = :intentos, estado = :estado, ultimo_error = :error'
+        valores = {
+            ':intentos': intentos,
+            ':estado': 'fallida' if intentos >= MAX_INTENTOS else 'pendiente',
+            ':error': str(error)[:500]
+        }
+        if intentos >= MAX_INTENTOS:
+            expresion += ' REMOVE proximo_intento'
+        else:
+            expresion += ', proximo_intento = :proximo'
+            valores[':proximo'] = _proximo_intento(intentos)
+        try:
+            table.update_item(
+                Key={'notificacion_id': notificacion_id},
+                UpdateExpression=expresion,
+                ConditionExpression=_misma_version(por_id[notificacion_id]),
+                ExpressionAttributeValues=valores
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                print(f'Notificación {notificacion_id} reemplazada durante el envío, queda la nueva')
+            else:
+                print(f'Error actualizando notificación {notificacion_id}: {str(e)}')
+        except Exception as e:
+            print(f'Error actualizando notificación {notificacion_id}: {str(e)}')
+    
+    return {
+        'enviadas': len(enviadas),
+        'fallidas': len(fallidas)
+    }
@@ -5,60 +5,88 @@ import os
 sys.path.append(os.path.dirname(__file__))
 from utils.dynamodb_helper import (
     obtener_pedido,
-    buscar_empleado_disponible,
-    marcar_empleado_ocupado,
+    asignar_empleado_a_pedido,
     marcar_empleado_libre,
-    actualizar_estado_pedido_con_empleado
+    actualizar_estado_pedido_con_empleado,
+    reasignar_tras_liberar
 )
-from utils.json_encoder import json_dumps
+from utils.historial import empleados_de_la_etapa
+from utils.idempotencia import respuesta_registrada, registrar_resultado
+from utils.http import es_http, leer_body, respuesta_http
+from utils.limitador import respetar_plazo
+from utils.perfilado import perfilar
 
+@perfilar
+@respetar_plazo
 def lambda_handler(event, context):
     """Lambda para asignar despachador y empacar el pedido"""
     print(f'Iniciando proceso de empacar: {json.dumps(event)}')
     
     # Manejar invocación desde API Gateway (HTTP) o Step Functions (directo)
-    if 'body' in event:
-        body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
-    else:
-        body = event
+    body = leer_body(event)
     
     local_id = body.get('local_id')
     pedido_id = body.get('pedido_id')
+    execution_id = body.get('execution_id')
     cocinero_dni = body.get('cocinero_dni')
     
     if not local_id or not pedido_id:
         raise ValueError('Faltan parámetros requeridos: local_id o pedido_id')
     
     try:
+        # Si la etapa ya se completó en esta ejecución (redrive o reintento tras
+        # un éxito parcial), devolver el resultado sin volver a escribir
+        respuesta = respuesta_registrada(event, execution_id, 'empacar')
+        if respuesta:
+            return respuesta
+
         # Obtener información del pedido
         pedido = obtener_pedido(local_id, pedido_id)
         
-        # Validar que el pedido esté en estado "cocinando"
-        if pedido.get('estado') != 'cocinando':
-            raise ValueError(f'El pedido debe estar en estado "cocinando", actualmente está en "{pedido.get("estado")}"')
+        despachador_dni, anterior_dni = empleados_de_la_etapa(pedido.get('historial_estados'))
         
-        # Buscar despachador disponible
-        despachador = buscar_empleado_disponible(local_id, 'Despachador')
+        if pedido.get('estado') == 'empacando' and despachador_dni:
+            # Un intento anterior ya pasó el pedido a "empacando" pero falló antes
+            # de registrar el resultado: la etapa está completa con ese despachador
+            # y solo falta liberar al cocinero
+            print(f'Pedido {pedido_id} ya estaba empacando con el despachador {despachador_dni}')
+            despachador = {'dni': despachador_dni}
+            empleado_anterior_dni = anterior_dni
+        else:
+            # Validar que el pedido esté en estado "cocinando"
+            if pedido.get('estado') != 'cocinando':
+                raise ValueError(f'El pedido debe estar en estado "cocinando", actualmente está en "{pedido.get("estado")}"')
         
-        if not despachador:
-            raise Exception('No hay despachadores disponibles en este momento')
+            # Tomar el despachador reservado para el pedido, o esperar turno según su prioridad
+            despachador = asignar_empleado_a_pedido(local_id, pedido, 'Despachador', body.get('contadores'))
         
-        # Marcar despachador como ocupado
-        marcar_empleado_ocupado(local_id, despachador['dni'])
+            if not despachador:
+                raise Exception('No hay despachadores disponibles en este momento')
         
-        # Actualizar estado del pedido (esto liberará automáticamente al cocinero)
-        pedido_actualizado = actualizar_estado_pedido_con_empleado(
-            local_id,
-            pedido_id,
-            'empacando',
-            despachador
-        )
+            # Actualizar estado del pedido (esto liberará automáticamente al cocinero)
+            try:
+                pedido_actualizado = actualizar_estado_pedido_con_empleado(
+                    local_id,
+                    pedido_id,
+                    'empacando',
+                    despachador
+                )
+            except Exception:
+                # Compensar la asignación para no dejar al despachador ocupado sin pedido;
+                # una reserva de la asignación por lotes se conserva para el siguiente intento
+                if not pedido.get('empleado_reservado'):
+                    marcar_empleado_libre(local_id, despachador['dni'], pedido_id, despachador.get('_particion'))
+                    print(f"Despachador {despachador['dni']} liberado tras fallo actualizando el pedido")
+                raise
+            empleado_anterior_dni = pedido_actualizado.get('_empleado_anterior_dni')
         
         # Liberar al cocinero explícitamente si hay uno
-        empleado_anterior_dni = pedido_actualizado.get('_empleado_anterior_dni')
         if empleado_anterior_dni:
-            marcar_empleado_libre(local_id, empleado_anterior_dni)
+            marcar_empleado_libre(local_id, empleado_anterior_dni, pedido_id)
             print(f'Cocinero {empleado_anterior_dni} liberado')
+            
+            # El slot liberado se asigna a los pedidos que esperaban un cocinero
+            reasignar_tras_liberar(local_id, 'Cocinero')
         
         print(f"Pedido asignado a despachador {despachador['dni']}")
         
@@ -70,22 +98,16 @@ def lambda_handler(event, context):
             'estado': 'empacando'
         }
         
-        if 'body' in event:
-            return {
-                'statusCode': 200,
-                'body': json_dumps(result),
-                'headers': {'Content-Type': 'application/json'}
-            }
+        registrar_resultado(execution_id, 'empacar', result)
+        
+        if es_http(event):
+            return respuesta_http(200, result)
         
         return result
         
     except Exception as e:
         print(f'Error en lambda empacar: {str(e)}')
         
-        if 'body' in event:
-            return {
-                'statusCode': 500,
-                'body': json.dumps({'error': str(e)}),
-                'headers': {'Content-Type': 'application/json'}
-            }
+        if es_http(event):
+            return respuesta_http(500, {'error': str(e)})
         raise
@@ -5,60 +5,88 @@ import os
 sys.path.append(os.path.dirname(__file__))
 from utils.dynamodb_helper import (
     obtener_pedido,
-    buscar_empleado_disponible,
-    marcar_empleado_ocupado,
+    asignar_empleado_a_pedido,
     marcar_empleado_libre,
-    actualizar_estado_pedido_con_empleado
+    actualizar_estado_pedido_con_empleado,
+    reasignar_tras_liberar
 )
-from utils.json_encoder import json_dumps
+from utils.historial import empleados_de_la_etapa
+from utils.idempotencia import respuesta_registrada, registrar_resultado
+from utils.http import es_http, leer_body, respuesta_http
+from utils.limitador import respetar_plazo
+from utils.perfilado import perfilar
 
+@perfilar
+@respetar_plazo
 def lambda_handler(event, context):
     """Lambda para asignar repartidor y enviar el pedido"""
     print(f'Iniciando proceso de enviar: {json.dumps(event)}')
     
     # Manejar invocación desde API Gateway (HTTP) o Step Functions (directo)
-    if 'body' in event:
-        body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
-    else:
-        body = event
+    body = leer_body(event)
     
     local_id = body.get('local_id')
     pedido_id = body.get('pedido_id')
+    execution_id = body.get('execution_id')
     despachador_dni = body.get('despachador_dni')
     
     if not local_id or not pedido_id:
         raise ValueError('Faltan parámetros requeridos: local_id o pedido_id')
     
     try:
+        # Si la etapa ya se completó en esta ejecución (redrive o reintento tras
+        # un éxito parcial), devolver el resultado sin volver a escribir
+        respuesta = respuesta_registrada(event, execution_id, 'enviar')
+        if respuesta:
+            return respuesta
+
         # Obtener información del pedido
         pedido = obtener_pedido(local_id, pedido_id)
         
-        # Validar que el pedido esté en estado "empacando"
-        if pedido.get('estado') != 'empacando':
-            raise ValueError(f'El pedido debe estar en estado "empacando", actualmente está en "{pedido.get("estado")}"')
+        repartidor_dni, anterior_dni = empleados_de_la_etapa(pedido.get('historial_estados'))
         
-        # Buscar repartidor disponible
-        repartidor = buscar_empleado_disponible(local_id, 'Repartidor')
+        if pedido.get('estado') == 'enviando' and repartidor_dni:
+            # Un intento anterior ya pasó el pedido a "enviando" pero falló antes
+            # de registrar el resultado: la etapa está completa con ese repartidor
+            # y solo falta liberar al despachador
+            print(f'Pedido {pedido_id} ya estaba enviando con el repartidor {repartidor_dni}')
+            repartidor = {'dni': repartidor_dni}
+            empleado_anterior_dni = anterior_dni
+        else:
+            # Validar que el pedido esté en estado "empacando"
+            if pedido.get('estado') != 'empacando':
+                raise ValueError(f'El pedido debe estar en estado "empacando", actualmente está en "{pedido.get("estado")}"')
         
-        if not repartidor:
-            raise Exception('No hay repartidores disponibles en este momento')
+            # Tomar el repartidor reservado para el pedido, o esperar turno según su prioridad
+            repartidor = asignar_empleado_a_pedido(local_id, pedido, 'Repartidor', body.get('contadores'))
         
-        # Marcar repartidor como ocupado
-        marcar_empleado_ocupado(local_id, repartidor['dni'])
+            if not repartidor:
+                raise Exception('No hay repartidores disponibles en este momento')
         
-        # Actualizar estado del pedido (esto liberará automáticamente al despachador)
-        pedido_actualizado = actualizar_estado_pedido_con_empleado(
-            local_id,
-            pedido_id,
-            'enviando',
-            repartidor
-        )
+            # Actualizar estado del pedido (esto liberará automáticamente al despachador)
+            try:
+                pedido_actualizado = actualizar_estado_pedido_con_empleado(
+                    local_id,
+                    pedido_id,
+                    'enviando',
+                    repartidor
+                )
+            except Exception:
+                # Compensar la asignación para no dejar al repartidor ocupado sin pedido;
+                # una reserva de la asignación por lotes se conserva para el siguiente intento
+                if not pedido.get('empleado_reservado'):
+                    marcar_empleado_libre(local_id, repartidor['dni'], pedido_id, repartidor.get('_particion'))
+                    print(f"Repartidor {repartidor['dni']} liberado tras fallo actualizando el pedido")
+                raise
+            empleado_anterior_dni = pedido_actualizado.get('_empleado_anterior_dni')
         
         # Liberar al despachador explícitamente si hay uno
-        empleado_anterior_dni = pedido_actualizado.get('_empleado_anterior_dni')
         if empleado_anterior_dni:
-            marcar_empleado_libre(local_id, empleado_anterior_dni)
+            marcar_empleado_libre(local_id, empleado_anterior_dni, pedido_id)
             print(f'Despachador {empleado_anterior_dni} liberado')
+            
+            # El slot liberado se asigna a los pedidos que esperaban un despachador
+            reasignar_tras_liberar(local_id, 'Despachador')
         
         print(f"Pedido asignado a repartidor {repartidor['dni']}")
         
@@ -70,22 +98,16 @@ def lambda_handler(event, context):
             'estado': 'enviando'
         }
         
-        if 'body' in event:
-            return {
-                'statusCode': 200,
-                'body': json_dumps(result),
-                'headers': {'Content-Type': 'application/json'}
-            }
+        registrar_resultado(execution_id, 'enviar', result)
+        
+        if es_http(event):
+            return respuesta_http(200, result)
         
         return result
         
     except Exception as e:
         print(f'Error en lambda enviar: {str(e)}')
         
-        if 'body' in event:
-            return {
-                'statusCode': 500,
-                'body': json.dumps({'error': str(e)}),
-                'headers': {'Content-Type': 'application/json'}
-            }
+        if es_http(event):
+            return respuesta_http(500, {'error': str(e)})
         raise
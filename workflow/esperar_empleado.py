@@ -0,0 +1,38 @@
+import json
+import sys
+import os
+
+sys.path.append(os.path.dirname(__file__))
+from utils.dynamodb_helper import registrar_token_espera
+from utils.ejecuciones import reanudar_ejecucion
+from utils.limitador import respetar_plazo
+from utils.perfilado import perfilar
+
+@perfilar
+@respetar_plazo
+def lambda_handler(event, context):
+    """Lambda para dejar la ejecución esperando hasta que se reserve un empleado para el pedido"""
+    print(f'Esperando empleado: {json.dumps({**event, "taskToken": "..."})}')
+
+    local_id = event.get('local_id')
+    pedido_id = event.get('pedido_id')
+    role = event.get('role')
+    task_token = event.get('taskToken')
+
+    if not local_id or not pedido_id or not role or not task_token:
+        raise ValueError('Faltan parámetros requeridos')
+
+    # La asignación por lotes reanuda la ejecución con este token al reservarle
+    # un empleado. Si no llega, el estado vence y la etapa se reintenta igual.
+    estado = registrar_token_espera(local_id, pedido_id, role, task_token)
+
+    # La reserva llegó antes que el token: se continúa de inmediato
+    if estado == 'reservado':
+        print(f'Pedido {pedido_id} ya tiene {role} reservado, reanudando ejecución')
+        reanudar_ejecucion(task_token, {'empleado_reservado': True})
+
+    return {
+        'pedido_id': pedido_id,
+        'role': role,
+        'estado': estado
+    }
@@ -5,29 +5,34 @@ import sys
 from datetime import datetime
 
 sys.path.append(os.path.dirname(__file__))
+from utils.admision import evaluar_admision, es_modo_realista
+from utils.dynamodb_helper import liberar_cupo_pedido
+from utils.http import leer_body, respuesta_http
+from utils.limitador import llamar_con_limite, respetar_plazo, CONFIG_SIN_REINTENTOS
+from utils.perfilado import perfilar
 
-stepfunctions = boto3.client('stepfunctions', region_name='us-east-1')
+stepfunctions = boto3.client('stepfunctions', region_name='us-east-1', config=CONFIG_SIN_REINTENTOS)
 lambda_client = boto3.client('lambda', region_name='us-east-1')
 
+@perfilar
+@respetar_plazo
 def lambda_handler(event, context):
     """Lambda para iniciar el workflow de Step Functions"""
     print(f'Iniciando workflow: {json.dumps(event)}')
     
     # Manejar invocación desde API Gateway
-    if 'body' in event:
-        body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
-    else:
-        body = event
+    body = leer_body(event)
     
     local_id = body.get('local_id')
     pedido_id = body.get('pedido_id')
     
     if not local_id or not pedido_id:
-        return {
-            'statusCode': 400,
-            'body': json.dumps({'error': 'Faltan parámetros requeridos: local_id y pedido_id'}),
-            'headers': {'Content-Type': 'application/json'}
-        }
+        return respuesta_http(400, {'error': 'Faltan parámetros requeridos: local_id y pedido_id'})
+    
+    # Tiempos de preparación del pedido: los del body (como en la colección de
+    # Postman) o los de MODO_REALISTA. El Step Function elige sus esperas con este campo.
+    contadores = body.get('contadores') or {}
+    modo_realista = es_modo_realista(contadores.get('modo_realista', body.get('modo_realista')))
     
     try:
         state_machine_arn = os.environ.get('STATE_MACHINE_ARN')
@@ -40,7 +45,9 @@ def lambda_handler(event, context):
         # Verificar si hay ejecuciones en curso para este pedido
         ejecucion_existente = None
         try:
-            response = stepfunctions.list_executions(
+            response = llamar_con_limite(
+                'list_executions',
+                stepfunctions.list_executions,
                 stateMachineArn=state_machine_arn,
                 statusFilter='RUNNING',
                 maxResults=100
@@ -54,6 +61,35 @@ def lambda_handler(event, context):
         except Exception as e:
             print(f'Error verificando ejecuciones existentes: {str(e)}')
         
+        # Control de admisión: los reinicios conservan el cupo de la ejecución anterior
+        cupo_reservado = False
+        if not ejecucion_existente:
+            try:
+                admision = evaluar_admision(local_id, pedido_id, modo_realista)
+            except Exception as e:
+                # Si los contadores no están disponibles se admite el pedido
+                print(f'Error evaluando admisión, se inicia sin control: {str(e)}')
+                admision = {'decision': 'iniciar', 'sin_cupo': True}
+            
+            if admision['decision'] == 'diferir':
+                return respuesta_http(202, {
+                    'message': 'Local con alta demanda, reintenta iniciar el pedido más tarde',
+                    'pedido_id': pedido_id,
+                    'local_id': local_id,
+                    'eta_segundos': admision['eta_segundos'],
+                    'pedidos_en_curso': admision['pedidos_en_curso']
+                }, headers={'Retry-After': str(admision['eta_segundos'])})
+            
+            if admision['decision'] == 'rechazar':
+                return respuesta_http(429, {
+                    'error': 'Servicio saturado: el local no puede atender más pedidos en este momento',
+                    'pedido_id': pedido_id,
+                    'local_id': local_id,
+                    'eta_segundos': admision['eta_segundos']
+                }, headers={'Retry-After': str(admision['eta_segundos'])})
+            
+            cupo_reservado = not admision.get('sin_cupo', False)
+        
         # Si hay una ejecución en curso, detenerla y limpiar empleados
         if ejecucion_existente:
             execution_arn = ejecucion_existente['executionArn']
@@ -61,7 +97,9 @@ def lambda_handler(event, context):
             try:
                 # Detener la ejecución anterior
                 print(f'Deteniendo ejecución anterior: {execution_arn}')
-                stepfunctions.stop_execution(
+                llamar_con_limite(
+                    'stop_execution',
+                    stepfunctions.stop_execution,
                     executionArn=execution_arn,
                     error='Reintento',
                     cause='Se solicitó reiniciar el workflow para este pedido'
@@ -98,14 +136,23 @@ def lambda_handler(event, context):
         execution_name = f'pedido-{pedido_id}-{timestamp}'
         
         # Iniciar la ejecución del Step Function
-        response = stepfunctions.start_execution(
-            stateMachineArn=state_machine_arn,
-            name=execution_name,
-            input=json.dumps({
-                'local_id': local_id,
-                'pedido_id': pedido_id
-            })
-        )
+        try:
+            response = llamar_con_limite(
+                'start_execution',
+                stepfunctions.start_execution,
+                stateMachineArn=state_machine_arn,
+                name=execution_name,
+                input=json.dumps({
+                    'local_id': local_id,
+                    'pedido_id': pedido_id,
+                    'modo_realista': modo_realista
+                })
+            )
+        except Exception:
+            # Devolver el cupo reservado si la ejecución no llegó a iniciarse
+            if cupo_reservado:
+                liberar_cupo_pedido(local_id, pedido_id)
+            raise
         
         execution_arn = response['executionArn']
         start_date = response['startDate'].isoformat()
@@ -116,43 +163,31 @@ def lambda_handler(event, context):
         
         print(f'{mensaje}: {execution_arn}')
         
-        return {
-            'statusCode': 200,
-            'body': json.dumps({
-                'message': mensaje,
-                'execution_arn': execution_arn,
-                'execution_name': execution_name,
-                'pedido_id': pedido_id,
-                'local_id': local_id,
-                'start_date': start_date,
-                'reiniciado': ejecucion_existente is not None,
-                'console_url': f'https://console.aws.amazon.com/states/home?region=us-east-1#/executions/details/{execution_arn}'
-            }),
-            'headers': {'Content-Type': 'application/json'}
-        }
+        return respuesta_http(200, {
+            'message': mensaje,
+            'execution_arn': execution_arn,
+            'execution_name': execution_name,
+            'pedido_id': pedido_id,
+            'local_id': local_id,
+            'start_date': start_date,
+            'reiniciado': ejecucion_existente is not None,
+            'console_url': f'https://console.aws.amazon.com/states/home?region=us-east-1#/executions/details/{execution_arn}'
+        })
         
     except stepfunctions.exceptions.ExecutionAlreadyExists:
         # Este caso es muy raro ahora, pero lo manejamos por si acaso
-        return {
-            'statusCode': 409,
-            'body': json.dumps({
-                'error': f'Ya existe una ejecución con el mismo nombre para el pedido {pedido_id}',
-                'pedido_id': pedido_id,
-                'solucion': 'Por favor, intenta nuevamente en unos segundos'
-            }),
-            'headers': {'Content-Type': 'application/json'}
-        }
+        return respuesta_http(409, {
+            'error': f'Ya existe una ejecución con el mismo nombre para el pedido {pedido_id}',
+            'pedido_id': pedido_id,
+            'solucion': 'Por favor, intenta nuevamente en unos segundos'
+        })
         
     except Exception as e:
         print(f'Error al iniciar workflow: {str(e)}')
         import traceback
         print(f'Traceback: {traceback.format_exc()}')
         
-        return {
-            'statusCode': 500,
-            'body': json.dumps({
-                'error': str(e),
-                'type': type(e).__name__
-            }),
-            'headers': {'Content-Type': 'application/json'}
-        }
+        return respuesta_http(500, {
+            'error': str(e),
+            'type': type(e).__name__
+        })
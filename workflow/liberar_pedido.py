@@ -6,9 +6,17 @@ sys.path.append(os.path.dirname(__file__))
 from utils.dynamodb_helper import (
     obtener_pedido,
     marcar_empleado_libre,
-    resetear_pedido_a_inicial
+    resetear_pedido_a_inicial,
+    cancelar_reserva_empleado,
+    reasignar_tras_liberar,
+    liberar_cupo_pedido
 )
+from utils.historial import expandir_historial
+from utils.limitador import respetar_plazo
+from utils.perfilado import perfilar
 
+@perfilar
+@respetar_plazo
 def lambda_handler(event, context):
     """Lambda para liberar todos los empleados asignados a un pedido"""
     print(f'Liberando empleados del pedido: {json.dumps(event)}')
@@ -25,34 +33,64 @@ def lambda_handler(event, context):
     try:
         # Obtener el pedido para ver qué empleados están asignados
         pedido = obtener_pedido(local_id, pedido_id)
-        historial = pedido.get('historial_estados', [])
+        
+        # Un pedido ya entregado no tiene empleados que liberar y confirmar ya
+        # devolvió su cupo
+        if pedido.get('estado') == 'recibido':
+            print(f'Pedido {pedido_id} ya fue entregado, no hay nada que liberar')
+            return {'liberados': 0, 'pedido_reseteado': False, 'motivo': motivo}
+        
+        historial = expandir_historial(pedido.get('historial_estados', []))
         
         empleados_liberados = []
         
         # Buscar en el historial los empleados que estaban activos
-        for estado in historial:
-            if estado.get('activo') and estado.get('empleado'):
-                empleado_dni = estado['empleado']['dni']
-                empleado_rol = estado['empleado']['rol']
-                
-                try:
-                    marcar_empleado_libre(local_id, empleado_dni)
-                    empleados_liberados.append({
-                        'dni': empleado_dni,
-                        'rol': empleado_rol
-                    })
-                    print(f'Empleado {empleado_rol} {empleado_dni} liberado por {motivo}')
-                except Exception as e:
-                    print(f'Error liberando empleado {empleado_dni}: {str(e)}')
+        empleados_asignados = [
+            (estado['empleado']['dni'], estado['empleado']['rol'])
+            for estado in historial
+            if estado.get('activo') and estado.get('empleado')
+        ]
+        
+        # Un empleado reservado por la asignación por lotes también ocupa un slot
+        reservado = pedido.get('empleado_reservado')
+        if reservado:
+            empleados_asignados.append((reservado['dni'], reservado['role'].lower()))
+            if not resetear_estado:
+                cancelar_reserva_empleado(local_id, pedido_id, pedido.get('_particion'))
+        
+        for empleado_dni, empleado_rol in empleados_asignados:
+            try:
+                # Libera solo el slot que ocupaba este pedido, el empleado
+                # puede seguir atendiendo otros pedidos
+                empleado = marcar_empleado_libre(local_id, empleado_dni, pedido_id)
+                if not empleado:
+                    continue
+                empleados_liberados.append({
+                    'dni': empleado_dni,
+                    'rol': empleado_rol,
+                    'carga_actual': empleado.get('carga_actual')
+                })
+                print(f'Empleado {empleado_rol} {empleado_dni} liberado por {motivo}')
+            except Exception as e:
+                print(f'Error liberando empleado {empleado_dni}: {str(e)}')
         
         # Resetear el pedido a estado inicial si se solicita
         if resetear_estado:
             try:
-                resetear_pedido_a_inicial(local_id, pedido_id)
+                resetear_pedido_a_inicial(local_id, pedido_id, pedido.get('_particion'))
                 print(f'Pedido {pedido_id} reseteado a estado "procesando"')
             except Exception as e:
                 print(f'Error reseteando estado del pedido: {str(e)}')
         
+        # Los slots liberados se asignan a los pedidos que esperaban esos roles
+        for rol in {empleado['rol'] for empleado in empleados_liberados}:
+            reasignar_tras_liberar(local_id, rol.capitalize())
+        
+        # Un pedido abandonado deja de contar para el control de admisión; en un
+        # reintento la nueva ejecución conserva el cupo
+        if motivo != 'reintento_workflow':
+            liberar_cupo_pedido(local_id, pedido_id)
+        
         print(f'Total empleados liberados: {len(empleados_liberados)}')
         
         return {
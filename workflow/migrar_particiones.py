@@ -0,0 +1,36 @@
+import json
+import sys
+import os
+
+sys.path.append(os.path.dirname(__file__))
+from utils.dynamodb_helper import migrar_local_a_shards, LOCALES_CALIENTES
+from utils.limitador import respetar_plazo
+from utils.perfilado import perfilar
+
+@perfilar
+@respetar_plazo
+def lambda_handler(event, context):
+    """Lambda que mueve a sus shards los items de los locales de LOCALES_CALIENTES"""
+    event = event or {}
+    print(f'Migrando particiones: {json.dumps(event, default=str)}')
+
+    # Con local_id se migra solo ese local; sin él, todos los locales calientes
+    locales = [event['local_id']] if event.get('local_id') else list(LOCALES_CALIENTES.keys())
+
+    migrados = {}
+    errores = {}
+    for local_id in locales:
+        try:
+            migrados[local_id] = migrar_local_a_shards(local_id)
+        except Exception as e:
+            errores[local_id] = str(e)
+
+    # Un item que cambió durante la migración queda pendiente para la siguiente
+    pendientes = sum(tabla['pendientes'] for por_tabla in migrados.values() for tabla in por_tabla.values())
+    print(f'Locales migrados: {len(migrados)} de {len(locales)}, items pendientes: {pendientes}')
+
+    return {
+        'migrados': migrados,
+        'pendientes': pendientes,
+        'errores': errores
+    }
@@ -1,12 +1,26 @@
 import json
 import boto3
 import os
+import sys
+import time
+from datetime import datetime
 
-# Este lambda se encarga de notificar al usuario que su pedido ha llegado
-# y guarda el taskToken para que pueda ser usado cuando el usuario confirme
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-sns = boto3.client('sns', region_name='us-east-1')
+sys.path.append(os.path.dirname(__file__))
+from utils.notificaciones import construir_mensaje_entrega
+from utils.dynamodb_helper import ubicar_pedido
+from utils.limitador import llamar_con_limite, respetar_plazo, CONFIG_SIN_REINTENTOS
+from utils.perfilado import perfilar
 
+# Este lambda guarda el taskToken del pedido junto con la notificación para el
+# usuario en el outbox, en una sola transacción. El envío real lo hace
+# despachar_notificaciones por lotes, así el Step Function no espera al proveedor.
+dynamodb = boto3.resource('dynamodb', region_name='us-east-1', config=CONFIG_SIN_REINTENTOS)
+
+# Tiempo que se conserva una notificación no enviada en el outbox
+OUTBOX_TTL_SEGUNDOS = int(os.environ.get('OUTBOX_TTL_SEGUNDOS', 86400))
+
+@perfilar
+@respetar_plazo
 def lambda_handler(event, context):
     """Lambda para notificar al usuario sobre la entrega y esperar confirmación"""
     print(f'Notificando usuario sobre entrega: {json.dumps(event)}')
@@ -19,31 +33,51 @@ def lambda_handler(event, context):
         raise ValueError('Faltan parámetros requeridos')
     
     try:
-        # Guardar el taskToken en DynamoDB para recuperarlo cuando el usuario confirme
-        table = dynamodb.Table(os.environ['TABLE_PEDIDOS'])
-        table.update_item(
-            Key={
-                'local_id': event.get('local_id'),
-                'pedido_id': pedido_id
-            },
-            UpdateExpression='SET task_token = :token, esperando_confirmacion = :true',
-            ExpressionAttributeValues={
-                ':token': task_token,
-                ':true': True
-            }
-        )
+        ahora = int(time.time())
         
-        # Aquí podrías enviar una notificación al usuario (SNS, SES, etc.)
-        mensaje = f"""
-        ¡Tu pedido {pedido_id} ha llegado a su destino!
-        
-        Por favor confirma la recepción accediendo a:
-        https://tu-app.com/confirmar-pedido/{pedido_id}
-        
-        O responde a este mensaje con 'CONFIRMAR'.
-        """
+        # Guardar el taskToken (para recuperarlo cuando el usuario confirme) y
+        # la notificación en el outbox en una sola escritura
+        llamar_con_limite(
+            'dynamodb',
+            dynamodb.meta.client.transact_write_items,
+            TransactItems=[
+                {
+                    'Update': {
+                        'TableName': os.environ['TABLE_PEDIDOS'],
+                        'Key': {
+                            'local_id': ubicar_pedido(event.get('local_id'), pedido_id),
+                            'pedido_id': pedido_id
+                        },
+                        'UpdateExpression': 'SET task_token = :token, esperando_confirmacion = :true',
+                        'ConditionExpression': 'attribute_exists(pedido_id)',
+                        'ExpressionAttributeValues': {
+                            ':token': task_token,
+                            ':true': True
+                        }
+                    }
+                },
+                {
+                    'Put': {
+                        'TableName': os.environ['TABLE_NOTIFICACIONES'],
+                        'Item': {
+                            # Un reintento de la etapa reemplaza la notificación pendiente
+                            'notificacion_id': f'{pedido_id}#entrega',
+                            'pedido_id': pedido_id,
+                            'local_id': event.get('local_id'),
+                            'destinatario': usuario_correo,
+                            'asunto': f'Tu pedido {pedido_id} ha llegado',
+                            'mensaje': construir_mensaje_entrega(pedido_id),
+                            'estado': 'pendiente',
+                            'intentos': 0,
+                            'creado_en': datetime.now().isoformat(),
+                            'expira_en': ahora + OUTBOX_TTL_SEGUNDOS
+                        }
+                    }
+                }
+            ]
+        )
         
-        print(f'Notificación enviada al usuario {usuario_correo}')
+        print(f'Notificación para {usuario_correo} encolada en el outbox')
         print(f'TaskToken guardado: {task_token[:20]}...')
         
         # El Step Function esperará aquí hasta que se llame a SendTaskSuccess
@@ -51,7 +85,7 @@ def lambda_handler(event, context):
         
         return {
             'statusCode': 200,
-            'message': 'Notificación enviada, esperando confirmación del usuario',
+            'message': 'Notificación encolada, esperando confirmación del usuario',
             'pedido_id': pedido_id
         }
         
@@ -0,0 +1,34 @@
+import json
+import sys
+import os
+
+sys.path.append(os.path.dirname(__file__))
+from utils.dynamodb_helper import reconciliar_capacidad_local, listar_locales_con_capacidad
+from utils.limitador import respetar_plazo
+from utils.perfilado import perfilar
+
+@perfilar
+@respetar_plazo
+def lambda_handler(event, context):
+    """Lambda programada que corrige los contadores de capacidad de cada local"""
+    event = event or {}
+    print(f'Reconciliando capacidad: {json.dumps(event, default=str)}')
+
+    # Con local_id se reconcilia solo ese local; sin él, todos los que tienen contadores
+    locales = [event['local_id']] if event.get('local_id') else listar_locales_con_capacidad()
+
+    reconciliados = []
+    errores = {}
+    for local_id in locales:
+        try:
+            reconciliar_capacidad_local(local_id)
+            reconciliados.append(local_id)
+        except Exception as e:
+            errores[local_id] = str(e)
+
+    print(f'Locales reconciliados: {len(reconciliados)} de {len(locales)}')
+
+    return {
+        'reconciliados': reconciliados,
+        'errores': errores
+    }
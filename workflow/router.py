@@ -0,0 +1,56 @@
+import importlib
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(__file__))
+from utils.http import leer_body, respuesta_http
+from utils.limitador import respetar_plazo
+from utils.perfilado import perfilar
+
+# Punto de entrada único para los endpoints HTTP /workflow/*: un solo grupo de
+# contenedores atiende todo el tráfico HTTP y se mantiene caliente. El Step
+# Function sigue invocando las funciones de cada etapa.
+RUTAS = {
+    'iniciar': 'iniciar_workflow',
+    'cocinar': 'cocinar',
+    'empacar': 'empacar',
+    'enviar': 'enviar',
+    'confirmar': 'confirmar',
+    'confirmar-recepcion': 'confirmar_recepcion'
+}
+
+# Módulos de handlers ya importados en este contenedor
+_handlers = {}
+
+def _ruta(event):
+    """Nombre del endpoint pedido: lo que sigue a "workflow/" en el path"""
+    ruta = (event.get('pathParameters') or {}).get('proxy') or event.get('path') or ''
+    ruta = ruta.strip('/')
+    if 'workflow/' in ruta:
+        ruta = ruta.split('workflow/', 1)[1]
+    return ruta
+
+def _handler(ruta):
+    # Cada handler se importa la primera vez que se usa, para no pagar en el
+    # arranque los clientes de AWS de todos los endpoints
+    if ruta not in _handlers:
+        _handlers[ruta] = importlib.import_module(RUTAS[ruta]).lambda_handler
+    return _handlers[ruta]
+
+@perfilar
+@respetar_plazo
+def lambda_handler(event, context):
+    """Lambda que enruta las peticiones HTTP de /workflow/* al handler de cada endpoint"""
+    ruta = _ruta(event)
+
+    if ruta not in RUTAS:
+        return respuesta_http(404, {'error': f'Ruta no encontrada: {ruta}', 'rutas': sorted(RUTAS)})
+
+    try:
+        body = leer_body(event)
+    except json.JSONDecodeError:
+        return respuesta_http(400, {'error': 'El body no es un JSON válido'})
+
+    # El body ya parseado viaja como dict; los handlers lo aceptan igual que un string
+    return _handler(ruta)({**event, 'body': body}, context)
@@ -0,0 +1,96 @@
+import math
+import os
+
+from utils.dynamodb_helper import (
+    obtener_capacidad_local,
+    reservar_cupo_pedido,
+    slots_del_rol,
+    ESTADO_EN_ESPERA_POR_ROL
+)
+
+# Pedidos en curso admitidos por cada slot del rol más escaso del local. Por
+# encima de este límite los pedidos nuevos se difieren.
+MULTIPLICADOR_COLA = float(os.environ.get('ADMISION_MULTIPLICADOR_COLA', 2))
+
+# Por encima de MULTIPLICADOR_RECHAZO pedidos por slot se rechazan directamente
+MULTIPLICADOR_RECHAZO = float(os.environ.get('ADMISION_MULTIPLICADOR_RECHAZO', 4))
+
+# Duración aproximada de un pedido ocupando empleados (cocinar + empacar + enviar)
+DURACION_CICLO_SEGUNDOS = {
+    True: 900 + 300 + 1800,
+    False: 10 + 10 + 10
+}
+
+def es_modo_realista(valor=None):
+    """Interpreta el flag modo_realista de un pedido; sin valor se usa MODO_REALISTA"""
+    if valor is None:
+        valor = os.environ.get('MODO_REALISTA', 'false')
+    return str(valor).lower() == 'true'
+
+def decidir_admision(capacidad, duracion_ciclo, reservar):
+    """Regla de admisión sobre los contadores sumados de un local.
+
+    reservar(limite) toma el cupo del pedido si pedidos_en_curso está por
+    debajo del límite y retorna si lo tomó. Retorna la evaluación sin escribir
+    en el log; el generador de carga la reutiliza con contadores en memoria.
+    """
+    en_curso = int(capacidad.get('pedidos_en_curso', 0))
+
+    slots = {role: slots_del_rol(capacidad, role) for role in ESTADO_EN_ESPERA_POR_ROL}
+    slots_escasos = min(totales for _, totales in slots.values())
+
+    evaluacion = {
+        'pedidos_en_curso': en_curso,
+        'slots_libres': {role: libres for role, (libres, _) in slots.items()},
+        'eta_segundos': 0
+    }
+
+    # Sin empleados de algún rol el pedido terminaría en ServicioSaturado
+    if slots_escasos == 0:
+        return {**evaluacion, 'decision': 'rechazar', 'eta_segundos': duracion_ciclo}
+
+    limite = math.ceil(slots_escasos * MULTIPLICADOR_COLA)
+
+    # Con slots libres en todos los roles se admite aunque el contador de
+    # pedidos en curso diga lo contrario (se corrige en la reconciliación)
+    if all(libres > 0 for libres, _ in slots.values()):
+        limite = max(limite, en_curso + 1)
+
+    if reservar(limite):
+        return {**evaluacion, 'decision': 'iniciar', 'limite': limite}
+
+    # Tiempo estimado hasta que se libere un cupo para este pedido
+    exceso = max(en_curso - limite + 1, 1)
+    eta = math.ceil(exceso / slots_escasos) * duracion_ciclo
+    evaluacion.update({'limite': limite, 'eta_segundos': eta})
+
+    if en_curso >= math.ceil(slots_escasos * MULTIPLICADOR_RECHAZO):
+        return {**evaluacion, 'decision': 'rechazar'}
+
+    return {**evaluacion, 'decision': 'diferir'}
+
+def evaluar_admision(local_id, pedido_id, modo_realista=None):
+    """Decide si un pedido nuevo del local se inicia, se difiere o se rechaza.
+
+    Retorna un dict con 'decision' ('iniciar', 'diferir' o 'rechazar'),
+    'eta_segundos' para reintentar y los contadores usados. Si la decisión es
+    'iniciar', el cupo del pedido ya quedó reservado en pedidos_en_curso.
+    La ETA usa los tiempos del modo (realista o demo) en que correrá el pedido.
+    """
+    duracion_ciclo = DURACION_CICLO_SEGUNDOS[es_modo_realista(modo_realista)]
+    admision = decidir_admision(
+        obtener_capacidad_local(local_id),
+        duracion_ciclo,
+        lambda limite: reservar_cupo_pedido(local_id, pedido_id, limite)
+    )
+    en_curso = admision['pedidos_en_curso']
+
+    if admision['decision'] == 'iniciar':
+        print(f'Pedido admitido en local {local_id} ({en_curso + 1}/{admision["limite"]} en curso)')
+    elif admision['decision'] == 'diferir':
+        print(f'Local {local_id} sin cupo ({en_curso}/{admision["limite"]} en curso), pedido diferido {admision["eta_segundos"]}s')
+    elif 'limite' in admision:
+        print(f'Local {local_id} saturado ({en_curso} en curso), pedido rechazado')
+    else:
+        print(f'Local {local_id} sin empleados para algún rol, pedido rechazado')
+    return admision
@@ -0,0 +1,154 @@
+import boto3
+import gzip
+import hashlib
+import json
+import os
+from datetime import date
+
+from utils.json_encoder import DecimalEncoder
+from utils.limitador import llamar_con_limite, CONFIG_SIN_REINTENTOS
+
+# Archivo de pedidos finalizados en archivos columnares comprimidos, particionados
+# por local y fecha: <destino>/local_id=<local>/fecha=<AAAA-MM-DD>/<archivo>.cols.json.gz
+#
+# El destino (ARCHIVO_PEDIDOS_URI) puede ser una ruta local o "s3://bucket/prefijo".
+# Cada archivo guarda una lista de valores por columna; los atributos anidados
+# (historial_estados, empleado_reservado...) se guardan como texto JSON y el
+# lector los vuelve a decodificar.
+#
+# Un pedido puede quedar en dos archivos si se archivó pero no se alcanzó a
+# marcar y vuelve a archivarse en otro grupo; el lector entrega cada pedido una
+# sola vez.
+#
+# Las llamadas a S3 pasan por el limitador (presupuesto 's3'), que hace los reintentos.
+s3 = boto3.client('s3', region_name='us-east-1', config=CONFIG_SIN_REINTENTOS)
+
+VERSION_FORMATO = 1
+EXTENSION = '.cols.json.gz'
+
+# Atributos internos que no se archivan
+ATRIBUTOS_EXCLUIDOS = {'_particion', 'task_token'}
+
+def _destino():
+    return os.environ.get('ARCHIVO_PEDIDOS_URI', '/tmp/archivo-pedidos')
+
+def _separar_s3(uri):
+    bucket, _, prefijo = uri[len('s3://'):].partition('/')
+    return bucket, prefijo.strip('/')
+
+def _escribir(ruta_relativa, contenido):
+    destino = _destino()
+    if destino.startswith('s3://'):
+        bucket, prefijo = _separar_s3(destino)
+        clave = f'{prefijo}/{ruta_relativa}' if prefijo else ruta_relativa
+        llamar_con_limite('s3', s3.put_object, Bucket=bucket, Key=clave, Body=contenido, ContentEncoding='gzip')
+        return f's3://{bucket}/{clave}'
+
+    ruta = os.path.join(destino, ruta_relativa)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'wb') as f:
+        f.write(contenido)
+    return ruta
+
+def _listar(prefijo_relativo):
+    """Lista las rutas relativas de los archivos bajo un prefijo"""
+    destino = _destino()
+    if destino.startswith('s3://'):
+        bucket, prefijo = _separar_s3(destino)
+        base = f'{prefijo}/' if prefijo else ''
+        rutas = []
+        kwargs = {'Bucket': bucket, 'Prefix': base + prefijo_relativo}
+        while True:
+            pagina = llamar_con_limite('s3', s3.list_objects_v2, **kwargs)
+            rutas.extend(objeto['Key'][len(base):] for objeto in pagina.get('Contents', []))
+            if not pagina.get('IsTruncated'):
+                return rutas
+            kwargs['ContinuationToken'] = pagina['NextContinuationToken']
+
+    raiz = os.path.join(destino, prefijo_relativo)
+    rutas = []
+    for carpeta, _, archivos in os.walk(raiz):
+        for archivo in archivos:
+            rutas.append(os.path.relpath(os.path.join(carpeta, archivo), destino))
+    return rutas
+
+def _leer(ruta_relativa):
+    destino = _destino()
+    if destino.startswith('s3://'):
+        bucket, prefijo = _separar_s3(destino)
+        clave = f'{prefijo}/{ruta_relativa}' if prefijo else ruta_relativa
+        return llamar_con_limite('s3', s3.get_object, Bucket=bucket, Key=clave)['Body'].read()
+
+    with open(os.path.join(destino, ruta_relativa), 'rb') as f:
+        return f.read()
+
+def _valor_columna(valor):
+    if isinstance(valor, (dict, list, set)):
+        return json.dumps(valor if not isinstance(valor, set) else sorted(valor), cls=DecimalEncoder, ensure_ascii=False)
+    return valor
+
+def escribir_particion(local_id, fecha, pedidos):
+    """Escribe un archivo columnar con los pedidos de un local y una fecha. Retorna su ruta"""
+    columnas = sorted({
+        atributo for pedido in pedidos for atributo in pedido
+        if atributo not in ATRIBUTOS_EXCLUIDOS
+    })
+
+    anidadas = sorted({
+        atributo for pedido in pedidos for atributo, valor in pedido.items()
+        if atributo in columnas and isinstance(valor, (dict, list, set))
+    })
+
+    documento = {
+        'version': VERSION_FORMATO,
+        'filas': len(pedidos),
+        'columnas_json': anidadas,
+        'columnas': {
+            columna: [_valor_columna(pedido.get(columna)) for pedido in pedidos]
+            for columna in columnas
+        }
+    }
+
+    contenido = gzip.compress(json.dumps(documento, cls=DecimalEncoder, ensure_ascii=False).encode('utf-8'))
+    # Nombre determinístico: el mismo grupo de pedidos siempre va al mismo archivo
+    pedido_ids = '\n'.join(sorted(pedido['pedido_id'] for pedido in pedidos))
+    nombre = f'{hashlib.sha256(pedido_ids.encode("utf-8")).hexdigest()[:16]}{EXTENSION}'
+    ruta = _escribir(f'local_id={local_id}/fecha={fecha}/{nombre}', contenido)
+
+    print(f'{len(pedidos)} pedidos archivados en {ruta} ({len(contenido)} bytes)')
+    return ruta
+
+def leer_pedidos_archivados(local_id, desde, hasta, columnas=None):
+    """Lee los pedidos archivados de un local entre dos fechas (inclusive).
+
+    desde/hasta: date o texto 'AAAA-MM-DD'. columnas: lista opcional de
+    columnas a devolver (las demás no se decodifican).
+    """
+    desde = desde.isoformat() if isinstance(desde, date) else desde
+    hasta = hasta.isoformat() if isinstance(hasta, date) else hasta
+    leidos = set()
+
+    for ruta in sorted(_listar(f'local_id={local_id}/')):
+        if not ruta.endswith(EXTENSION):
+            continue
+
+        # La fecha sale de la ruta, sin abrir archivos fuera del rango
+        fecha = next((parte[len('fecha='):] for parte in ruta.split('/') if parte.startswith('fecha=')), None)
+        if not fecha or fecha < desde or fecha > hasta:
+            continue
+
+        documento = json.loads(gzip.decompress(_leer(ruta)).decode('utf-8'))
+        datos = documento['columnas']
+        seleccion = [c for c in (columnas or datos.keys()) if c in datos]
+
+        for columna in set(documento.get('columnas_json', [])) & set(seleccion):
+            datos[columna] = [json.loads(valor) if isinstance(valor, str) else valor for valor in datos[columna]]
+
+        ids = datos.get('pedido_id', [None] * documento['filas'])
+        for fila in range(documento['filas']):
+            # Un pedido archivado en más de un archivo se entrega una sola vez
+            if ids[fila] is not None:
+                if ids[fila] in leidos:
+                    continue
+                leidos.add(ids[fila])
+            yield {columna: datos[columna][fila] for columna in seleccion}
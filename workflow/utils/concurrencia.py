@@ -0,0 +1,83 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.perfilado import perfilar_tarea
+
+# Pool de hilos compartido por todas las invocaciones de un mismo contenedor
+MAX_HILOS = int(os.environ.get('CONCURRENCIA_MAX_HILOS', 8))
+
+_executor = None
+_executor_lock = threading.Lock()
+_contexto = threading.local()
+
+class ErrorEjecucionParalela(Exception):
+    """Una o más tareas paralelas fallaron; las que terminaron bien ya fueron compensadas"""
+
+    def __init__(self, errores, resultados, errores_compensacion=None):
+        self.errores = errores
+        self.resultados = resultados
+        self.errores_compensacion = errores_compensacion or {}
+        detalle = ', '.join(f'{nombre}: {str(error)}' for nombre, error in errores.items())
+        super().__init__(f'Fallaron {len(errores)} tarea(s) en paralelo ({detalle})')
+
+def _obtener_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_HILOS, thread_name_prefix='workflow')
+    return _executor
+
+def _ejecutar_en_hilo(tarea):
+    _contexto.en_pool = True
+    try:
+        # cProfile solo mide el hilo que lo activa: la tarea se perfila aparte
+        return perfilar_tarea(tarea)
+    finally:
+        _contexto.en_pool = False
+
+def ejecutar_en_paralelo(tareas, compensaciones=None):
+    """Ejecuta tareas independientes en paralelo y retorna sus resultados por nombre.
+
+    tareas: dict nombre -> callable sin argumentos.
+    compensaciones: dict nombre -> callable(resultado) que deshace una tarea.
+
+    Si alguna tarea falla, se compensan las que terminaron bien y se lanza
+    ErrorEjecucionParalela con todos los errores. Dentro de una tarea que ya
+    corre en el pool, las tareas se ejecutan en secuencia para no bloquear
+    el pool esperándose a sí mismo.
+    """
+    compensaciones = compensaciones or {}
+
+    if getattr(_contexto, 'en_pool', False) or len(tareas) <= 1:
+        futuros = None
+    else:
+        executor = _obtener_executor()
+        futuros = {nombre: executor.submit(_ejecutar_en_hilo, tarea) for nombre, tarea in tareas.items()}
+
+    resultados = {}
+    errores = {}
+    for nombre, tarea in tareas.items():
+        try:
+            resultados[nombre] = futuros[nombre].result() if futuros else tarea()
+        except Exception as e:
+            print(f'Error en tarea paralela "{nombre}": {str(e)}')
+            errores[nombre] = e
+
+    if not errores:
+        return resultados
+
+    errores_compensacion = {}
+    for nombre, resultado in resultados.items():
+        compensacion = compensaciones.get(nombre)
+        if not compensacion:
+            continue
+        try:
+            compensacion(resultado)
+            print(f'Tarea "{nombre}" compensada')
+        except Exception as e:
+            print(f'Error compensando tarea "{nombre}": {str(e)}')
+            errores_compensacion[nombre] = e
+
+    raise ErrorEjecucionParalela(errores, resultados, errores_compensacion)
@@ -1,25 +1,154 @@
 import boto3
+import hashlib
 import os
 import json
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
 from decimal import Decimal
 
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+from utils.concurrencia import ejecutar_en_paralelo
+from utils.ejecuciones import reanudar_ejecucion
+from utils.limitador import TablaLimitada, llamar_con_limite, CONFIG_SIN_REINTENTOS
+from utils.historial import (
+    nueva_entrada,
+    compactar_historial,
+    cerrar_entrada_activa,
+    expandir_historial
+)
+
+# Los resources y la sesión por defecto de boto3 no son seguros entre hilos:
+# cada hilo (incluidos los del pool de utils.concurrencia) crea su propia
+# sesión y su resource, reutilizados entre invocaciones
+_recursos = threading.local()
+
+def _dynamodb():
+    if not hasattr(_recursos, 'dynamodb'):
+        _recursos.dynamodb = boto3.session.Session().resource('dynamodb', region_name='us-east-1', config=CONFIG_SIN_REINTENTOS)
+    return _recursos.dynamodb
+
+def _tabla(nombre):
+    """Table de boto3 cuyas operaciones pasan por el limitador de llamadas"""
+    return TablaLimitada(_dynamodb().Table(nombre))
+
+# Locales con mucho tráfico cuyos pedidos y empleados se reparten en varias
+# claves de partición ("<local_id>#<shard>") para no superar el throughput de
+# una sola partición. Formato: "LOCAL001:4,LOCAL002:8". Al agregar un local los
+# items nuevos van a su shard y los existentes se siguen leyendo y escribiendo
+# en la partición del local hasta que migrar_particiones los mueva.
+def _leer_locales_calientes(valor):
+    locales = {}
+    for entrada in valor.split(','):
+        if not entrada.strip():
+            continue
+        local_id, _, shards = entrada.strip().rpartition(':')
+        locales[local_id] = int(shards)
+    return locales
+
+LOCALES_CALIENTES = _leer_locales_calientes(os.environ.get('LOCALES_CALIENTES', ''))
+
+def _particion(local_id, clave):
+    """Clave de partición del item identificado por clave dentro del local"""
+    shards = LOCALES_CALIENTES.get(local_id)
+    if not shards or shards <= 1:
+        return local_id
+    shard = int(hashlib.md5(clave.encode('utf-8')).hexdigest(), 16) % shards
+    return f'{local_id}#{shard}'
+
+def particion_pedido(local_id, pedido_id):
+    """Clave de partición (local_id) con la que se guarda el pedido"""
+    return _particion(local_id, pedido_id)
+
+def particion_empleado(local_id, dni):
+    """Clave de partición (local_id) con la que se guarda el empleado"""
+    return _particion(local_id, dni)
+
+def particiones_local(local_id):
+    """Todas las claves de partición de un local, para lecturas scatter-gather"""
+    shards = LOCALES_CALIENTES.get(local_id)
+    if not shards or shards <= 1:
+        return [local_id]
+    # La partición sin shard se incluye para leer items aún no migrados
+    return [local_id] + [f'{local_id}#{shard}' for shard in range(shards)]
+
+def _leer_item(table, local_id, nombre_clave, valor, **kwargs):
+    """Lee un item de su shard o, si aún no se migró, de la partición del local"""
+    particion = _particion(local_id, valor)
+    item = table.get_item(Key={'local_id': particion, nombre_clave: valor}, **kwargs).get('Item')
+    if not item and particion != local_id:
+        item = table.get_item(Key={'local_id': local_id, nombre_clave: valor}, **kwargs).get('Item')
+    return item
+
+def _ubicar(table, local_id, nombre_clave, valor):
+    """Partición donde está guardado el item, para escribirlo sin crear un duplicado"""
+    particion = _particion(local_id, valor)
+    if particion == local_id:
+        return particion
+    item = _leer_item(table, local_id, nombre_clave, valor, ProjectionExpression='local_id')
+    return item['local_id'] if item else particion
+
+def ubicar_pedido(local_id, pedido_id):
+    """Partición (local_id) donde está guardado el pedido"""
+    return _ubicar(_tabla(os.environ['TABLE_PEDIDOS']), local_id, 'pedido_id', pedido_id)
+
+def ubicar_empleado(local_id, dni):
+    """Partición (local_id) donde está guardado el empleado"""
+    return _ubicar(_tabla(os.environ['TABLE_EMPLEADOS']), local_id, 'dni', dni)
+
+def _normalizar_item(item, local_id):
+    """Guarda la partición real del item en _particion y deja el local_id lógico"""
+    item['_particion'] = item.get('local_id', local_id)
+    item['local_id'] = local_id
+    return item
+
+def _consultar_particiones(table, local_id, contar=False, condicion_clave=None, **kwargs):
+    """Consulta (paginada) todas las particiones del local en paralelo.
+    
+    condicion_clave se agrega a la condición sobre local_id (p. ej. la clave de
+    ordenamiento de un índice). Retorna los items normalizados, o el total si
+    contar=True.
+    """
+    def consultar(particion):
+        condicion = Key('local_id').eq(particion)
+        if condicion_clave is not None:
+            condicion = condicion & condicion_clave
+        parametros = dict(kwargs, KeyConditionExpression=condicion)
+        if contar:
+            parametros['Select'] = 'COUNT'
+        items = []
+        total = 0
+        while True:
+            response = table.query(**parametros)
+            items.extend(response.get('Items', []))
+            total += response.get('Count', 0)
+            if 'LastEvaluatedKey' not in response:
+                break
+            parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        return total if contar else items
+    
+    particiones = particiones_local(local_id)
+    resultados = ejecutar_en_paralelo({
+        particion: (lambda particion=particion: consultar(particion))
+        for particion in particiones
+    })
+    
+    if contar:
+        return sum(resultados.values())
+    return [_normalizar_item(item, local_id) for particion in particiones for item in resultados[particion]]
+
+def buscar_pedido(local_id, pedido_id):
+    """Obtiene un pedido completo de DynamoDB, o None si no existe"""
+    pedido = _leer_item(_tabla(os.environ['TABLE_PEDIDOS']), local_id, 'pedido_id', pedido_id)
+    return _normalizar_item(pedido, local_id) if pedido else None
 
 def obtener_pedido(local_id, pedido_id):
     """Obtiene un pedido completo de DynamoDB"""
-    table = dynamodb.Table(os.environ['TABLE_PEDIDOS'])
-    
     try:
-        response = table.get_item(
-            Key={
-                'local_id': local_id,
-                'pedido_id': pedido_id
-            }
-        )
+        pedido = buscar_pedido(local_id, pedido_id)
         
-        pedido = response.get('Item')
         if not pedido:
             raise Exception(f'Pedido {pedido_id} no encontrado')
         
@@ -30,36 +159,139 @@ def obtener_pedido(local_id, pedido_id):
         print(f'Error obteniendo pedido: {str(e)}')
         raise
 
-def buscar_empleado_disponible(local_id, role):
-    """Busca un empleado disponible (ocupado=False) del tipo especificado"""
-    table = dynamodb.Table(os.environ['TABLE_EMPLEADOS'])
+# Pedidos simultáneos que puede atender un empleado según su rol, cuando el
+# item del empleado no define su propia "capacidad"
+CAPACIDAD_POR_ROL = {
+    'Cocinero': int(os.environ.get('CAPACIDAD_COCINERO', 2)),
+    'Despachador': int(os.environ.get('CAPACIDAD_DESPACHADOR', 3)),
+    'Repartidor': int(os.environ.get('CAPACIDAD_REPARTIDOR', 2))
+}
+
+def capacidad_empleado(empleado):
+    """Retorna cuántos pedidos simultáneos puede atender el empleado"""
+    if empleado.get('capacidad') is not None:
+        return int(empleado['capacidad'])
+    return CAPACIDAD_POR_ROL.get(empleado.get('role'), 1)
+
+def carga_empleado(empleado):
+    """Retorna cuántos pedidos tiene asignados el empleado"""
+    if empleado.get('carga_actual') is not None:
+        return int(empleado['carga_actual'])
+    # Empleados anteriores al modelo de capacidad solo tienen el flag ocupado
+    return 1 if empleado.get('ocupado') else 0
+
+# Caché por contenedor de los datos estables de los empleados (nombre, rol,
+# calificación), por empleado. Se llena con los items que devuelven las
+# escrituras (ALL_NEW) y, para los que faltan, con un BatchGetItem solo de los
+# empleados que se necesitan; la disponibilidad sale del índice angosto.
+ROSTER_TTL_SEGUNDOS = int(os.environ.get('ROSTER_TTL_SEGUNDOS', 300))
+ROSTER_MAX_LOCALES = int(os.environ.get('ROSTER_MAX_LOCALES', 50))
+
+# Índice de la tabla de empleados con la disponibilidad: clave de partición
+# local_id, de ordenamiento role y proyección INCLUDE de estos atributos
+INDICE_EMPLEADOS_DISPONIBILIDAD = os.environ.get('INDICE_EMPLEADOS_DISPONIBILIDAD', 'empleados-disponibilidad-index')
+
+# Atributos que cambian con cada asignación y no se guardan en el caché
+ATRIBUTOS_DISPONIBILIDAD = ['local_id', 'dni', 'carga_actual', 'ocupado', 'capacidad']
+
+# String set con los pedidos que ocupan un slot del empleado. Cada ocupación y
+# liberación va ligada a un pedido, así que repetirla no cambia la carga.
+ATRIBUTO_PEDIDOS_ASIGNADOS = 'pedidos_asignados'
+
+# local_id -> {dni: (vence, datos estables)}, el local usado hace más tiempo sale primero
+_rosters = OrderedDict()
+_rosters_lock = threading.Lock()
+
+def _datos_estables(empleado):
+    return {
+        clave: valor for clave, valor in empleado.items()
+        if clave not in ATRIBUTOS_DISPONIBILIDAD and clave not in ('_particion', ATRIBUTO_PEDIDOS_ASIGNADOS)
+    }
+
+def invalidar_roster(local_id=None):
+    """Descarta el roster cacheado de un local (o de todos)"""
+    with _rosters_lock:
+        if local_id is None:
+            _rosters.clear()
+        else:
+            _rosters.pop(local_id, None)
+
+def _guardar_en_roster(local_id, empleado):
+    """Write-through: guarda en el caché los datos de un empleado recién leído o escrito"""
+    if not empleado or not empleado.get('dni'):
+        return
+    with _rosters_lock:
+        roster = _rosters.setdefault(local_id, {})
+        _rosters.move_to_end(local_id)
+        roster[empleado['dni']] = (time.monotonic() + ROSTER_TTL_SEGUNDOS, _datos_estables(empleado))
+        while len(_rosters) > ROSTER_MAX_LOCALES:
+            _rosters.popitem(last=False)
+
+def _roster_vigente(local_id):
+    """Datos estables cacheados y vigentes de los empleados del local (dict dni -> empleado)"""
+    ahora = time.monotonic()
+    with _rosters_lock:
+        roster = _rosters.get(local_id) or {}
+        return {dni: datos for dni, (vence, datos) in roster.items() if vence > ahora}
+
+def _leer_empleados(local_id, dnis):
+    """Lee con BatchGetItem los items completos de los empleados indicados"""
+    nombre_tabla = os.environ['TABLE_EMPLEADOS']
+    encontrados = {}
+    
+    # Primero en su shard y, los que falten, en la partición del local (no migrados)
+    for en_shard in (True, False):
+        claves = [
+            {'local_id': _particion(local_id, dni) if en_shard else local_id, 'dni': dni}
+            for dni in dnis
+            if dni not in encontrados and (en_shard or _particion(local_id, dni) != local_id)
+        ]
+        for inicio in range(0, len(claves), 100):
+            solicitud = {nombre_tabla: {'Keys': claves[inicio:inicio + 100]}}
+            intento = 0
+            while solicitud:
+                response = llamar_con_limite('dynamodb', _dynamodb().batch_get_item, RequestItems=solicitud)
+                for item in response.get('Responses', {}).get(nombre_tabla, []):
+                    encontrados[item['dni']] = _normalizar_item(item, local_id)
+                solicitud = response.get('UnprocessedKeys')
+                if solicitud:
+                    intento += 1
+                    time.sleep(min(0.05 * (2 ** intento), 1))
+    
+    return encontrados
+
+def buscar_empleados_disponibles(local_id, role):
+    """Busca los empleados del tipo especificado con capacidad libre, del mejor al peor calificado.
+    
+    Los datos estables (nombre, apellido) solo vienen en los empleados cacheados;
+    obtener_empleados completa los que se vayan a usar.
+    """
+    table = _tabla(os.environ['TABLE_EMPLEADOS'])
     
     try:
         print(f'Buscando {role} disponible en local {local_id}')
         
-        response = table.query(
-            KeyConditionExpression=Key('local_id').eq(local_id),
-            FilterExpression=Attr('role').eq(role) & Attr('ocupado').eq(False)
+        disponibilidad = _consultar_particiones(
+            table,
+            local_id,
+            condicion_clave=Key('role').eq(role),
+            IndexName=INDICE_EMPLEADOS_DISPONIBILIDAD
         )
         
-        empleados = response.get('Items', [])
-        
-        print(f'Empleados encontrados con role={role} y ocupado=False: {len(empleados)}')
-        
-        if not empleados:
-            print(f'No se encontraron {role}s disponibles en local {local_id}')
-            return None
-        
-        # Retornar el empleado con mejor calificación
-        empleado = sorted(
-            empleados, 
-            key=lambda x: float(x.get('calificacion_prom', 0)), 
-            reverse=True
-        )[0]
+        roster = _roster_vigente(local_id)
+        empleados = []
+        for item in disponibilidad:
+            empleado = {**roster.get(item['dni'], {}), **item}
+            if carga_empleado(empleado) < capacidad_empleado(empleado):
+                empleados.append(empleado)
         
-        print(f'Empleado {role} seleccionado: {empleado["dni"]} - {empleado["nombre"]} {empleado["apellido"]} (calificación: {empleado.get("calificacion_prom")})')
+        print(f'Empleados encontrados con role={role} y capacidad libre: {len(empleados)}')
         
-        return empleado
+        # Mejor calificación primero; a igual calificación, el menos cargado
+        return sorted(
+            empleados,
+            key=lambda x: (-float(x.get('calificacion_prom', 0)), carga_empleado(x))
+        )
         
     except Exception as e:
         print(f'Error buscando empleado: {str(e)}')
@@ -67,49 +299,185 @@ def buscar_empleado_disponible(local_id, role):
         print(f'Traceback: {traceback.format_exc()}')
         raise
 
-def marcar_empleado_ocupado(local_id, dni):
-    """Marca un empleado como ocupado (ocupado=True)"""
-    table = dynamodb.Table(os.environ['TABLE_EMPLEADOS'])
+def obtener_empleados(local_id, dnis):
+    """Datos estables (nombre, rol, calificación) de varios empleados. Retorna dict dni -> empleado"""
+    if not dnis:
+        return {}
+    
+    roster = _roster_vigente(local_id)
+    faltantes = [dni for dni in set(dnis) if dni not in roster]
+    if faltantes:
+        for empleado in _leer_empleados(local_id, faltantes).values():
+            _guardar_en_roster(local_id, empleado)
+            roster[empleado['dni']] = _datos_estables(empleado)
+    
+    return {dni: {**roster[dni], 'dni': dni} for dni in dnis if dni in roster}
+
+def buscar_empleado_disponible(local_id, role):
+    """Busca el empleado con capacidad libre y mejor calificación del tipo especificado"""
+    empleados = buscar_empleados_disponibles(local_id, role)
+    
+    if not empleados:
+        print(f'No se encontraron {role}s disponibles en local {local_id}')
+        return None
+    
+    empleado = {**obtener_empleados(local_id, [empleados[0]['dni']]).get(empleados[0]['dni'], {}), **empleados[0]}
+    
+    print(f'Empleado {role} seleccionado: {empleado["dni"]} - {empleado["nombre"]} {empleado["apellido"]} (calificación: {empleado.get("calificacion_prom")})')
+    
+    return empleado
+
+def reservar_empleado_disponible(local_id, role, pedido_id):
+    """Busca y ocupa para el pedido un slot de un empleado disponible, probando el siguiente candidato si otro pedido lo tomó antes"""
+    for candidato in buscar_empleados_disponibles(local_id, role):
+        actualizado = marcar_empleado_ocupado(local_id, candidato['dni'], pedido_id, candidato)
+        if actualizado:
+            # El item actualizado (ALL_NEW) trae también nombre y apellido
+            empleado = {**candidato, **_normalizar_item(actualizado, local_id)}
+            print(f'Empleado {role} reservado: {empleado["dni"]} - {empleado["nombre"]} {empleado["apellido"]} (calificación: {empleado.get("calificacion_prom")})')
+            return empleado
+    
+    print(f'No se encontraron {role}s disponibles en local {local_id}')
+    return None
+
+def _marcar_sin_capacidad(local_id, dni, particion=None):
+    """Pone ocupado=True si el empleado llenó todos sus slots"""
+    table = _tabla(os.environ['TABLE_EMPLEADOS'])
     
     try:
-        response = table.update_item(
+        table.update_item(
             Key={
-                'local_id': local_id,
+                'local_id': particion or ubicar_empleado(local_id, dni),
                 'dni': dni
             },
             UpdateExpression='SET ocupado = :ocupado',
+            ConditionExpression='carga_actual >= capacidad',
             ExpressionAttributeValues={
                 ':ocupado': True
+            }
+        )
+        return True
+        
+    except ClientError as e:
+        # Otro pedido liberó un slot entretanto, el empleado sigue disponible
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+def _pedidos_asignados(empleado):
+    return set((empleado or {}).get(ATRIBUTO_PEDIDOS_ASIGNADOS) or [])
+
+def marcar_empleado_ocupado(local_id, dni, pedido_id, empleado=None):
+    """Ocupa un slot del empleado (carga_actual + 1) para el pedido si tiene capacidad libre.
+    
+    Retorna el empleado actualizado (también si el pedido ya ocupaba un slot
+    suyo), o None si ya no le quedaban slots libres.
+    """
+    table = _tabla(os.environ['TABLE_EMPLEADOS'])
+    
+    try:
+        if empleado is None:
+            empleado = _leer_item(table, local_id, 'dni', dni) or {}
+        
+        particion = empleado.get('_particion') or empleado.get('local_id') or particion_empleado(local_id, dni)
+        capacidad = capacidad_empleado(empleado)
+        carga_inicial = carga_empleado(empleado)
+        
+        if carga_inicial >= capacidad:
+            print(f'Empleado {dni} sin capacidad libre ({carga_inicial}/{capacidad})')
+            return None
+        
+        response = table.update_item(
+            Key={
+                'local_id': particion,
+                'dni': dni
+            },
+            UpdateExpression='SET carga_actual = if_not_exists(carga_actual, :carga_inicial) + :uno, capacidad = if_not_exists(capacidad, :capacidad) ADD pedidos_asignados :pedidos',
+            ConditionExpression='attribute_exists(dni) AND (attribute_not_exists(carga_actual) OR carga_actual < :capacidad) AND NOT contains(pedidos_asignados, :pedido_id)',
+            ExpressionAttributeValues={
+                ':carga_inicial': carga_inicial,
+                ':uno': 1,
+                ':capacidad': capacidad,
+                ':pedidos': {pedido_id},
+                ':pedido_id': pedido_id
             },
             ReturnValues='ALL_NEW'
         )
         
-        print(f'Empleado {dni} marcado como ocupado')
-        return response.get('Attributes')
+        actualizado = response.get('Attributes')
+        
+        # El flag ocupado indica que el empleado ya no tiene slots libres
+        if carga_empleado(actualizado) >= capacidad_empleado(actualizado) and not actualizado.get('ocupado'):
+            actualizado['ocupado'] = _marcar_sin_capacidad(local_id, dni, particion)
+        
+        ajustar_slots_libres(local_id, actualizado.get('role'), -1, dni)
+        _guardar_en_roster(local_id, actualizado)
+        
+        print(f'Empleado {dni} ocupado por pedido {pedido_id} ({carga_empleado(actualizado)}/{capacidad_empleado(actualizado)})')
+        return actualizado
+        
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            actual = table.get_item(Key={'local_id': particion, 'dni': dni}, ConsistentRead=True).get('Item')
+            if pedido_id in _pedidos_asignados(actual):
+                # Reintento de una ocupación que ya se aplicó
+                print(f'Empleado {dni} ya estaba ocupado por pedido {pedido_id}')
+                return actual
+            print(f'Empleado {dni} ya no tiene capacidad libre')
+            return None
+        print(f'Error marcando empleado como ocupado: {str(e)}')
+        raise
         
     except Exception as e:
         print(f'Error marcando empleado como ocupado: {str(e)}')
         raise
 
-def marcar_empleado_libre(local_id, dni):
-    """Marca un empleado como libre (ocupado=False)"""
-    table = dynamodb.Table(os.environ['TABLE_EMPLEADOS'])
+def marcar_empleado_libre(local_id, dni, pedido_id, particion=None):
+    """Libera el slot que el pedido ocupaba del empleado (carga_actual - 1, ocupado=False).
+    
+    particion es la del item leído del empleado, si se tiene. Retorna el
+    empleado actualizado, o None si el pedido ya no ocupaba un slot suyo.
+    """
+    table = _tabla(os.environ['TABLE_EMPLEADOS'])
     
     try:
         response = table.update_item(
             Key={
-                'local_id': local_id,
+                'local_id': particion or ubicar_empleado(local_id, dni),
                 'dni': dni
             },
-            UpdateExpression='SET ocupado = :ocupado',
+            UpdateExpression='SET carga_actual = if_not_exists(carga_actual, :uno) - :uno, ocupado = :ocupado DELETE pedidos_asignados :pedidos',
+            # Los slots ocupados antes de registrar pedidos_asignados (carga mayor
+            # que los pedidos registrados) se liberan sin exigir el pedido
+            ConditionExpression=(
+                'attribute_exists(dni) AND ('
+                'contains(pedidos_asignados, :pedido_id)'
+                ' OR (attribute_not_exists(pedidos_asignados) AND (attribute_not_exists(carga_actual) OR carga_actual > :cero))'
+                ' OR carga_actual > size(pedidos_asignados))'
+            ),
             ExpressionAttributeValues={
-                ':ocupado': False
+                ':uno': 1,
+                ':cero': 0,
+                ':ocupado': False,
+                ':pedidos': {pedido_id},
+                ':pedido_id': pedido_id
             },
             ReturnValues='ALL_NEW'
         )
         
-        print(f'Empleado {dni} marcado como libre')
-        return response.get('Attributes')
+        actualizado = response.get('Attributes')
+        ajustar_slots_libres(local_id, actualizado.get('role'), 1, dni)
+        _guardar_en_roster(local_id, actualizado)
+        print(f'Empleado {dni} liberado de pedido {pedido_id} ({carga_empleado(actualizado)}/{capacidad_empleado(actualizado)})')
+        return actualizado
+        
+    except ClientError as e:
+        # Liberar dos veces el slot de un pedido no debe liberar el de otro
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            print(f'Empleado {dni} ya estaba libre de pedido {pedido_id}')
+            return None
+        print(f'Error marcando empleado como libre: {str(e)}')
+        raise
         
     except Exception as e:
         print(f'Error marcando empleado como libre: {str(e)}')
@@ -139,10 +507,10 @@ def validar_transicion_estado(estado_actual, estado_nuevo):
 
 def actualizar_estado_pedido_con_empleado(local_id, pedido_id, nuevo_estado, empleado):
     """Actualiza el estado de un pedido agregando nuevo historial con empleado"""
-    table = dynamodb.Table(os.environ['TABLE_PEDIDOS'])
+    table = _tabla(os.environ['TABLE_PEDIDOS'])
     
     try:
-        ahora = datetime.now().isoformat()
+        ahora = int(datetime.now().timestamp())
         
         # Obtener el pedido actual para validar y actualizar el historial
         pedido = obtener_pedido(local_id, pedido_id)
@@ -151,50 +519,24 @@ def actualizar_estado_pedido_con_empleado(local_id, pedido_id, nuevo_estado, emp
         # Validar que la transición sea válida
         validar_transicion_estado(estado_actual, nuevo_estado)
         
-        historial_actual = pedido.get('historial_estados', [])
+        # Los historiales en formato extendido se compactan al reescribirlos
+        historial_actual = compactar_historial(pedido.get('historial_estados', []))
         
         # Cerrar el estado activo anterior y extraer DNI del empleado anterior
-        empleado_anterior_dni = None
-        for estado in historial_actual:
-            if estado.get('activo', False):
-                estado['activo'] = False
-                estado['hora_fin'] = ahora
-                # Extraer DNI del empleado que estaba en el estado anterior
-                if estado.get('empleado'):
-                    empleado_anterior_dni = estado['empleado'].get('dni')
-        
-        # Crear nuevo estado
-        nuevo_historial = {
-            'estado': nuevo_estado,
-            'hora_inicio': ahora,
-            'hora_fin': ahora,
-            'activo': True
-        }
-        
-        if empleado:
-            # Convertir float a Decimal para DynamoDB
-            calificacion = empleado.get('calificacion_prom', 0)
-            if isinstance(calificacion, float):
-                calificacion = Decimal(str(calificacion))
-            elif isinstance(calificacion, str):
-                calificacion = Decimal(calificacion)
-            
-            nuevo_historial['empleado'] = {
-                'dni': empleado['dni'],
-                'nombre_completo': f"{empleado['nombre']} {empleado['apellido']}",
-                'rol': empleado['role'].lower(),
-                'calificacion_prom': calificacion
-            }
+        empleado_anterior_dni = cerrar_entrada_activa(historial_actual, ahora)
         
-        historial_actual.append(nuevo_historial)
+        # Del empleado solo se guarda el DNI; nombre, rol y calificación se
+        # completan al expandir el historial para los clientes
+        historial_actual.append(nueva_entrada(nuevo_estado, empleado['dni'] if empleado else None, ahora))
         
         # Actualizar pedido
         response = table.update_item(
             Key={
-                'local_id': local_id,
+                'local_id': pedido['_particion'],
                 'pedido_id': pedido_id
             },
-            UpdateExpression='SET estado = :estado, historial_estados = :historial',
+            # La reserva hecha por la asignación por lotes se consume aquí
+            UpdateExpression=f'SET estado = :estado, historial_estados = :historial REMOVE {ATRIBUTOS_ESPERA}',
             ExpressionAttributeValues={
                 ':estado': nuevo_estado,
                 ':historial': historial_actual
@@ -205,7 +547,7 @@ def actualizar_estado_pedido_con_empleado(local_id, pedido_id, nuevo_estado, emp
         print(f'Pedido {pedido_id} actualizado de "{estado_actual}" a "{nuevo_estado}"')
         
         # Retornar también el DNI del empleado anterior para liberarlo
-        result = response.get('Attributes')
+        result = _normalizar_item(response.get('Attributes'), local_id)
         result['_empleado_anterior_dni'] = empleado_anterior_dni
         
         return result
@@ -216,43 +558,117 @@ def actualizar_estado_pedido_con_empleado(local_id, pedido_id, nuevo_estado, emp
 
 def finalizar_pedido(local_id, pedido_id):
     """Finaliza el pedido marcando el último estado como inactivo"""
-    table = dynamodb.Table(os.environ['TABLE_PEDIDOS'])
+    table = _tabla(os.environ['TABLE_PEDIDOS'])
     
     try:
-        ahora = datetime.now().isoformat()
+        ahora = datetime.now()
         
         pedido = obtener_pedido(local_id, pedido_id)
-        historial_actual = pedido.get('historial_estados', [])
+        historial_actual = compactar_historial(pedido.get('historial_estados', []))
         
         # Cerrar el último estado activo
-        for estado in historial_actual:
-            if estado.get('activo', False):
-                estado['activo'] = False
-                estado['hora_fin'] = ahora
+        cerrar_entrada_activa(historial_actual, int(ahora.timestamp()))
         
         response = table.update_item(
             Key={
-                'local_id': local_id,
+                'local_id': pedido['_particion'],
                 'pedido_id': pedido_id
             },
-            UpdateExpression='SET estado = :estado, historial_estados = :historial',
+            # por_archivar deja el pedido en el índice disperso de pedidos por archivar
+            UpdateExpression='SET estado = :estado, historial_estados = :historial, finalizado_en = :ahora, por_archivar = :local',
             ExpressionAttributeValues={
                 ':estado': 'recibido',
-                ':historial': historial_actual
+                ':historial': historial_actual,
+                ':ahora': ahora.isoformat(),
+                ':local': local_id
             },
             ReturnValues='ALL_NEW'
         )
         
         print(f'Pedido {pedido_id} finalizado')
-        return response.get('Attributes')
+        return _normalizar_item(response.get('Attributes'), local_id)
         
     except Exception as e:
         print(f'Error finalizando pedido: {str(e)}')
         raise
 
+# Índice disperso de los pedidos finalizados que aún no se archivaron:
+# partición por_archivar (local_id lógico) y orden finalizado_en
+INDICE_PEDIDOS_POR_ARCHIVAR = os.environ.get('INDICE_PEDIDOS_POR_ARCHIVAR', 'pedidos-por-archivar-index')
+
+def buscar_pedidos_por_archivar(local_id=None, limite=None):
+    """Pedidos finalizados (estado recibido) que aún no se archivaron, los más antiguos primero.
+    
+    Con local_id consulta ese local en el índice de pedidos por archivar; sin él
+    recorre el índice, que solo contiene los pendientes. limite acota cuántos
+    pedidos se leen por ejecución.
+    """
+    table = _tabla(os.environ['TABLE_PEDIDOS'])
+    parametros = {
+        'IndexName': INDICE_PEDIDOS_POR_ARCHIVAR,
+        'FilterExpression': Attr('estado').eq('recibido')
+    }
+    if local_id:
+        parametros['KeyConditionExpression'] = Key('por_archivar').eq(local_id)
+    leer = table.query if local_id else table.scan
+    
+    pedidos = []
+    while not limite or len(pedidos) < limite:
+        response = leer(**parametros)
+        pedidos.extend(_normalizar_item(item, item['por_archivar']) for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return pedidos[:limite] if limite else pedidos
+
+def buscar_pedidos_antiguos_por_archivar(limite):
+    """Pedidos finalizados antes de registrar por_archivar, que no están en el índice.
+    
+    Barre la tabla completa; se usa una sola vez para vaciar ese remanente.
+    """
+    table = _tabla(os.environ['TABLE_PEDIDOS'])
+    filtro = Attr('estado').eq('recibido') & Attr('archivado_en').not_exists() & Attr('por_archivar').not_exists()
+    
+    pedidos = []
+    parametros = {'FilterExpression': filtro}
+    while len(pedidos) < limite:
+        response = table.scan(**parametros)
+        for item in response.get('Items', []):
+            # "<local_id>#<shard>" -> local_id lógico
+            pedidos.append(_normalizar_item(item, item['local_id'].split('#')[0]))
+        if 'LastEvaluatedKey' not in response:
+            break
+        parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return pedidos[:limite]
+
+def marcar_pedido_archivado(pedido, archivado_en, expira_en):
+    """Marca un pedido como archivado y programa su borrado por TTL (expira_en)"""
+    table = _tabla(os.environ['TABLE_PEDIDOS'])
+    
+    try:
+        table.update_item(
+            Key={
+                'local_id': pedido['_particion'],
+                'pedido_id': pedido['pedido_id']
+            },
+            UpdateExpression='SET archivado_en = :archivado_en, expira_en = :expira_en REMOVE por_archivar',
+            ConditionExpression='estado = :recibido',
+            ExpressionAttributeValues={
+                ':archivado_en': archivado_en,
+                ':expira_en': expira_en,
+                ':recibido': 'recibido'
+            }
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            print(f'Pedido {pedido["pedido_id"]} cambió de estado, no se marca como archivado')
+            return False
+        raise
+
 def agregar_pedido_a_usuario(usuario_correo, pedido_id):
     """Agrega un pedido al historial del usuario"""
-    table = dynamodb.Table(os.environ['TABLE_USUARIOS'])
+    table = _tabla(os.environ['TABLE_USUARIOS'])
     
     try:
         response = table.update_item(
@@ -272,31 +688,80 @@ def agregar_pedido_a_usuario(usuario_correo, pedido_id):
         print(f'Error agregando pedido al usuario: {str(e)}')
         raise
 
-def resetear_pedido_a_inicial(local_id, pedido_id):
-    """Resetea un pedido a su estado inicial para reintentar el workflow"""
-    table = dynamodb.Table(os.environ['TABLE_PEDIDOS'])
+def quitar_pedido_de_usuario(usuario_correo, pedido_id):
+    """Quita un pedido del historial del usuario (compensa agregar_pedido_a_usuario)"""
+    table = _tabla(os.environ['TABLE_USUARIOS'])
+    
+    try:
+        usuario = table.get_item(Key={'correo': usuario_correo}).get('Item') or {}
+        historial = usuario.get('historial_pedidos', [])
+        
+        if pedido_id not in historial:
+            return None
+        
+        # Se quita la última aparición, que es la agregada por la confirmación
+        indice = len(historial) - 1 - historial[::-1].index(pedido_id)
+        
+        response = table.update_item(
+            Key={'correo': usuario_correo},
+            UpdateExpression=f'REMOVE historial_pedidos[{indice}]',
+            ConditionExpression=f'historial_pedidos[{indice}] = :pedido',
+            ExpressionAttributeValues={
+                ':pedido': pedido_id
+            },
+            ReturnValues='UPDATED_NEW'
+        )
+        
+        print(f'Pedido {pedido_id} quitado del historial del usuario {usuario_correo}')
+        return response.get('Attributes')
+        
+    except Exception as e:
+        print(f'Error quitando pedido del usuario: {str(e)}')
+        raise
+
+def restaurar_estado_pedido(local_id, pedido_id, estado, historial, particion=None):
+    """Vuelve un pedido a un estado e historial anteriores (compensa finalizar_pedido)"""
+    table = _tabla(os.environ['TABLE_PEDIDOS'])
     
     try:
-        ahora = datetime.now().isoformat()
+        response = table.update_item(
+            Key={
+                'local_id': particion or ubicar_pedido(local_id, pedido_id),
+                'pedido_id': pedido_id
+            },
+            # El pedido vuelve a no estar finalizado ni pendiente de archivar
+            UpdateExpression='SET estado = :estado, historial_estados = :historial REMOVE finalizado_en, por_archivar',
+            ConditionExpression='attribute_exists(pedido_id)',
+            ExpressionAttributeValues={
+                ':estado': estado,
+                ':historial': historial
+            },
+            ReturnValues='ALL_NEW'
+        )
+        
+        print(f'Pedido {pedido_id} restaurado a estado "{estado}"')
+        return response.get('Attributes')
         
+    except Exception as e:
+        print(f'Error restaurando estado del pedido: {str(e)}')
+        raise
+
+def resetear_pedido_a_inicial(local_id, pedido_id, particion=None):
+    """Resetea un pedido a su estado inicial para reintentar el workflow"""
+    table = _tabla(os.environ['TABLE_PEDIDOS'])
+    
+    try:
         # Resetear a estado procesando con historial limpio
         response = table.update_item(
             Key={
-                'local_id': local_id,
+                'local_id': particion or ubicar_pedido(local_id, pedido_id),
                 'pedido_id': pedido_id
             },
-            UpdateExpression='SET estado = :estado, historial_estados = :historial, REMOVE task_token, esperando_confirmacion',
+            UpdateExpression=f'SET estado = :estado, historial_estados = :historial REMOVE task_token, esperando_confirmacion, {ATRIBUTOS_ESPERA}',
+            ConditionExpression='attribute_exists(pedido_id)',
             ExpressionAttributeValues={
                 ':estado': 'procesando',
-                ':historial': [
-                    {
-                        'estado': 'procesando',
-                        'hora_inicio': ahora,
-                        'hora_fin': ahora,
-                        'activo': True,
-                        'empleado': None
-                    }
-                ]
+                ':historial': [nueva_entrada('procesando')]
             },
             ReturnValues='ALL_NEW'
         )
@@ -307,3 +772,820 @@ def resetear_pedido_a_inicial(local_id, pedido_id):
     except Exception as e:
         print(f'Error reseteando pedido: {str(e)}')
         raise
+
+# Estado en el que espera un pedido que necesita un empleado de cada rol
+ESTADO_EN_ESPERA_POR_ROL = {
+    'Cocinero': 'procesando',
+    'Despachador': 'cocinando',
+    'Repartidor': 'empacando'
+}
+
+# Contadores por local que usa el control de admisión de iniciar_workflow.
+# Se ajustan al ocupar/liberar empleados y al iniciar/terminar pedidos, y la
+# Lambda programada reconciliar_capacidad corrige sus desvíos desde Empleados y
+# Pedidos. En los locales calientes los contadores se reparten en un item por
+# shard ("<local_id>#<shard>", el mismo del empleado o pedido contado) y se
+# suman al leerlos, para no concentrar todas las escrituras en un solo item.
+
+def _atributo_libres(role):
+    return f'libres_{role.lower()}'
+
+def _atributo_totales(role):
+    return f'totales_{role.lower()}'
+
+def _es_contador(atributo):
+    return atributo == 'pedidos_en_curso' or atributo.startswith(('libres_', 'totales_'))
+
+def particion_capacidad(local_id, clave):
+    """Item de contadores (local_id) donde cuenta el empleado o pedido identificado por clave"""
+    return _particion(local_id, clave)
+
+def ajustar_slots_libres(local_id, role, delta, dni):
+    """Suma delta al contador de slots libres del rol en el local"""
+    if not role or not delta:
+        return
+    
+    table = _tabla(os.environ['TABLE_CAPACIDAD_LOCALES'])
+    
+    try:
+        table.update_item(
+            Key={'local_id': particion_capacidad(local_id, dni)},
+            UpdateExpression='ADD #libres :delta',
+            ExpressionAttributeNames={'#libres': _atributo_libres(role)},
+            ExpressionAttributeValues={':delta': delta}
+        )
+        
+    except Exception as e:
+        # Un contador desviado se corrige en la siguiente reconciliación
+        print(f'Error ajustando slots libres del local {local_id}: {str(e)}')
+
+# Lecturas de los contadores que hace reservar_cupo_pedido en un local caliente
+# cuando otro pedido cambia el mismo shard entre la lectura y la escritura
+INTENTOS_RESERVA_CUPO = 3
+
+def _incrementar_cupo(particion, condicion, valores):
+    """Suma un pedido en curso al item de contadores si se cumple la condición. Retorna si se sumó"""
+    table = _tabla(os.environ['TABLE_CAPACIDAD_LOCALES'])
+    
+    try:
+        table.update_item(
+            Key={'local_id': particion},
+            UpdateExpression='SET pedidos_en_curso = if_not_exists(pedidos_en_curso, :cero) + :uno',
+            ConditionExpression=condicion,
+            ExpressionAttributeValues={':cero': 0, ':uno': 1, **valores}
+        )
+        return True
+        
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        print(f'Error reservando cupo de pedido: {str(e)}')
+        raise
+
+def reservar_cupo_pedido(local_id, pedido_id, limite):
+    """Incrementa pedidos_en_curso solo si está por debajo del límite. Retorna si se reservó.
+    
+    En un local caliente el límite se compara con la suma de todos los shards:
+    se leen con lectura consistente y el shard del pedido se incrementa solo si
+    no cambió desde esa lectura. Dos pedidos de shards distintos admitidos al
+    mismo tiempo pueden ver la misma suma, así que el local puede pasar el
+    límite en a lo sumo un pedido por cada otro shard que admita a la vez.
+    """
+    particion = particion_capacidad(local_id, pedido_id)
+    if particion == local_id:
+        return _incrementar_cupo(
+            particion,
+            'attribute_not_exists(pedidos_en_curso) OR pedidos_en_curso < :limite',
+            {':limite': limite}
+        )
+    
+    for _ in range(INTENTOS_RESERVA_CUPO):
+        contadores = _leer_contadores(local_id, consistente=True)
+        if _sumar_contadores(local_id, contadores.values()).get('pedidos_en_curso', 0) >= limite:
+            return False
+        
+        leido = (contadores.get(particion) or {}).get('pedidos_en_curso')
+        if leido is None:
+            condicion, valores = 'attribute_not_exists(pedidos_en_curso)', {}
+        else:
+            condicion, valores = 'pedidos_en_curso = :leido', {':leido': leido}
+        if _incrementar_cupo(particion, condicion, valores):
+            return True
+    
+    print(f'Contadores del local {local_id} cambiando, no se reservó cupo para {pedido_id}')
+    return False
+
+def liberar_cupo_pedido(local_id, pedido_id):
+    """Decrementa pedidos_en_curso al terminar o abandonar un pedido"""
+    table = _tabla(os.environ['TABLE_CAPACIDAD_LOCALES'])
+    
+    try:
+        table.update_item(
+            Key={'local_id': particion_capacidad(local_id, pedido_id)},
+            UpdateExpression='SET pedidos_en_curso = pedidos_en_curso - :uno',
+            ConditionExpression='pedidos_en_curso > :cero',
+            ExpressionAttributeValues={
+                ':cero': 0,
+                ':uno': 1
+            }
+        )
+        
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            print(f'Error liberando cupo de pedido: {str(e)}')
+            
+    except Exception as e:
+        print(f'Error liberando cupo de pedido: {str(e)}')
+
+def _leer_contadores(local_id, consistente=False):
+    """Item de contadores de cada partición del local (dict particion -> item o None)"""
+    table = _tabla(os.environ['TABLE_CAPACIDAD_LOCALES'])
+    
+    return ejecutar_en_paralelo({
+        particion: (lambda particion=particion: table.get_item(Key={'local_id': particion}, ConsistentRead=consistente).get('Item'))
+        for particion in particiones_local(local_id)
+    })
+
+def _sumar_contadores(local_id, items):
+    capacidad = {'local_id': local_id}
+    for item in items:
+        for atributo, valor in (item or {}).items():
+            if _es_contador(atributo):
+                capacidad[atributo] = capacidad.get(atributo, 0) + int(valor)
+    return capacidad
+
+def _contadores_reales(local_id):
+    """Contadores de cada partición del local calculados desde Empleados y Pedidos"""
+    tabla_empleados = _tabla(os.environ['TABLE_EMPLEADOS'])
+    tabla_pedidos = _tabla(os.environ['TABLE_PEDIDOS'])
+    
+    reales = {}
+    for particion in particiones_local(local_id):
+        reales[particion] = {'pedidos_en_curso': 0}
+        for role in ESTADO_EN_ESPERA_POR_ROL:
+            reales[particion][_atributo_libres(role)] = 0
+            reales[particion][_atributo_totales(role)] = 0
+    
+    for empleado in _consultar_particiones(tabla_empleados, local_id):
+        role = empleado.get('role')
+        if role not in ESTADO_EN_ESPERA_POR_ROL:
+            continue
+        contadores = reales[particion_capacidad(local_id, empleado['dni'])]
+        capacidad = capacidad_empleado(empleado)
+        contadores[_atributo_totales(role)] += capacidad
+        contadores[_atributo_libres(role)] += max(capacidad - carga_empleado(empleado), 0)
+    
+    # Pedidos que ya están dentro del workflow
+    pedidos = _consultar_particiones(
+        tabla_pedidos,
+        local_id,
+        FilterExpression=Attr('estado').is_in(['cocinando', 'empacando', 'enviando']) | Attr('esperando_empleado').exists(),
+        ProjectionExpression='pedido_id'
+    )
+    for pedido in pedidos:
+        reales[particion_capacidad(local_id, pedido['pedido_id'])]['pedidos_en_curso'] += 1
+    
+    return reales
+
+def reconciliar_capacidad_local(local_id):
+    """Corrige los contadores de capacidad del local con los valores de Empleados y Pedidos.
+    
+    Los contadores se leen antes de recalcularlos y la corrección se escribe
+    como un ADD de la diferencia, para no pisar los ajustes que hagan otros
+    pedidos mientras tanto. Un item que aún no existe se crea solo si nadie lo
+    creó antes. Los totales por rol solo los escribe la reconciliación.
+    """
+    table = _tabla(os.environ['TABLE_CAPACIDAD_LOCALES'])
+    
+    try:
+        antes = _leer_contadores(local_id, consistente=True)
+        reales = _contadores_reales(local_id)
+        ahora = int(datetime.now().timestamp())
+        
+        for particion, contadores in reales.items():
+            actual = antes.get(particion)
+            
+            if actual is None:
+                try:
+                    table.put_item(
+                        Item={'local_id': particion, 'reconciliado_en': ahora, **contadores},
+                        ConditionExpression='attribute_not_exists(local_id)'
+                    )
+                except ClientError as e:
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        raise
+                    print(f'Contadores de {particion} creados por otro proceso')
+                continue
+            
+            asignaciones = ['reconciliado_en = :reconciliado_en']
+            sumas = []
+            valores = {':reconciliado_en': ahora}
+            for indice, (atributo, valor) in enumerate(contadores.items()):
+                if atributo.startswith('totales_'):
+                    asignaciones.append(f'{atributo} = :v{indice}')
+                    valores[f':v{indice}'] = valor
+                    continue
+                diferencia = valor - int(actual.get(atributo, 0))
+                if diferencia:
+                    sumas.append(f'{atributo} :v{indice}')
+                    valores[f':v{indice}'] = diferencia
+            
+            expresion = 'SET ' + ', '.join(asignaciones)
+            if sumas:
+                expresion += ' ADD ' + ', '.join(sumas)
+            
+            table.update_item(
+                Key={'local_id': particion},
+                UpdateExpression=expresion,
+                ExpressionAttributeValues=valores
+            )
+        
+        capacidad = _sumar_contadores(local_id, reales.values())
+        print(f'Capacidad del local {local_id} reconciliada: {capacidad}')
+        return capacidad
+        
+    except Exception as e:
+        print(f'Error reconciliando capacidad del local: {str(e)}')
+        raise
+
+def listar_locales_con_capacidad():
+    """local_id de los locales que tienen contadores de capacidad"""
+    table = _tabla(os.environ['TABLE_CAPACIDAD_LOCALES'])
+    
+    locales = set()
+    parametros = {'ProjectionExpression': 'local_id'}
+    while True:
+        response = table.scan(**parametros)
+        # "<local_id>#<shard>" -> local_id lógico
+        locales.update(item['local_id'].split('#')[0] for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return sorted(locales)
+
+def obtener_capacidad_local(local_id):
+    """Retorna los contadores de capacidad del local (sumados entre sus shards)"""
+    try:
+        contadores = _leer_contadores(local_id)
+        
+        # Primer pedido del local: se crean sus contadores; las correcciones
+        # posteriores las hace la reconciliación programada
+        if not any(contadores.values()):
+            return reconciliar_capacidad_local(local_id)
+        
+        return _sumar_contadores(local_id, contadores.values())
+        
+    except Exception as e:
+        print(f'Error obteniendo capacidad del local: {str(e)}')
+        raise
+
+def slots_del_rol(capacidad, role):
+    """Retorna (libres, totales) del rol según los contadores del local"""
+    return (
+        int(capacidad.get(_atributo_libres(role), 0)),
+        int(capacidad.get(_atributo_totales(role), 0))
+    )
+
+# Asignaciones (empleado + pedido) escritas en cada transacción
+ASIGNACIONES_POR_TRANSACCION = 10
+
+# Índice global disperso con los pedidos en espera: solo los pedidos que
+# esperan empleado tienen espera_local_rol ("<local_id>#<rol>")
+INDICE_PEDIDOS_EN_ESPERA = os.environ.get('INDICE_PEDIDOS_EN_ESPERA', 'pedidos-en-espera-index')
+
+# Atributos de la espera de empleado que se quitan al consumir o cancelar la reserva
+ATRIBUTOS_ESPERA = 'esperando_empleado, espera_local_rol, espera_desde, inicio_pedido, prioridad, empleado_reservado, token_espera_empleado'
+
+def _clave_espera(local_id, role):
+    return f'{local_id}#{role}'
+
+def registrar_pedido_en_espera(local_id, pedido_id, role, prioridad=0, inicio_pedido=None, particion=None):
+    """Marca un pedido como esperando un empleado del rol indicado.
+    
+    prioridad es la parte fija de la prioridad (reintentos y VIP); la parte por
+    tiempo se calcula al asignar desde inicio_pedido.
+    """
+    table = _tabla(os.environ['TABLE_PEDIDOS'])
+    ahora = datetime.now().isoformat()
+    
+    try:
+        response = table.update_item(
+            Key={
+                'local_id': particion or ubicar_pedido(local_id, pedido_id),
+                'pedido_id': pedido_id
+            },
+            # espera_desde conserva el inicio de la primera espera entre reintentos
+            UpdateExpression='SET esperando_empleado = :role, espera_local_rol = :espera, prioridad = :prioridad, espera_desde = if_not_exists(espera_desde, :ahora), inicio_pedido = if_not_exists(inicio_pedido, :inicio)',
+            ConditionExpression='estado = :estado AND attribute_not_exists(empleado_reservado)',
+            ExpressionAttributeValues={
+                ':role': role,
+                ':espera': _clave_espera(local_id, role),
+                ':prioridad': prioridad,
+                ':ahora': ahora,
+                ':inicio': inicio_pedido or ahora,
+                ':estado': ESTADO_EN_ESPERA_POR_ROL[role]
+            },
+            ReturnValues='ALL_NEW'
+        )
+        
+        print(f'Pedido {pedido_id} esperando {role}')
+        return response.get('Attributes')
+        
+    except ClientError as e:
+        # El pedido cambió de estado o ya recibió un empleado entretanto
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            print(f'Pedido {pedido_id} ya no puede esperar {role}')
+            return None
+        print(f'Error registrando pedido en espera: {str(e)}')
+        raise
+
+def buscar_pedidos_en_espera(local_id, role):
+    """Busca en el índice de espera los pedidos del local que esperan un empleado del rol indicado"""
+    table = _tabla(os.environ['TABLE_PEDIDOS'])
+    
+    try:
+        pedidos = []
+        parametros = {
+            'IndexName': INDICE_PEDIDOS_EN_ESPERA,
+            'KeyConditionExpression': Key('espera_local_rol').eq(_clave_espera(local_id, role))
+        }
+        while True:
+            response = table.query(**parametros)
+            pedidos.extend(_normalizar_item(item, local_id) for item in response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                break
+            parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        
+        print(f'Pedidos esperando {role} en local {local_id}: {len(pedidos)}')
+        return pedidos
+        
+    except Exception as e:
+        print(f'Error buscando pedidos en espera: {str(e)}')
+        raise
+
+def buscar_esperas_pendientes():
+    """Pares (local_id, rol) con pedidos en espera, leídos del índice disperso de espera"""
+    table = _tabla(os.environ['TABLE_PEDIDOS'])
+    
+    esperas = set()
+    parametros = {
+        'IndexName': INDICE_PEDIDOS_EN_ESPERA,
+        'ProjectionExpression': 'espera_local_rol'
+    }
+    while True:
+        response = table.scan(**parametros)
+        for item in response.get('Items', []):
+            local_id, _, role = item['espera_local_rol'].rpartition('#')
+            esperas.add((local_id, role))
+        if 'LastEvaluatedKey' not in response:
+            break
+        parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return sorted(esperas)
+
+def registrar_token_espera(local_id, pedido_id, role, task_token):
+    """Guarda el taskToken de la ejecución en el pedido que espera empleado.
+    
+    Retorna 'esperando' si el token quedó guardado, 'reservado' si el pedido ya
+    tiene un empleado reservado, o None si el pedido no está esperando ese rol.
+    """
+    table = _tabla(os.environ['TABLE_PEDIDOS'])
+    
+    try:
+        table.update_item(
+            Key={
+                'local_id': ubicar_pedido(local_id, pedido_id),
+                'pedido_id': pedido_id
+            },
+            UpdateExpression='SET token_espera_empleado = :token',
+            ConditionExpression='esperando_empleado = :role AND attribute_not_exists(empleado_reservado)',
+            ExpressionAttributeValues={
+                ':token': task_token,
+                ':role': role
+            }
+        )
+        print(f'Pedido {pedido_id} espera {role} con taskToken {task_token[:20]}...')
+        return 'esperando'
+        
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+    
+    pedido = obtener_pedido(local_id, pedido_id)
+    if pedido.get('empleado_reservado'):
+        return 'reservado'
+    print(f'Pedido {pedido_id} no está esperando {role}')
+    return None
+
+def calcular_asignaciones(pedidos, empleados):
+    """Empareja pedidos en espera con slots libres de empleados.
+    
+    Los pedidos se atienden por su prioridad vigente (calculada ahora, no la
+    guardada al ponerlos en espera) y luego por antigüedad de la espera.
+    Los slots se reparten por rondas (primer slot de cada empleado, luego el
+    segundo...) en orden de calificación, para no cargar a un solo empleado
+    mientras otros siguen libres.
+    """
+    ahora = datetime.now()
+    pedidos_ordenados = sorted(
+        pedidos,
+        key=lambda p: (-prioridad_vigente(p, ahora), p.get('espera_desde', ''))
+    )
+    
+    empleados_ordenados = sorted(
+        empleados,
+        key=lambda x: -float(x.get('calificacion_prom', 0))
+    )
+    
+    slots = []
+    ronda = 0
+    while True:
+        ronda_slots = [
+            empleado for empleado in empleados_ordenados
+            if carga_empleado(empleado) + ronda < capacidad_empleado(empleado)
+        ]
+        if not ronda_slots:
+            break
+        slots.extend(ronda_slots)
+        ronda += 1
+    
+    return list(zip(pedidos_ordenados, slots))
+
+def _snapshot_empleado(empleado):
+    """Datos del empleado que se guardan en la reserva del pedido"""
+    return {
+        'dni': empleado['dni'],
+        'nombre': empleado.get('nombre'),
+        'apellido': empleado.get('apellido'),
+        'role': empleado.get('role'),
+        'calificacion_prom': empleado.get('calificacion_prom', 0)
+    }
+
+def _operaciones_asignacion(local_id, role, pedido, empleado, carga_inicial):
+    """Operaciones de la transacción que reserva un slot del empleado para el pedido"""
+    return [
+        {
+            'Update': {
+                'TableName': os.environ['TABLE_EMPLEADOS'],
+                'Key': {'local_id': empleado['_particion'], 'dni': empleado['dni']},
+                'UpdateExpression': 'SET carga_actual = if_not_exists(carga_actual, :carga_inicial) + :uno, capacidad = if_not_exists(capacidad, :capacidad) ADD pedidos_asignados :pedidos',
+                'ConditionExpression': '(attribute_not_exists(carga_actual) OR carga_actual < :capacidad) AND NOT contains(pedidos_asignados, :pedido_id)',
+                'ExpressionAttributeValues': {
+                    ':carga_inicial': carga_inicial,
+                    ':uno': 1,
+                    ':capacidad': capacidad_empleado(empleado),
+                    ':pedidos': {pedido['pedido_id']},
+                    ':pedido_id': pedido['pedido_id']
+                }
+            }
+        },
+        {
+            'Update': {
+                'TableName': os.environ['TABLE_PEDIDOS'],
+                'Key': {'local_id': pedido['_particion'], 'pedido_id': pedido['pedido_id']},
+                'UpdateExpression': 'SET empleado_reservado = :empleado REMOVE esperando_empleado, espera_local_rol',
+                'ConditionExpression': 'esperando_empleado = :role AND attribute_not_exists(empleado_reservado)',
+                'ExpressionAttributeValues': {
+                    ':empleado': _snapshot_empleado(empleado),
+                    ':role': role
+                }
+            }
+        }
+    ]
+
+def _escribir_asignaciones(local_id, role, asignaciones):
+    """Escribe las asignaciones en transacciones por lotes.
+    
+    Si un lote se cancela (otro proceso tomó un slot o un pedido), sus
+    asignaciones se reintentan una a una para no perder las que sí son válidas.
+    """
+    client = _dynamodb().meta.client
+    confirmadas = []
+    
+    # Carga de cada empleado antes de este pase, para inicializar contadores antiguos
+    carga_inicial = {}
+    for _, empleado in asignaciones:
+        carga_inicial.setdefault(empleado['dni'], carga_empleado(empleado))
+    
+    for inicio in range(0, len(asignaciones), ASIGNACIONES_POR_TRANSACCION):
+        lote = asignaciones[inicio:inicio + ASIGNACIONES_POR_TRANSACCION]
+        
+        # Una transacción no admite dos operaciones sobre el mismo item, así que
+        # un empleado con varios slots en el lote se reparte en sub-lotes
+        sub_lotes = []
+        for asignacion in lote:
+            dni = asignacion[1]['dni']
+            destino = next((sub for sub in sub_lotes if dni not in {e['dni'] for _, e in sub}), None)
+            if destino is None:
+                destino = []
+                sub_lotes.append(destino)
+            destino.append(asignacion)
+        
+        for sub_lote in sub_lotes:
+            try:
+                llamar_con_limite(
+                    'dynamodb',
+                    client.transact_write_items,
+                    TransactItems=[
+                        operacion
+                        for pedido, empleado in sub_lote
+                        for operacion in _operaciones_asignacion(local_id, role, pedido, empleado, carga_inicial[empleado['dni']])
+                    ]
+                )
+                confirmadas.extend(sub_lote)
+                
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'TransactionCanceledException' or len(sub_lote) == 1:
+                    print(f'Error escribiendo asignaciones: {str(e)}')
+                    continue
+                
+                for pedido, empleado in sub_lote:
+                    try:
+                        llamar_con_limite(
+                            'dynamodb',
+                            client.transact_write_items,
+                            TransactItems=_operaciones_asignacion(local_id, role, pedido, empleado, carga_inicial[empleado['dni']])
+                        )
+                        confirmadas.append((pedido, empleado))
+                    except ClientError as e_individual:
+                        print(f'Asignación de {empleado["dni"]} a pedido {pedido["pedido_id"]} descartada: {str(e_individual)}')
+    
+    return confirmadas
+
+def asignar_pedidos_en_espera(local_id, role, pedido_registrado=None):
+    """Asigna en un solo pase los pedidos en espera del local a los empleados libres del rol.
+    
+    Hace una consulta de pedidos y otra de empleados, calcula todas las
+    asignaciones a la vez y las escribe como reservas en los pedidos. Luego
+    reanuda las ejecuciones que esperaban con taskToken, que toman su reserva
+    sin volver a buscar empleado.
+    
+    pedido_registrado: pedido recién puesto en espera, que el índice (de
+    lectura eventual) puede no devolver todavía.
+    """
+    try:
+        pedidos = buscar_pedidos_en_espera(local_id, role)
+        if pedido_registrado and all(p['pedido_id'] != pedido_registrado['pedido_id'] for p in pedidos):
+            pedidos.append(_normalizar_item(pedido_registrado, local_id))
+        if not pedidos:
+            return []
+        
+        empleados = buscar_empleados_disponibles(local_id, role)
+        if not empleados:
+            return []
+        
+        asignaciones = calcular_asignaciones(pedidos, empleados)
+        
+        # Solo los empleados elegidos necesitan sus datos estables para la reserva
+        datos = obtener_empleados(local_id, {empleado['dni'] for _, empleado in asignaciones})
+        asignaciones = [
+            (pedido, {**datos.get(empleado['dni'], {}), **empleado})
+            for pedido, empleado in asignaciones
+        ]
+        confirmadas = _escribir_asignaciones(local_id, role, asignaciones)
+        
+        # Empleados que quedaron sin slots libres tras el pase
+        asignados_por_dni = {}
+        for _, empleado in confirmadas:
+            asignados_por_dni[empleado['dni']] = asignados_por_dni.get(empleado['dni'], 0) + 1
+        for dni, asignados in asignados_por_dni.items():
+            ajustar_slots_libres(local_id, role, -asignados, dni)
+        for empleado in empleados:
+            asignados = asignados_por_dni.get(empleado['dni'], 0)
+            if asignados and carga_empleado(empleado) + asignados >= capacidad_empleado(empleado):
+                _marcar_sin_capacidad(local_id, empleado['dni'], empleado['_particion'])
+        
+        print(f'Asignación por lotes en local {local_id} ({role}): {len(confirmadas)} de {len(pedidos)} pedidos en espera')
+        
+        # Las ejecuciones que esperan empleado continúan sin esperar su reintento;
+        # las que aún no guardaron su token toman la reserva al reintentar
+        for pedido, empleado in confirmadas:
+            if pedido.get('token_espera_empleado'):
+                try:
+                    reanudar_ejecucion(pedido['token_espera_empleado'], {'empleado_reservado': empleado['dni']})
+                except Exception as e:
+                    print(f'No se pudo reanudar la ejecución del pedido {pedido["pedido_id"]}: {str(e)}')
+        
+        return [
+            {'pedido_id': pedido['pedido_id'], 'dni': empleado['dni'], 'empleado': _snapshot_empleado(empleado)}
+            for pedido, empleado in confirmadas
+        ]
+        
+    except Exception as e:
+        print(f'Error en asignación por lotes: {str(e)}')
+        raise
+
+def cancelar_reserva_empleado(local_id, pedido_id, particion=None):
+    """Quita la reserva de empleado y la espera de un pedido"""
+    table = _tabla(os.environ['TABLE_PEDIDOS'])
+    
+    try:
+        table.update_item(
+            Key={
+                'local_id': particion or ubicar_pedido(local_id, pedido_id),
+                'pedido_id': pedido_id
+            },
+            UpdateExpression=f'REMOVE {ATRIBUTOS_ESPERA}',
+            ConditionExpression='attribute_exists(pedido_id)'
+        )
+        
+        print(f'Reserva de empleado cancelada para pedido {pedido_id}')
+        
+    except Exception as e:
+        print(f'Error cancelando reserva de empleado: {str(e)}')
+        raise
+
+# Pesos de la prioridad de un pedido que espera empleado
+PRIORIDAD_PESO_ESPERA_MINUTO = float(os.environ.get('PRIORIDAD_PESO_ESPERA_MINUTO', 1))
+PRIORIDAD_PESO_REINTENTO = float(os.environ.get('PRIORIDAD_PESO_REINTENTO', 5))
+PRIORIDAD_PESO_VIP = float(os.environ.get('PRIORIDAD_PESO_VIP', 30))
+
+def _inicio_pedido(pedido):
+    """Inicio del pedido en el workflow (su primer estado), o el de su espera"""
+    historial = expandir_historial(pedido.get('historial_estados'))
+    inicio = historial[0].get('hora_inicio') if historial else None
+    return inicio or pedido.get('inicio_pedido') or pedido.get('espera_desde')
+
+def _prioridad_base(pedido, contadores=None):
+    """Parte de la prioridad que no cambia mientras el pedido espera: reintentos y bono VIP"""
+    reintentos = sum(int(valor) for valor in (contadores or {}).values() if isinstance(valor, (int, Decimal)))
+    
+    es_vip = bool(pedido.get('vip')) or str(pedido.get('tipo', '')).lower() == 'vip'
+    
+    prioridad = reintentos * PRIORIDAD_PESO_REINTENTO + (PRIORIDAD_PESO_VIP if es_vip else 0)
+    return Decimal(str(round(prioridad, 2)))
+
+def _minutos_desde(inicio, ahora, pedido_id=None):
+    if not inicio:
+        return 0
+    try:
+        return max((ahora - datetime.fromisoformat(inicio)).total_seconds() / 60, 0)
+    except ValueError:
+        print(f'Fecha de inicio inválida en pedido {pedido_id}: {inicio}')
+        return 0
+
+def prioridad_vigente(pedido_en_espera, ahora=None):
+    """Prioridad actual de un pedido en espera: su parte fija guardada más el tiempo en el workflow"""
+    minutos = _minutos_desde(
+        pedido_en_espera.get('inicio_pedido') or pedido_en_espera.get('espera_desde'),
+        ahora or datetime.now(),
+        pedido_en_espera.get('pedido_id')
+    )
+    return float(pedido_en_espera.get('prioridad', 0)) + minutos * PRIORIDAD_PESO_ESPERA_MINUTO
+
+def calcular_prioridad_pedido(pedido, contadores=None):
+    """Calcula la prioridad de un pedido en espera: mayor valor, antes se atiende.
+    
+    Suma el tiempo que lleva el pedido en el workflow (desde su primer estado),
+    los reintentos acumulados en los contadores del Step Function y un bono
+    para pedidos VIP.
+    """
+    minutos_espera = _minutos_desde(_inicio_pedido(pedido), datetime.now(), pedido.get('pedido_id'))
+    prioridad = float(_prioridad_base(pedido, contadores)) + minutos_espera * PRIORIDAD_PESO_ESPERA_MINUTO
+    return Decimal(str(round(prioridad, 2)))
+
+def asignar_empleado_a_pedido(local_id, pedido, role, contadores=None):
+    """Obtiene el empleado que atenderá la siguiente etapa del pedido, por prioridad.
+    
+    Usa la reserva hecha por la asignación por lotes si existe. Si nadie espera
+    ese rol, ocupa directamente un empleado libre. Si hay contención, registra
+    el pedido en espera y lanza un pase de asignación del local, que atiende
+    primero a los pedidos de mayor prioridad; un pedido nuevo no puede quitarle
+    el empleado a uno que lleva varios reintentos esperando. Retorna None si el
+    pedido sigue en espera.
+    """
+    reservado = pedido.get('empleado_reservado')
+    if reservado:
+        print(f'Usando {role} reservado {reservado["dni"]} para pedido {pedido["pedido_id"]}')
+        return reservado
+    
+    # Camino rápido: sin otros pedidos esperando este rol no hay a quién
+    # respetarle el turno, se toma directamente un empleado libre
+    if not pedido.get('esperando_empleado') and not buscar_pedidos_en_espera(local_id, role):
+        empleado = reservar_empleado_disponible(local_id, role, pedido['pedido_id'])
+        if empleado:
+            return empleado
+    
+    # Con contención el pedido espera su turno según su prioridad
+    prioridad = calcular_prioridad_pedido(pedido, contadores)
+    registrado = registrar_pedido_en_espera(
+        local_id,
+        pedido['pedido_id'],
+        role,
+        _prioridad_base(pedido, contadores),
+        _inicio_pedido(pedido),
+        pedido.get('_particion')
+    )
+    if not registrado:
+        return None
+    
+    for asignacion in asignar_pedidos_en_espera(local_id, role, registrado):
+        if asignacion['pedido_id'] == pedido['pedido_id']:
+            # Se marca en el pedido para que una compensación conserve la reserva
+            pedido['empleado_reservado'] = asignacion['empleado']
+            print(f'{role} {asignacion["dni"]} asignado a pedido {pedido["pedido_id"]} (prioridad {prioridad})')
+            return asignacion['empleado']
+    
+    print(f'Pedido {pedido["pedido_id"]} sigue esperando {role} (prioridad {prioridad})')
+    return None
+
+def reasignar_tras_liberar(local_id, role):
+    """Lanza un pase de asignación tras liberar un empleado, sin hacer fallar al llamador"""
+    try:
+        return asignar_pedidos_en_espera(local_id, role)
+    except Exception as e:
+        print(f'No se pudo reasignar pedidos en espera de {role}: {str(e)}')
+        return []
+
+# Migración de los items de un local caliente a sus shards. Mientras no se
+# migran, _leer_item y _ubicar los siguen encontrando en la partición del local.
+TABLAS_POR_MIGRAR = {
+    'TABLE_PEDIDOS': 'pedido_id',
+    'TABLE_EMPLEADOS': 'dni'
+}
+
+def _condicion_sin_cambios(item, nombre_clave):
+    """Condición que exige que el item siga igual a como se leyó"""
+    nombres = {}
+    valores = {}
+    condiciones = [f'attribute_exists({nombre_clave})']
+    for indice, (atributo, valor) in enumerate(item.items()):
+        if atributo in ('local_id', nombre_clave):
+            continue
+        nombres[f'#a{indice}'] = atributo
+        valores[f':v{indice}'] = valor
+        condiciones.append(f'#a{indice} = :v{indice}')
+    return ' AND '.join(condiciones), nombres, valores
+
+def migrar_item_a_shard(table_env, item):
+    """Mueve un item de la partición del local a su shard en una transacción.
+    
+    Retorna False si el item cambió o ya existía en el shard; se reintenta en
+    la siguiente migración.
+    """
+    nombre_clave = TABLAS_POR_MIGRAR[table_env]
+    local_id = item['local_id']
+    shard = _particion(local_id, item[nombre_clave])
+    if shard == local_id:
+        return False
+    
+    condicion, nombres, valores = _condicion_sin_cambios(item, nombre_clave)
+    borrado = {
+        'TableName': os.environ[table_env],
+        'Key': {'local_id': local_id, nombre_clave: item[nombre_clave]},
+        'ConditionExpression': condicion
+    }
+    if nombres:
+        borrado['ExpressionAttributeNames'] = nombres
+        borrado['ExpressionAttributeValues'] = valores
+    
+    try:
+        llamar_con_limite(
+            'dynamodb',
+            _dynamodb().meta.client.transact_write_items,
+            TransactItems=[
+                {
+                    'Put': {
+                        'TableName': os.environ[table_env],
+                        'Item': {**item, 'local_id': shard},
+                        'ConditionExpression': f'attribute_not_exists({nombre_clave})'
+                    }
+                },
+                {'Delete': borrado}
+            ]
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'TransactionCanceledException':
+            print(f'{nombre_clave} {item[nombre_clave]} cambió durante la migración, se reintentará')
+            return False
+        raise
+
+def migrar_local_a_shards(local_id):
+    """Mueve a sus shards los pedidos y empleados del local que siguen en su partición.
+    
+    Retorna por tabla la cantidad de items movidos y pendientes.
+    """
+    if LOCALES_CALIENTES.get(local_id, 1) <= 1:
+        raise ValueError(f'El local {local_id} no está configurado en LOCALES_CALIENTES')
+    
+    resultado = {}
+    for table_env in TABLAS_POR_MIGRAR:
+        table = _tabla(os.environ[table_env])
+        movidos = 0
+        pendientes = 0
+        parametros = {'KeyConditionExpression': Key('local_id').eq(local_id)}
+        while True:
+            response = table.query(**parametros)
+            for item in response.get('Items', []):
+                if migrar_item_a_shard(table_env, item):
+                    movidos += 1
+                else:
+                    pendientes += 1
+            if 'LastEvaluatedKey' not in response:
+                break
+            parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        
+        print(f'{os.environ[table_env]}: {movidos} items de {local_id} movidos a sus shards, {pendientes} pendientes')
+        resultado[table_env] = {'movidos': movidos, 'pendientes': pendientes}
+    
+    return resultado
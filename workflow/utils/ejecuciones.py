@@ -0,0 +1,29 @@
+import boto3
+import json
+
+from utils.limitador import llamar_con_limite, CONFIG_SIN_REINTENTOS
+
+# Reanudación de ejecuciones del Step Function que esperan en un estado
+# waitForTaskToken (confirmación del usuario o asignación de empleado)
+stepfunctions = boto3.client('stepfunctions', region_name='us-east-1', config=CONFIG_SIN_REINTENTOS)
+
+# La ejecución ya no espera ese token (venció, se detuvo o ya se reanudó)
+ERRORES_TOKEN_VENCIDO = {'TaskTimedOut', 'TaskDoesNotExist', 'InvalidToken'}
+
+def reanudar_ejecucion(task_token, resultado):
+    """Envía SendTaskSuccess con el resultado. Retorna False si el token ya no estaba vigente"""
+    try:
+        llamar_con_limite(
+            'send_task_success',
+            stepfunctions.send_task_success,
+            taskToken=task_token,
+            output=json.dumps(resultado)
+        )
+        return True
+
+    except Exception as e:
+        codigo = getattr(e, 'response', {}).get('Error', {}).get('Code')
+        if codigo in ERRORES_TOKEN_VENCIDO:
+            print(f'La ejecución ya no esperaba el token {task_token[:20]}...: {codigo}')
+            return False
+        raise
@@ -0,0 +1,135 @@
+from datetime import datetime
+from decimal import Decimal
+
+# Formato compacto de historial_estados. Cada entrada guarda:
+#   e: código de estado, i: inicio y f: fin en segundos epoch, d: DNI del empleado
+# La entrada activa es la última sin "f"; el nombre, rol y calificación del
+# empleado no se copian al pedido (el rol sale del estado).
+#
+# Los pedidos antiguos tienen entradas en formato extendido
+# ({estado, hora_inicio, hora_fin, activo, empleado}); se leen igual y se
+# compactan la próxima vez que se escribe el historial.
+CODIGO_POR_ESTADO = {
+    'procesando': 'P',
+    'cocinando': 'C',
+    'empacando': 'E',
+    'enviando': 'V',
+    'recibido': 'R'
+}
+ESTADO_POR_CODIGO = {codigo: estado for estado, codigo in CODIGO_POR_ESTADO.items()}
+
+ROL_POR_ESTADO = {
+    'cocinando': 'cocinero',
+    'empacando': 'despachador',
+    'enviando': 'repartidor'
+}
+
+def _epoch(fecha_iso):
+    return int(datetime.fromisoformat(fecha_iso).timestamp())
+
+def _iso(epoch):
+    return datetime.fromtimestamp(int(epoch)).isoformat()
+
+def es_compacta(entrada):
+    return 'e' in entrada
+
+def nueva_entrada(estado, dni=None, ahora=None):
+    """Entrada compacta activa para un estado nuevo"""
+    entrada = {
+        'e': CODIGO_POR_ESTADO.get(estado, estado),
+        'i': int(ahora if ahora is not None else datetime.now().timestamp())
+    }
+    if dni:
+        entrada['d'] = dni
+    return entrada
+
+def compactar_entrada(entrada, activa=False):
+    """Convierte una entrada extendida (formato antiguo) al formato compacto"""
+    if es_compacta(entrada):
+        return entrada
+
+    compacta = {
+        'e': CODIGO_POR_ESTADO.get(entrada['estado'], entrada['estado']),
+        'i': _epoch(entrada['hora_inicio'])
+    }
+    if not activa and entrada.get('hora_fin'):
+        compacta['f'] = _epoch(entrada['hora_fin'])
+    if entrada.get('empleado'):
+        compacta['d'] = entrada['empleado']['dni']
+    return compacta
+
+def compactar_historial(historial):
+    """Pasa todo el historial al formato compacto"""
+    return [
+        compactar_entrada(entrada, activa=bool(entrada.get('activo')))
+        for entrada in historial or []
+    ]
+
+def cerrar_entrada_activa(historial, ahora=None):
+    """Cierra la entrada activa de un historial compacto. Retorna el DNI de su empleado"""
+    if historial and 'f' not in historial[-1]:
+        historial[-1]['f'] = int(ahora if ahora is not None else datetime.now().timestamp())
+        return historial[-1].get('d')
+    return None
+
+def empleados_de_la_etapa(historial):
+    """(DNI del empleado de la entrada activa, DNI del empleado de la entrada anterior)"""
+    historial = compactar_historial(historial)
+    if not historial or 'f' in historial[-1]:
+        return None, None
+    anterior = historial[-2].get('d') if len(historial) > 1 else None
+    return historial[-1].get('d'), anterior
+
+def _empleado_extendido(dni, estado, empleados):
+    empleado = {'dni': dni, 'rol': ROL_POR_ESTADO.get(estado)}
+    datos = (empleados or {}).get(dni)
+    if datos:
+        calificacion = datos.get('calificacion_prom', 0)
+        empleado.update({
+            'nombre_completo': f"{datos.get('nombre', '')} {datos.get('apellido', '')}".strip(),
+            'rol': datos.get('role', '').lower() or empleado['rol'],
+            'calificacion_prom': Decimal(str(calificacion)) if isinstance(calificacion, float) else calificacion
+        })
+    return empleado
+
+def expandir_historial(historial, empleados=None):
+    """Historial en formato extendido, para respuestas a clientes y lectores antiguos.
+
+    empleados: dict opcional dni -> item del empleado para completar nombre y
+    calificación. Las entradas que ya están en formato extendido no cambian.
+    """
+    historial = historial or []
+    expandido = []
+
+    for indice, entrada in enumerate(historial):
+        if not es_compacta(entrada):
+            expandido.append(entrada)
+            continue
+
+        estado = ESTADO_POR_CODIGO.get(entrada['e'], entrada['e'])
+        activa = indice == len(historial) - 1 and 'f' not in entrada
+        extendida = {
+            'estado': estado,
+            'hora_inicio': _iso(entrada['i']),
+            'hora_fin': _iso(entrada.get('f', entrada['i'])),
+            'activo': activa,
+            'empleado': _empleado_extendido(entrada['d'], estado, empleados) if entrada.get('d') else None
+        }
+        expandido.append(extendida)
+
+    return expandido
+
+def expandir_pedido(pedido, empleados=None):
+    """Copia del pedido con historial_estados en formato extendido"""
+    if not pedido or 'historial_estados' not in pedido:
+        return pedido
+    return {**pedido, 'historial_estados': expandir_historial(pedido['historial_estados'], empleados)}
+
+def dnis_del_historial(historial):
+    """DNIs de los empleados que aparecen en el historial (en cualquier formato)"""
+    dnis = []
+    for entrada in historial or []:
+        dni = entrada.get('d') if es_compacta(entrada) else (entrada.get('empleado') or {}).get('dni')
+        if dni and dni not in dnis:
+            dnis.append(dni)
+    return dnis
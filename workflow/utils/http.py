@@ -0,0 +1,28 @@
+import json
+
+from utils.json_encoder import json_dumps
+
+# Lectura de peticiones y armado de respuestas para los lambdas invocados por
+# API Gateway. Los mismos handlers también los invoca el Step Function con el
+# payload directo (sin "body").
+
+def es_http(event):
+    """True si el evento viene de API Gateway"""
+    return 'body' in event
+
+def leer_body(event):
+    """Body de la petición como dict; el evento mismo si es una invocación directa"""
+    if not es_http(event):
+        return event
+    body = event['body']
+    if not body:
+        return {}
+    return json.loads(body) if isinstance(body, str) else body
+
+def respuesta_http(status_code, datos, headers=None):
+    """Respuesta de API Gateway con cuerpo JSON (admite Decimal)"""
+    return {
+        'statusCode': status_code,
+        'body': json_dumps(datos),
+        'headers': {'Content-Type': 'application/json', **(headers or {})}
+    }
@@ -0,0 +1,93 @@
+import boto3
+import os
+import time
+from botocore.exceptions import ClientError
+
+from utils.http import es_http, respuesta_http
+from utils.limitador import TablaLimitada, CONFIG_SIN_REINTENTOS
+
+# Registro de resultados por (ejecución, etapa) para que los reintentos y
+# redrives del Step Function no repitan las escrituras de una etapa completada
+dynamodb = boto3.resource('dynamodb', region_name='us-east-1', config=CONFIG_SIN_REINTENTOS)
+
+# Tiempo que se conserva un resultado registrado (por defecto 2 días, más que
+# la duración máxima de una ejecución en modo realista)
+TTL_SEGUNDOS = int(os.environ.get('IDEMPOTENCIA_TTL_SEGUNDOS', 172800))
+
+def _clave(execution_id, etapa):
+    """Construye la clave del registro de idempotencia"""
+    return f'{execution_id}#{etapa}'
+
+def obtener_resultado_registrado(execution_id, etapa):
+    """Retorna el resultado guardado de una etapa ya completada, o None"""
+    if not execution_id:
+        return None
+
+    table = TablaLimitada(dynamodb.Table(os.environ['TABLE_IDEMPOTENCIA']))
+
+    try:
+        response = table.get_item(
+            Key={'clave': _clave(execution_id, etapa)},
+            ConsistentRead=True
+        )
+
+        registro = response.get('Item')
+
+        # DynamoDB elimina los items expirados con retraso, se filtran aquí
+        if not registro or int(registro.get('expira_en', 0)) < int(time.time()):
+            return None
+
+        print(f'Etapa "{etapa}" ya completada en la ejecución {execution_id}, reutilizando resultado')
+        return registro.get('resultado')
+
+    except Exception as e:
+        # Si la tabla no responde se procesa la etapa normalmente
+        print(f'Error leyendo registro de idempotencia: {str(e)}')
+        return None
+
+def respuesta_registrada(event, execution_id, etapa):
+    """Respuesta del handler (directa o HTTP) si la etapa ya se completó en la ejecución, o None"""
+    result = obtener_resultado_registrado(execution_id, etapa)
+
+    if not result:
+        return None
+    if es_http(event):
+        return respuesta_http(200, result)
+    return result
+
+def registrar_resultado(execution_id, etapa, resultado):
+    """Guarda el resultado de una etapa completada para devolverlo en reintentos"""
+    if not execution_id:
+        return False
+
+    table = TablaLimitada(dynamodb.Table(os.environ['TABLE_IDEMPOTENCIA']))
+    ahora = int(time.time())
+
+    try:
+        table.put_item(
+            Item={
+                'clave': _clave(execution_id, etapa),
+                'execution_id': execution_id,
+                'etapa': etapa,
+                'resultado': resultado,
+                'creado_en': ahora,
+                'expira_en': ahora + TTL_SEGUNDOS
+            },
+            # El primer resultado registrado es el válido
+            ConditionExpression='attribute_not_exists(clave)'
+        )
+
+        print(f'Resultado de etapa "{etapa}" registrado para la ejecución {execution_id}')
+        return True
+
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            print(f'La etapa "{etapa}" ya tenía un resultado registrado para {execution_id}')
+            return False
+        print(f'Error registrando resultado de idempotencia: {str(e)}')
+        return False
+
+    except Exception as e:
+        # No registrar el resultado no debe hacer fallar una etapa ya completada
+        print(f'Error registrando resultado de idempotencia: {str(e)}')
+        return False
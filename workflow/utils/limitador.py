@@ -0,0 +1,232 @@
+import functools
+import json
+import os
+import random
+import threading
+import time
+
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError as ErrorConexion, HTTPClientError
+
+# Limitador de llamadas a AWS del lado del cliente. Cada API tiene un presupuesto
+# (llamadas por segundo por contenedor) y un token bucket cuya tasa se ajusta
+# con AIMD: baja a la mitad con cada throttle y sube de a poco con cada éxito.
+# Los throttles se reintentan con backoff exponencial con jitter en lugar de
+# fallar la Lambda y esperar el reintento de 30 s del Step Function.
+#
+# El limitador es la única capa de reintentos: los clientes cuyas llamadas pasan
+# por aquí se crean con CONFIG_SIN_REINTENTOS para que botocore no reintente
+# por su cuenta, y los errores transitorios (5xx, red) también se reintentan
+# aquí. Ninguna espera pasa del plazo de la invocación (ver respetar_plazo).
+#
+# El presupuesto de 'ses' se cuenta en correos por segundo (la cuota de envío
+# por defecto de SES), porque SendBulkEmail descuenta cada destinatario.
+#
+# Formato de LIMITADOR_PRESUPUESTOS: "start_execution:10,dynamodb:100"
+PRESUPUESTOS_POR_DEFECTO = {
+    'start_execution': 10,
+    'stop_execution': 5,
+    'list_executions': 5,
+    'send_task_success': 20,
+    'dynamodb': 100,
+    'ses': 14,
+    's3': 100
+}
+
+def _leer_presupuestos(valor):
+    presupuestos = dict(PRESUPUESTOS_POR_DEFECTO)
+    for entrada in valor.split(','):
+        if not entrada.strip():
+            continue
+        api, _, tasa = entrada.strip().rpartition(':')
+        presupuestos[api] = float(tasa)
+    return presupuestos
+
+PRESUPUESTOS = _leer_presupuestos(os.environ.get('LIMITADOR_PRESUPUESTOS', ''))
+REINTENTOS = int(os.environ.get('LIMITADOR_REINTENTOS', 5))
+ESPERA_BASE_SEGUNDOS = 0.1
+ESPERA_MAXIMA_SEGUNDOS = 5
+# Tiempo que se reserva al final de la invocación para responder
+MARGEN_PLAZO_SEGUNDOS = float(os.environ.get('LIMITADOR_MARGEN_PLAZO_SEGUNDOS', 1))
+
+# Config de los clientes de boto3 cuyas llamadas pasan por llamar_con_limite
+CONFIG_SIN_REINTENTOS = Config(retries={'mode': 'standard', 'total_max_attempts': 1})
+
+# Ajuste AIMD, como fracción del presupuesto de la API
+INCREMENTO_EXITO = 0.05
+TASA_MINIMA = 0.05
+FACTOR_THROTTLE = 0.5
+
+CODIGOS_THROTTLE = {
+    'ThrottlingException',
+    'Throttling',
+    'ThrottledException',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+    'ProvisionedThroughputExceededException',
+    'SlowDown',
+    'TooManyRequests'
+}
+
+# Errores del servicio que se reintentan sin bajar la tasa
+CODIGOS_TRANSITORIOS = {
+    'InternalServerError',
+    'InternalFailure',
+    'ServiceUnavailable',
+    'RequestTimeout',
+    'RequestTimeoutException',
+    'TransactionInProgressException'
+}
+
+class PlazoAgotado(Exception):
+    """La espera del limitador no cabe en lo que queda de la invocación"""
+
+# Instante (time.monotonic) en que vence la invocación en curso, menos el
+# margen. Lambda atiende una invocación a la vez por contenedor, así que basta
+# un valor por módulo, visible también desde los hilos de utils.concurrencia.
+_vence = None
+
+def fijar_plazo(context):
+    """Toma el plazo de la invocación de context.get_remaining_time_in_millis()"""
+    global _vence
+    restante = getattr(context, 'get_remaining_time_in_millis', None)
+    _vence = time.monotonic() + restante() / 1000 - MARGEN_PLAZO_SEGUNDOS if restante else None
+
+def respetar_plazo(handler):
+    """Decorador de lambda_handler: acota las esperas del limitador al tiempo restante de la invocación"""
+    @functools.wraps(handler)
+    def envoltura(event, context):
+        fijar_plazo(context)
+        return handler(event, context)
+
+    return envoltura
+
+def _esperar(segundos):
+    """Duerme segundos, o lanza PlazoAgotado si la espera pasaría el plazo"""
+    if _vence is not None and time.monotonic() + segundos > _vence:
+        raise PlazoAgotado(f'No quedan {segundos:.2f} s de plazo para esperar')
+    time.sleep(segundos)
+
+class _TokenBucket:
+    def __init__(self, presupuesto):
+        self.presupuesto = presupuesto
+        self.tasa = presupuesto
+        self.tokens = max(presupuesto, 1)
+        self.ultima_recarga = time.monotonic()
+        self.lock = threading.Lock()
+        self.metricas = {'llamadas': 0, 'throttles': 0, 'reintentos': 0, 'espera_segundos': 0.0}
+
+    def _recargar(self, ahora):
+        capacidad = max(self.tasa, 1)
+        self.tokens = min(capacidad, self.tokens + (ahora - self.ultima_recarga) * self.tasa)
+        self.ultima_recarga = ahora
+
+    def adquirir(self, costo=1):
+        """Toma costo tokens, esperando lo necesario. Retorna los segundos esperados.
+
+        Un costo mayor que la capacidad del bucket se toma con el bucket lleno y
+        lo deja en negativo: las llamadas siguientes esperan lo que faltó.
+        """
+        esperado = 0.0
+        while True:
+            with self.lock:
+                self._recargar(time.monotonic())
+                necesarios = min(costo, max(self.tasa, 1))
+                if self.tokens >= necesarios:
+                    self.tokens -= costo
+                    self.metricas['llamadas'] += 1
+                    self.metricas['espera_segundos'] += esperado
+                    return esperado
+                espera = (necesarios - self.tokens) / self.tasa
+            _esperar(espera)
+            esperado += espera
+
+    def registrar_exito(self):
+        with self.lock:
+            self.tasa = min(self.presupuesto, self.tasa + self.presupuesto * INCREMENTO_EXITO)
+
+    def registrar_throttle(self):
+        with self.lock:
+            self.tasa = max(self.presupuesto * TASA_MINIMA, self.tasa * FACTOR_THROTTLE)
+            self.metricas['throttles'] += 1
+            return self.tasa
+
+    def registrar_reintento(self):
+        with self.lock:
+            self.metricas['reintentos'] += 1
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def _bucket(api):
+    if api not in _buckets:
+        with _buckets_lock:
+            if api not in _buckets:
+                _buckets[api] = _TokenBucket(PRESUPUESTOS.get(api, PRESUPUESTOS['dynamodb']))
+    return _buckets[api]
+
+def es_throttle(error):
+    return isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in CODIGOS_THROTTLE
+
+def es_transitorio(error):
+    if isinstance(error, (ErrorConexion, HTTPClientError)):
+        return True
+    return isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in CODIGOS_TRANSITORIOS
+
+def llamar_con_limite(api, funcion, *args, costo=1, **kwargs):
+    """Llama a funcion(*args, **kwargs) respetando el presupuesto de la API.
+
+    costo es lo que la llamada descuenta del presupuesto (los destinatarios de
+    un envío a SES). Los throttles y errores transitorios se reintentan hasta
+    LIMITADOR_REINTENTOS veces mientras quede plazo; cualquier otro error (o el
+    último reintento) se propaga sin cambios.
+    """
+    bucket = _bucket(api)
+
+    for intento in range(REINTENTOS + 1):
+        bucket.adquirir(costo)
+        try:
+            resultado = funcion(*args, **kwargs)
+        except Exception as e:
+            throttle = es_throttle(e)
+            if not throttle and not es_transitorio(e):
+                raise
+            if throttle:
+                tasa = bucket.registrar_throttle()
+                # Métrica en una línea JSON para filtrarla en CloudWatch Logs
+                print(json.dumps({'metrica': 'throttle', 'api': api, 'intento': intento + 1, 'tasa': round(tasa, 2)}))
+            if intento == REINTENTOS:
+                raise
+            # Full jitter: espera aleatoria entre 0 y el backoff exponencial
+            try:
+                _esperar(random.uniform(0, min(ESPERA_MAXIMA_SEGUNDOS, ESPERA_BASE_SEGUNDOS * (2 ** intento))))
+            except PlazoAgotado:
+                # Sin tiempo para otro intento se propaga el error original
+                raise e
+            bucket.registrar_reintento()
+        else:
+            bucket.registrar_exito()
+            return resultado
+
+def metricas_limitador():
+    """Contadores por API de este contenedor (llamadas, throttles, reintentos, espera y tasa actual)"""
+    return {
+        api: {**bucket.metricas, 'tasa': round(bucket.tasa, 2)}
+        for api, bucket in _buckets.items()
+    }
+
+# Operaciones de tabla que pasan por el limitador
+OPERACIONES_TABLA = {'get_item', 'put_item', 'update_item', 'delete_item', 'query', 'scan'}
+
+class TablaLimitada:
+    """Envuelve una Table de boto3 para que sus lecturas y escrituras usen el presupuesto 'dynamodb'"""
+
+    def __init__(self, table, api='dynamodb'):
+        self._table = table
+        self._api = api
+
+    def __getattr__(self, nombre):
+        atributo = getattr(self._table, nombre)
+        if nombre in OPERACIONES_TABLA:
+            return lambda *args, **kwargs: llamar_con_limite(self._api, atributo, *args, **kwargs)
+        return atributo
@@ -0,0 +1,129 @@
+import boto3
+import json
+import os
+import time
+from datetime import datetime
+
+from utils.limitador import llamar_con_limite, CONFIG_SIN_REINTENTOS
+
+# Envío de notificaciones del outbox por lotes. El proveedor se elige con
+# NOTIFICACIONES_PROVEEDOR: "ses" (SendBulkEmail, un destinatario por entrada)
+# o "local" (solo registra en memoria, para pruebas y demos sin cuenta de AWS)
+# Los throttles de SES los reintenta el limitador con el presupuesto 'ses'
+sesv2 = boto3.client('sesv2', region_name='us-east-1', config=CONFIG_SIN_REINTENTOS)
+
+# Máximo de destinatarios por llamada a SES SendBulkEmail
+TAMANO_LOTE = 50
+
+REINTENTOS_ENVIO = int(os.environ.get('NOTIFICACIONES_REINTENTOS', 3))
+ESPERA_BASE_SEGUNDOS = 0.2
+
+# Mensajes "enviados" por el proveedor local
+ENVIADAS_LOCAL = []
+
+def construir_mensaje_entrega(pedido_id):
+    """Texto de la notificación de pedido entregado"""
+    return (
+        f'¡Tu pedido {pedido_id} ha llegado a su destino!\n\n'
+        f'Por favor confirma la recepción accediendo a:\n'
+        f'https://tu-app.com/confirmar-pedido/{pedido_id}\n\n'
+        f"O responde a este mensaje con 'CONFIRMAR'."
+    )
+
+def _publicar_lote_ses(lote):
+    """Envía un lote por SES, cada notificación solo a su destinatario.
+
+    Retorna {notificacion_id: error} de las que fallaron.
+    """
+    response = llamar_con_limite(
+        'ses',
+        sesv2.send_bulk_email,
+        costo=len(lote),
+        FromEmailAddress=os.environ['NOTIFICACIONES_REMITENTE'],
+        DefaultContent={
+            'Template': {
+                'TemplateName': os.environ['NOTIFICACIONES_PLANTILLA'],
+                'TemplateData': json.dumps({'asunto': 'ChinaWok', 'mensaje': ''})
+            }
+        },
+        BulkEmailEntries=[
+            {
+                'Destination': {'ToAddresses': [notificacion['destinatario']]},
+                'ReplacementEmailContent': {
+                    'ReplacementTemplate': {
+                        'ReplacementTemplateData': json.dumps({
+                            'asunto': notificacion.get('asunto', 'ChinaWok'),
+                            'mensaje': notificacion['mensaje']
+                        })
+                    }
+                }
+            }
+            for notificacion in lote
+        ]
+    )
+
+    # Los resultados vienen en el mismo orden que las entradas; una entrada sin
+    # resultado se trata como fallida
+    resultados = response.get('BulkEmailEntryResults', [])
+    errores = {}
+    for indice, notificacion in enumerate(lote):
+        resultado = resultados[indice] if indice < len(resultados) else {'Status': 'SIN_RESULTADO'}
+        if resultado.get('Status') != 'SUCCESS':
+            errores[notificacion['notificacion_id']] = resultado.get('Error') or resultado.get('Status')
+    return errores
+
+def _publicar_lote_local(lote):
+    """Registra el lote en memoria en lugar de enviarlo"""
+    for notificacion in lote:
+        ENVIADAS_LOCAL.append({**notificacion, 'enviado_en': datetime.now().isoformat()})
+        print(f'[notificación local] {notificacion["destinatario"]}: {notificacion["mensaje"][:60]}...')
+    return {}
+
+PROVEEDORES = {
+    'ses': _publicar_lote_ses,
+    'local': _publicar_lote_local
+}
+
+def _proveedor():
+    return PROVEEDORES[os.environ.get('NOTIFICACIONES_PROVEEDOR', 'ses')]
+
+def enviar_notificaciones(notificaciones):
+    """Envía notificaciones en lotes, reintentando con backoff las que el proveedor rechazó.
+
+    Si falla el lote completo (el limitador ya reintentó los throttles y
+    errores transitorios) no se reintenta aquí: queda para el barrido.
+
+    Retorna (enviadas, fallidas): lista de notificacion_id enviados y dict
+    notificacion_id -> último error de las que no se pudieron enviar.
+    """
+    publicar_lote = _proveedor()
+    enviadas = []
+    fallidas = {}
+
+    for inicio in range(0, len(notificaciones), TAMANO_LOTE):
+        pendientes = notificaciones[inicio:inicio + TAMANO_LOTE]
+
+        for intento in range(REINTENTOS_ENVIO):
+            try:
+                errores = publicar_lote(pendientes)
+            except Exception as e:
+                print(f'Error enviando lote de {len(pendientes)} notificaciones: {str(e)}')
+                fallidas.update({notificacion['notificacion_id']: str(e) for notificacion in pendientes})
+                break
+
+            enviadas.extend(n['notificacion_id'] for n in pendientes if n['notificacion_id'] not in errores)
+            pendientes = [n for n in pendientes if n['notificacion_id'] in errores]
+
+            if not pendientes:
+                break
+
+            fallidas.update(errores)
+            print(f'{len(pendientes)} notificaciones fallidas, intento {intento + 1} de {REINTENTOS_ENVIO}')
+            if intento + 1 < REINTENTOS_ENVIO:
+                time.sleep(ESPERA_BASE_SEGUNDOS * (2 ** intento))
+
+        for notificacion_id in enviadas:
+            fallidas.pop(notificacion_id, None)
+
+    print(f'Notificaciones enviadas: {len(enviadas)}, fallidas: {len(fallidas)}')
+    return enviadas, fallidas
@@ -0,0 +1,123 @@
+import boto3
+import cProfile
+import functools
+import io
+import os
+import pstats
+import random
+import tempfile
+import threading
+import tracemalloc
+from datetime import datetime
+
+# Perfilado opcional de los lambda_handler, controlado por variables de entorno:
+# - PERFILADO_ACTIVO=true activa el decorador (si no, el handler queda intacto)
+# - PERFILADO_MUESTREO: fracción de invocaciones que se perfilan (0 a 1, por defecto 0.1)
+# - PERFILADO_TOP: cantidad de funciones y líneas de memoria que se escriben en el log
+# - PERFILADO_DESTINO: carpeta local o "s3://bucket/prefijo" para el perfil completo
+# - PERFILADO_S3_ENDPOINT: endpoint de un almacenamiento compatible con S3
+PERFILADO_ACTIVO = os.environ.get('PERFILADO_ACTIVO', 'false').lower() == 'true'
+MUESTREO = float(os.environ.get('PERFILADO_MUESTREO', 0.1))
+TOP = int(os.environ.get('PERFILADO_TOP', 20))
+DESTINO = os.environ.get('PERFILADO_DESTINO', '/tmp/perfiles')
+
+_s3 = None
+# Evita perfilar dos veces cuando un handler perfilado llama a otro (router)
+_en_curso = threading.local()
+
+# Perfiles de las tareas que la invocación perfilada corre en el pool de
+# utils.concurrencia, que se suman al del handler. Lambda atiende una
+# invocación a la vez por contenedor, así que basta una lista por módulo.
+_perfiles_pool = None
+_perfiles_lock = threading.Lock()
+
+def _cliente_s3():
+    global _s3
+    if _s3 is None:
+        _s3 = boto3.client('s3', region_name='us-east-1', endpoint_url=os.environ.get('PERFILADO_S3_ENDPOINT') or None)
+    return _s3
+
+def perfilar_tarea(tarea):
+    """Corre una tarea del pool de hilos; si la invocación en curso se perfila, también la tarea"""
+    if _perfiles_pool is None:
+        return tarea()
+
+    perfil = cProfile.Profile()
+    try:
+        return perfil.runcall(tarea)
+    finally:
+        with _perfiles_lock:
+            if _perfiles_pool is not None:
+                _perfiles_pool.append(perfil)
+
+def _guardar_perfil(perfiles, nombre):
+    """Guarda el perfil completo (formato pstats) y retorna su ubicación"""
+    if not DESTINO.startswith('s3://'):
+        ruta = os.path.join(DESTINO, nombre)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        pstats.Stats(*perfiles).dump_stats(ruta)
+        return ruta
+
+    bucket, _, prefijo = DESTINO[len('s3://'):].partition('/')
+    clave = f'{prefijo.strip("/")}/{nombre}' if prefijo.strip('/') else nombre
+    with tempfile.NamedTemporaryFile(suffix='.prof') as temporal:
+        pstats.Stats(*perfiles).dump_stats(temporal.name)
+        _cliente_s3().upload_file(temporal.name, bucket, clave)
+    return f's3://{bucket}/{clave}'
+
+def _resumen_cpu(perfiles):
+    salida = io.StringIO()
+    pstats.Stats(*perfiles, stream=salida).sort_stats('cumulative').print_stats(TOP)
+    return salida.getvalue()
+
+def _resumen_memoria(snapshot):
+    lineas = []
+    for estadistica in snapshot.statistics('lineno')[:TOP]:
+        lineas.append(f'  {estadistica}')
+    return '\n'.join(lineas)
+
+def _invocar_perfilado(handler, event, context):
+    global _perfiles_pool
+    funcion = getattr(context, 'function_name', None) or handler.__module__
+    request_id = getattr(context, 'aws_request_id', None) or datetime.now().strftime('%H%M%S%f')
+
+    iniciar_tracemalloc = not tracemalloc.is_tracing()
+    if iniciar_tracemalloc:
+        tracemalloc.start()
+
+    perfil = cProfile.Profile()
+    _en_curso.activo = True
+    with _perfiles_lock:
+        _perfiles_pool = []
+    try:
+        return perfil.runcall(handler, event, context)
+    finally:
+        _en_curso.activo = False
+        with _perfiles_lock:
+            perfiles = [perfil] + _perfiles_pool
+            _perfiles_pool = None
+        snapshot = tracemalloc.take_snapshot()
+        if iniciar_tracemalloc:
+            tracemalloc.stop()
+
+        # El perfilado nunca debe hacer fallar la invocación
+        try:
+            print(f'[perfilado] {funcion} {request_id} - CPU (top {TOP}, con {len(perfiles) - 1} tareas del pool):\n{_resumen_cpu(perfiles)}')
+            print(f'[perfilado] {funcion} {request_id} - memoria (top {TOP}):\n{_resumen_memoria(snapshot)}')
+            nombre = f'{funcion}/{datetime.now().strftime("%Y-%m-%d")}/{request_id}.prof'
+            print(f'[perfilado] Perfil completo en {_guardar_perfil(perfiles, nombre)}')
+        except Exception as e:
+            print(f'[perfilado] Error guardando el perfil: {str(e)}')
+
+def perfilar(handler):
+    """Decorador de lambda_handler: perfila una muestra de invocaciones si PERFILADO_ACTIVO=true"""
+    if not PERFILADO_ACTIVO:
+        return handler
+
+    @functools.wraps(handler)
+    def envoltura(event, context):
+        if getattr(_en_curso, 'activo', False) or random.random() >= MUESTREO:
+            return handler(event, context)
+        return _invocar_perfilado(handler, event, context)
+
+    return envoltura